@@ -0,0 +1,521 @@
+"""
+Local stand-in for the WooCommerce REST API, serving synthetic records for benchmarks
+"""
+
+import json
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+API_PREFIX = "/wp-json/wc/v3/"
+DEFAULT_PER_PAGE = 10
+MAX_PER_PAGE = 100
+# Records are created and modified one minute apart, starting from this date
+EPOCH = datetime(2024, 1, 1)
+ORDER_STATUSES = ("pending", "processing", "on-hold", "completed", "cancelled")
+VARIATION_OPTIONS = ("S", "M", "L", "XL", "XXL")
+# Values that the products endpoint accepts for its type filter. Variations are only listed per parent
+PRODUCT_TYPES = ("simple", "grouped", "external", "variable")
+
+
+class FakeWooCommerceStore:
+	"""
+	Synthetic WooCommerce records of a store of the given size
+
+	Every fourth product is a variable product with variations_per_product variations. Orders
+	have one to three line items of simple products, and belong to the customers in turn.
+	"""
+
+	def __init__(
+		self,
+		products: int = 100,
+		variations_per_product: int = 3,
+		orders: int = 100,
+		customers: int = 20,
+	):
+		self.lock = threading.Lock()
+		self.products: dict[int, dict] = {}
+		self.variations: dict[int, dict] = {}
+		self.orders: dict[int, dict] = {}
+		self.customers: dict[int, dict] = {}
+
+		for id in range(1, products + 1):
+			self.products[id] = make_product(id, "variable" if id % 4 == 0 else "simple")
+		self.next_id = products + 1
+
+		for product in [product for product in self.products.values() if product["type"] == "variable"]:
+			for option in VARIATION_OPTIONS[:variations_per_product]:
+				variation = make_variation(self.next_id, product, option)
+				self.variations[variation["id"]] = variation
+				product["variations"].append(variation["id"])
+				self.next_id += 1
+
+		for id in range(1, customers + 1):
+			self.customers[id] = make_customer(id)
+
+		simple_products = [product for product in self.products.values() if product["type"] == "simple"]
+		for id in range(1, orders + 1):
+			customer = self.customers[(id % customers) + 1] if customers else None
+			line_items = [simple_products[(id + i) % len(simple_products)] for i in range(id % 3 + 1)]
+			self.orders[id] = make_order(id, customer, line_items if simple_products else [])
+
+	def get_collection(self, route: str) -> tuple[dict[int, dict], dict] | None:
+		"""
+		Get the records and the implicit filters of a collection route, e.g. products/12/variations
+		"""
+		if route == "products":
+			return self.products, {}
+		if route == "orders":
+			return self.orders, {}
+		if route == "customers":
+			return self.customers, {}
+		if match := re.fullmatch(r"products/(\d+)/variations", route):
+			return self.variations, {"parent": match.group(1)}
+		return None
+
+	def list_records(self, route: str, params: dict) -> tuple[list[dict], int] | None:
+		"""
+		List the records of a collection with WooCommerce's filters, sorting and pagination
+
+		Returns:
+			Tuple: The records of the page, and the total number of records matching the filters
+		"""
+		if not (collection := self.get_collection(route)):
+			return None
+		records, implicit = collection
+
+		with self.lock:
+			matching = [record for record in records.values() if matches(record, {**implicit, **params})]
+
+		orderby = {"date": "date_created", "modified": "date_modified", "title": "name"}.get(
+			params.get("orderby", "date"), params.get("orderby", "date")
+		)
+		if orderby == "include" and params.get("include"):
+			include = [int(id) for id in params["include"].split(",")]
+			matching.sort(key=lambda record: include.index(record["id"]))
+		else:
+			matching.sort(
+				key=lambda record: (str(record.get(orderby, "")), record["id"]),
+				reverse=params.get("order", "desc") == "desc",
+			)
+
+		per_page = min(int(params.get("per_page", DEFAULT_PER_PAGE)), MAX_PER_PAGE)
+		if "offset" in params:
+			start = int(params["offset"])
+		else:
+			start = (int(params.get("page", 1)) - 1) * per_page
+
+		return matching[start : start + per_page], len(matching)
+
+	def validate_params(self, route: str, params: dict) -> str | None:
+		"""
+		Get the name of the first parameter of a list request that WooCommerce would reject, if any
+		"""
+		if route == "products" and params.get("type") and params["type"] not in PRODUCT_TYPES:
+			return "type"
+		return None
+
+	def get(self, route: str) -> dict | None:
+		if match := re.fullmatch(r"products/(?:\d+/variations/)?(\d+)", route):
+			id = int(match.group(1))
+			return self.products.get(id) or self.variations.get(id)
+		if match := re.fullmatch(r"(orders|customers)/(\d+)", route):
+			return getattr(self, match.group(1)).get(int(match.group(2)))
+		return None
+
+	def update(self, route: str, data: dict) -> dict | None:
+		"""
+		Update a record, or create it if the route is a collection
+		"""
+		with self.lock:
+			if record := self.get(route):
+				record.update(data)
+			elif collection := self.get_collection(route):
+				records, implicit = collection
+				if implicit.get("parent"):
+					record = make_variation(self.next_id, self.products[int(implicit["parent"])], "S")
+				else:
+					record = make_product(self.next_id, data.get("type", "simple"))
+				record.update(data)
+				record["id"] = self.next_id
+				records[self.next_id] = record
+				self.next_id += 1
+			else:
+				return None
+
+			record["date_modified"] = record["date_modified_gmt"] = now()
+			return record
+
+	def report_totals(self, route: str) -> list[dict] | None:
+		if route == "reports/orders/totals":
+			counts = Counter(order["status"] for order in self.orders.values())
+		elif route == "reports/products/totals":
+			counts = Counter(product["type"] for product in self.products.values())
+		else:
+			return None
+		return [{"slug": slug, "name": slug.title(), "total": total} for slug, total in counts.items()]
+
+
+class FakeWooCommerceServer:
+	"""
+	HTTP server serving a FakeWooCommerceStore on a free local port, in a background thread.
+
+	Every request is delayed by latency seconds, and counted per method and route.
+
+	Usage:
+		with FakeWooCommerceServer(FakeWooCommerceStore(products=500), latency=0.05) as server:
+			...  # point a WooCommerce Server at server.url
+	"""
+
+	def __init__(self, store: FakeWooCommerceStore, latency: float = 0.0):
+		self.store = store
+		self.latency = latency
+		self.requests = Counter()
+		self.lock = threading.Lock()
+		self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(self))
+		self.httpd.daemon_threads = True
+		self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+	@property
+	def url(self) -> str:
+		host, port = self.httpd.server_address[:2]
+		return f"http://{host}:{port}"
+
+	def count_request(self, method: str, route: str):
+		# Count routes of single records together, e.g. GET products/:id
+		route = re.sub(r"/\d+", "/:id", route)
+		with self.lock:
+			self.requests[f"{method} {route}"] += 1
+
+	def total_requests(self) -> int:
+		with self.lock:
+			return sum(self.requests.values())
+
+	def reset_requests(self):
+		with self.lock:
+			self.requests.clear()
+
+	def __enter__(self):
+		self.thread.start()
+		return self
+
+	def __exit__(self, *args):
+		self.httpd.shutdown()
+		self.httpd.server_close()
+
+
+def make_handler(server: FakeWooCommerceServer) -> type[BaseHTTPRequestHandler]:
+	class FakeWooCommerceHandler(BaseHTTPRequestHandler):
+		protocol_version = "HTTP/1.1"
+
+		def do_GET(self):
+			self.handle_request("GET")
+
+		def do_POST(self):
+			self.handle_request("POST")
+
+		def do_PUT(self):
+			self.handle_request("PUT")
+
+		def handle_request(self, method: str):
+			url = urlparse(self.path)
+			if not url.path.startswith(API_PREFIX):
+				return self.respond(404, {"code": "rest_no_route"})
+
+			route = url.path[len(API_PREFIX) :].strip("/")
+			params = dict(parse_qsl(url.query))
+			length = int(self.headers.get("Content-Length") or 0)
+			data = json.loads(self.rfile.read(length) or "{}") if length else {}
+
+			server.count_request(method, route)
+			if server.latency:
+				time.sleep(server.latency)
+
+			if method in ("POST", "PUT"):
+				if (record := server.store.update(route, data)) is None:
+					return self.respond(404, {"code": "woocommerce_rest_invalid_id"})
+				return self.respond(200, select_fields(record, params.get("_fields")))
+
+			if route == "system_status":
+				return self.respond(200, {"environment": {"version": "9.0.0"}})
+
+			if (totals := server.store.report_totals(route)) is not None:
+				return self.respond(200, totals)
+
+			if invalid_param := server.store.validate_params(route, params):
+				return self.respond(
+					400,
+					{
+						"code": "rest_invalid_param",
+						"message": f"Invalid parameter(s): {invalid_param}",
+						"data": {"status": 400, "params": {invalid_param: f"{invalid_param} is not valid."}},
+					},
+				)
+
+			if (listed := server.store.list_records(route, params)) is not None:
+				records, total = listed
+				per_page = min(int(params.get("per_page", DEFAULT_PER_PAGE)), MAX_PER_PAGE)
+				return self.respond(
+					200,
+					[select_fields(record, params.get("_fields")) for record in records],
+					headers={"X-WP-Total": total, "X-WP-TotalPages": -(-total // per_page)},
+				)
+
+			if (record := server.store.get(route)) is not None:
+				return self.respond(200, select_fields(record, params.get("_fields")))
+
+			return self.respond(404, {"code": "woocommerce_rest_invalid_id"})
+
+		def respond(self, status: int, body, headers: dict | None = None):
+			payload = json.dumps(body).encode()
+			self.send_response(status)
+			self.send_header("Content-Type", "application/json")
+			self.send_header("Content-Length", str(len(payload)))
+			for header, value in (headers or {}).items():
+				self.send_header(header, str(value))
+			self.end_headers()
+			self.wfile.write(payload)
+
+		def log_message(self, format, *args):
+			pass
+
+	return FakeWooCommerceHandler
+
+
+def matches(record: dict, params: dict) -> bool:
+	"""
+	Whether a record matches the filters of a WooCommerce list request
+	"""
+
+	def ids(param: str) -> set[int]:
+		return {int(id) for id in str(params[param]).strip("[]").replace("'", "").split(",") if id.strip()}
+
+	def dates(param: str) -> datetime:
+		return datetime.fromisoformat(params[param]).replace(tzinfo=None)
+
+	checks = {
+		"include": lambda: record["id"] in ids("include"),
+		"exclude": lambda: record["id"] not in ids("exclude"),
+		"parent": lambda: record.get("parent_id") in ids("parent"),
+		"parent_exclude": lambda: record.get("parent_id") not in ids("parent_exclude"),
+		"type": lambda: record.get("type") == params["type"],
+		"sku": lambda: record.get("sku") in params["sku"].split(","),
+		"stock_status": lambda: record.get("stock_status") == params["stock_status"],
+		"status": lambda: (
+			params["status"] == "any"
+			or record.get("status") in params["status"].strip("[]").replace("'", "").split(",")
+		),
+		"search": lambda: params["search"].lower() in str(record.get("name", "")).lower(),
+		"customer": lambda: str(record.get("customer_id")) == params["customer"],
+		"product": lambda: any(
+			str(item["product_id"]) == params["product"] for item in record.get("line_items", [])
+		),
+		"after": lambda: datetime.fromisoformat(record["date_created"]) > dates("after"),
+		"before": lambda: datetime.fromisoformat(record["date_created"]) < dates("before"),
+		"modified_after": lambda: datetime.fromisoformat(record["date_modified"]) > dates("modified_after"),
+		"modified_before": lambda: datetime.fromisoformat(record["date_modified"]) < dates("modified_before"),
+	}
+	return all(check() for param, check in checks.items() if params.get(param))
+
+
+def select_fields(record: dict, fields: str | None) -> dict:
+	if not fields:
+		return record
+	return {field: record[field] for field in fields.split(",") if field in record}
+
+
+def now() -> str:
+	return datetime.now().replace(microsecond=0).isoformat()
+
+
+def timestamp(id: int) -> str:
+	return (EPOCH + timedelta(minutes=id)).isoformat()
+
+
+def make_product(id: int, type: str) -> dict:
+	return {
+		"id": id,
+		"name": f"Benchmark Product {id}",
+		"slug": f"benchmark-product-{id}",
+		"permalink": f"https://example.com/product/benchmark-product-{id}",
+		"type": type,
+		"status": "publish",
+		"featured": False,
+		"catalog_visibility": "visible",
+		"description": f"<p>Description of benchmark product {id}</p>",
+		"short_description": f"<p>Benchmark product {id}</p>",
+		"sku": f"BENCH-{id}",
+		"price": str(10 + id % 90),
+		"regular_price": str(10 + id % 90),
+		"sale_price": "",
+		"date_on_sale_from": None,
+		"date_on_sale_to": None,
+		"on_sale": False,
+		"purchasable": True,
+		"total_sales": id % 50,
+		"virtual": False,
+		"downloadable": False,
+		"downloads": [],
+		"download_limit": -1,
+		"download_expiry": -1,
+		"tax_status": "taxable",
+		"tax_class": "",
+		"manage_stock": False,
+		"stock_quantity": None,
+		"stock_status": "instock" if id % 10 else "outofstock",
+		"backorders": "no",
+		"backorders_allowed": False,
+		"backordered": False,
+		"low_stock_amount": None,
+		"sold_individually": False,
+		"weight": "1",
+		"dimensions": {"length": "", "width": "", "height": ""},
+		"shipping_required": True,
+		"shipping_taxable": True,
+		"shipping_class": "",
+		"shipping_class_id": 0,
+		"reviews_allowed": True,
+		"average_rating": "0.00",
+		"rating_count": 0,
+		"upsell_ids": [],
+		"cross_sell_ids": [],
+		"related_ids": [],
+		"parent_id": 0,
+		"categories": [{"id": 1, "name": "Benchmark", "slug": "benchmark"}],
+		"tags": [],
+		"images": [],
+		"attributes": [
+			{
+				"id": 1,
+				"name": "Size",
+				"position": 0,
+				"visible": True,
+				"variation": True,
+				"options": list(VARIATION_OPTIONS),
+			}
+		]
+		if type == "variable"
+		else [],
+		"default_attributes": [],
+		"variations": [],
+		"meta_data": [],
+		"date_created": timestamp(id),
+		"date_created_gmt": timestamp(id),
+		"date_modified": timestamp(id),
+		"date_modified_gmt": timestamp(id),
+	}
+
+
+def make_variation(id: int, product: dict, option: str) -> dict:
+	return {
+		**make_product(id, "variation"),
+		"name": f"{product['name']} - {option}",
+		"sku": f"{product['sku']}-{option}",
+		"parent_id": product["id"],
+		"attributes": [{"id": 1, "name": "Size", "option": option}],
+		"categories": [],
+		"date_created": product["date_created"],
+		"date_created_gmt": product["date_created_gmt"],
+	}
+
+
+def make_address(id: int) -> dict:
+	return {
+		"first_name": "Customer",
+		"last_name": str(id),
+		"company": "",
+		"address_1": f"{id} Benchmark Street",
+		"address_2": "",
+		"city": "Cape Town",
+		"state": "WC",
+		"postcode": "8001",
+		"country": "ZA",
+		"email": f"customer{id}@example.com",
+		"phone": "0210000000",
+	}
+
+
+def make_customer(id: int) -> dict:
+	return {
+		"id": id,
+		"email": f"customer{id}@example.com",
+		"first_name": "Customer",
+		"last_name": str(id),
+		"username": f"customer{id}",
+		"role": "customer",
+		"billing": make_address(id),
+		"shipping": make_address(id),
+		"is_paying_customer": True,
+		"meta_data": [],
+		"date_created": timestamp(id),
+		"date_modified": timestamp(id),
+	}
+
+
+def make_order(id: int, customer: dict | None, products: list[dict]) -> dict:
+	line_items = [
+		{
+			"id": id * 10 + i,
+			"name": product["name"],
+			"product_id": product["id"],
+			"variation_id": 0,
+			"quantity": i + 1,
+			"tax_class": "",
+			"subtotal": f"{float(product['price']) * (i + 1):.2f}",
+			"subtotal_tax": "0.00",
+			"total": f"{float(product['price']) * (i + 1):.2f}",
+			"total_tax": "0.00",
+			"taxes": [],
+			"meta_data": [],
+			"sku": product["sku"],
+			"price": float(product["price"]),
+		}
+		for i, product in enumerate(products)
+	]
+	total = sum(float(item["total"]) for item in line_items)
+	return {
+		"id": id,
+		"parent_id": 0,
+		"number": str(id),
+		"order_key": f"wc_order_benchmark{id}",
+		"created_via": "checkout",
+		"version": "9.0.0",
+		"status": ORDER_STATUSES[id % len(ORDER_STATUSES)],
+		"currency": "ZAR",
+		"prices_include_tax": False,
+		"discount_total": "0.00",
+		"discount_tax": "0.00",
+		"shipping_total": "0.00",
+		"shipping_tax": "0.00",
+		"cart_tax": "0.00",
+		"total": f"{total:.2f}",
+		"total_tax": "0.00",
+		"customer_id": customer["id"] if customer else 0,
+		"customer_ip_address": "127.0.0.1",
+		"customer_user_agent": "benchmark",
+		"customer_note": "",
+		"billing": customer["billing"] if customer else make_address(0),
+		"shipping": customer["shipping"] if customer else make_address(0),
+		"payment_method": "bacs",
+		"payment_method_title": "Direct bank transfer",
+		"transaction_id": "",
+		"date_paid": None,
+		"payment_url": "",
+		"cart_hash": "",
+		"meta_data": [],
+		"line_items": line_items,
+		"tax_lines": [],
+		"shipping_lines": [],
+		"fee_lines": [],
+		"coupon_lines": [],
+		"refunds": [],
+		"_links": {},
+		"date_created": timestamp(id),
+		"date_created_gmt": timestamp(id),
+		"date_modified": timestamp(id),
+		"date_modified_gmt": timestamp(id),
+	}
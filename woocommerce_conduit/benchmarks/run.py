@@ -0,0 +1,340 @@
+"""
+Benchmarks of WooCommerce listing and synchronisation, against a local stand-in for the WooCommerce REST API
+
+The benchmarks add a temporary WooCommerce Server, copied from the first existing one, that points at a
+FakeWooCommerceServer, and disable all other servers while they run. Requests to the fake store are not
+logged, and everything the benchmarks write to the database themselves is rolled back afterwards. Writes
+that are queued in the background, like mirrored records or deferred Sync Profiles and Error Logs, are
+not, so run them on a development site:
+
+	bench --site dev.localhost execute woocommerce_conduit.benchmarks.run.run \\
+		--kwargs "{'products': 500, 'orders': 500, 'latency': 0.05}"
+"""
+
+import time
+import tracemalloc
+from collections.abc import Callable
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+import frappe
+from frappe.utils import flt
+
+from woocommerce_conduit.benchmarks.fake_woocommerce import FakeWooCommerceServer, FakeWooCommerceStore
+from woocommerce_conduit.tasks.sync_item_prices import SynchroniseItemPrice
+from woocommerce_conduit.tasks.sync_items import run_item_sync
+from woocommerce_conduit.tasks.sync_sales_orders import run_sales_order_sync
+from woocommerce_conduit.woocommerce_conduit.doctype.woocommerce_order.woocommerce_order import (
+	WooCommerceOrder,
+)
+from woocommerce_conduit.woocommerce_conduit.doctype.woocommerce_product.woocommerce_product import (
+	VARIATION_MANIFEST_CACHE_KEY,
+	WooCommerceProduct,
+)
+from woocommerce_conduit.woocommerce_conduit.record_cache import (
+	WooCommerceRecordCache,
+	WooCommerceResponseCache,
+)
+from woocommerce_conduit.woocommerce_conduit.record_stats import remove_record_stats
+from woocommerce_conduit.woocommerce_conduit.woocommerce_api import (
+	generate_woocommerce_record_name_from_domain_and_id,
+)
+
+ALL_SCENARIOS = ("list_products", "list_orders", "item_sync", "order_sync", "price_sync")
+
+
+@dataclass
+class BenchmarkResult:
+	"""Measurements of one benchmark scenario"""
+
+	scenario: str
+	records: int = 0
+	requests: int = 0
+	queries: int = 0
+	wall_time: float = 0.0
+	peak_memory: int = 0
+	errors: list[str] = field(default_factory=list)
+
+	def as_row(self) -> list:
+		records = max(self.records, 1)
+		return [
+			self.scenario,
+			self.records,
+			self.requests,
+			self.queries,
+			f"{self.wall_time:.2f}",
+			f"{self.wall_time * 1000 / records:.1f}",
+			f"{self.requests / records:.2f}",
+			f"{self.queries / records:.1f}",
+			f"{self.peak_memory / 1024 / records:.1f}",
+			len(self.errors),
+		]
+
+
+def run(
+	products: int = 100,
+	variations_per_product: int = 3,
+	orders: int = 100,
+	customers: int = 20,
+	latency: float = 0.02,
+	sync_limit: int = 50,
+	scenarios: list[str] | None = None,
+) -> list[dict]:
+	"""
+	Run the benchmark scenarios, print a report, and return the results
+
+	Args:
+		products: Number of products in the fake store; every fourth one is a variable product
+		variations_per_product: Number of variations of each variable product
+		orders: Number of orders in the fake store
+		customers: Number of customers that the orders belong to
+		latency: Delay in seconds of every response of the fake store
+		sync_limit: Maximum number of products and orders that are synchronised one by one
+		scenarios: Scenarios to run, out of ALL_SCENARIOS; all of them by default
+	"""
+	store = FakeWooCommerceStore(
+		products=products,
+		variations_per_product=variations_per_product,
+		orders=orders,
+		customers=customers,
+	)
+	results = []
+
+	with FakeWooCommerceServer(store, latency=latency) as server:
+		frappe.flags.skip_woocommerce_request_log = True
+		try:
+			wc_server = create_benchmark_server(server.url)
+			domain = urlparse(server.url).netloc
+			for scenario in scenarios or ALL_SCENARIOS:
+				results.append(run_scenario(scenario, server, wc_server, domain, sync_limit))
+		finally:
+			frappe.flags.skip_woocommerce_request_log = False
+			frappe.db.rollback()
+			clear_benchmark_caches(store, urlparse(server.url).netloc)
+
+	print_report(results, store, latency)
+	return [result.__dict__ for result in results]
+
+
+def run_scenario(
+	scenario: str, server: FakeWooCommerceServer, wc_server, domain: str, sync_limit: int
+) -> BenchmarkResult:
+	store = server.store
+
+	if scenario == "list_products":
+		total = len(store.products)
+		return measure(
+			scenario,
+			server,
+			lambda: WooCommerceProduct.get_list_of_records(
+				{"doctype": "WooCommerce Product", "page_length": total, "max_results": total}
+			),
+		)
+
+	if scenario == "list_orders":
+		total = len(store.orders)
+		return measure(
+			scenario,
+			server,
+			lambda: WooCommerceOrder.get_list_of_records(
+				{"doctype": "WooCommerce Order", "page_length": total, "max_results": total}
+			),
+		)
+
+	if scenario == "item_sync":
+		names = [
+			generate_woocommerce_record_name_from_domain_and_id(domain, id)
+			for id in list(store.products)[:sync_limit]
+		]
+		return measure_each(
+			scenario, server, names, lambda name: run_item_sync(woocommerce_product_name=name)
+		)
+
+	if scenario == "order_sync":
+		names = [
+			generate_woocommerce_record_name_from_domain_and_id(domain, id)
+			for id in list(store.orders)[:sync_limit]
+		]
+		return measure_each(
+			scenario, server, names, lambda name: run_sales_order_sync(woocommerce_order_name=name)
+		)
+
+	if scenario == "price_sync":
+		create_benchmark_item_prices(wc_server)
+
+		def sync_prices():
+			sync = SynchroniseItemPrice(servers=[wc_server])
+			sync.wc_server = wc_server
+			sync.get_erpnext_item_prices()
+			sync.sync_items_with_woocommerce_products()
+			return sync.item_price_list
+
+		return measure(scenario, server, sync_prices)
+
+	frappe.throw(f"Unknown benchmark scenario '{scenario}', expected one of {', '.join(ALL_SCENARIOS)}")
+
+
+def measure(scenario: str, server: FakeWooCommerceServer, fn: Callable[[], list]) -> BenchmarkResult:
+	"""
+	Measure a function that processes a list of records and returns them
+	"""
+	result = BenchmarkResult(scenario)
+	with measurement(result, server):
+		try:
+			result.records = len(fn() or [])
+		except Exception as e:
+			result.errors.append(repr(e))
+	return result
+
+
+def measure_each(
+	scenario: str, server: FakeWooCommerceServer, names: list[str], fn: Callable[[str], object]
+) -> BenchmarkResult:
+	"""
+	Measure a function that processes one record at a time, over all of the named records
+	"""
+	result = BenchmarkResult(scenario, records=len(names))
+	with measurement(result, server):
+		for name in names:
+			try:
+				fn(name)
+			except Exception as e:
+				result.errors.append(f"{name}: {e!r}")
+	return result
+
+
+@contextmanager
+def measurement(result: BenchmarkResult, server: FakeWooCommerceServer):
+	"""
+	Record the requests, database queries, wall time and peak memory of the enclosed code in result
+
+	Wall times include the overhead of tracemalloc, so compare them between runs rather than with
+	production timings.
+	"""
+	server.reset_requests()
+
+	with count_queries() as queries:
+		tracemalloc.start()
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			result.wall_time = time.perf_counter() - start
+			result.peak_memory = tracemalloc.get_traced_memory()[1]
+			tracemalloc.stop()
+
+	result.queries = queries["count"]
+	result.requests = server.total_requests()
+
+
+@contextmanager
+def count_queries():
+	"""
+	Count the database queries run by the enclosed code
+	"""
+	queries = {"count": 0}
+	sql = frappe.db.sql
+
+	def counting_sql(*args, **kwargs):
+		queries["count"] += 1
+		return sql(*args, **kwargs)
+
+	frappe.db.sql = counting_sql
+	try:
+		yield queries
+	finally:
+		frappe.db.sql = sql
+
+
+def create_benchmark_server(url: str):
+	"""
+	Add a WooCommerce Server for the fake store, copied from the first existing WooCommerce Server so that
+	it has the accounts, warehouse and mappings of this site, and disable all other servers
+	"""
+	if not (template := frappe.get_all("WooCommerce Server", pluck="name", limit=1)):
+		frappe.throw("Benchmarks need a configured WooCommerce Server to copy their settings from")
+
+	frappe.db.set_value("WooCommerce Server", {"enabled": 1}, "enabled", 0, update_modified=False)
+
+	wc_server = frappe.copy_doc(frappe.get_doc("WooCommerce Server", template[0]))
+	wc_server.update(
+		{
+			"woocommerce_server_url": url,
+			"api_consumer_key": "ck_benchmark",
+			"api_consumer_secret": "cs_benchmark",
+			"enabled": 1,
+			"enabled_sync": 1,
+			"enable_webhooks": 0,
+			"enabled_price_list": 1,
+			"last_items_sync_date": None,
+			"last_orders_sync_date": None,
+		}
+	)
+	wc_server.insert(ignore_permissions=True)
+	return wc_server
+
+
+def create_benchmark_item_prices(wc_server):
+	"""
+	Give every Item linked to the fake store a price that differs from its WooCommerce price
+	"""
+	item_codes = frappe.get_all(
+		"Item WooCommerce Server",
+		filters={"woocommerce_server": wc_server.name, "parenttype": "Item"},
+		pluck="parent",
+	)
+	for item_code in item_codes:
+		frappe.get_doc(
+			{
+				"doctype": "Item Price",
+				"item_code": item_code,
+				"price_list": wc_server.price_list,
+				"price_list_rate": flt(len(item_code)) + 0.5,
+			}
+		).insert(ignore_permissions=True)
+
+
+def clear_benchmark_caches(store: FakeWooCommerceStore, domain: str):
+	"""
+	Remove the fake store's records from the record and response caches, list stats and variation manifests
+	"""
+	records = {
+		("WooCommerce Product", "products"): [*store.products, *store.variations],
+		("WooCommerce Order", "orders"): list(store.orders),
+	}
+	for (doctype, resource), ids in records.items():
+		names = [generate_woocommerce_record_name_from_domain_and_id(domain, id) for id in ids]
+		WooCommerceRecordCache(doctype).delete_records(names)
+		WooCommerceRecordCache(doctype).invalidate()
+		for id in ids:
+			WooCommerceResponseCache(domain, resource).delete(id)
+		remove_record_stats(doctype, names)
+	frappe.cache().delete_value(f"{VARIATION_MANIFEST_CACHE_KEY}::{domain}")
+
+
+def print_report(results: list[BenchmarkResult], store: FakeWooCommerceStore, latency: float):
+	print(
+		f"WooCommerce benchmark: {len(store.products)} products, {len(store.variations)} variations, "
+		f"{len(store.orders)} orders, {len(store.customers)} customers, {latency * 1000:.0f} ms latency"
+	)
+	headers = [
+		"Scenario",
+		"Records",
+		"Requests",
+		"Queries",
+		"Wall (s)",
+		"ms/record",
+		"Requests/record",
+		"Queries/record",
+		"Peak KiB/record",
+		"Errors",
+	]
+	rows = [headers] + [result.as_row() for result in results]
+	widths = [max(len(str(row[i])) for row in rows) for i in range(len(headers))]
+	for row in rows:
+		print("  ".join(str(value).rjust(width) for value, width in zip(row, widths, strict=True)))
+
+	for result in results:
+		for error in result.errors[:5]:
+			print(f"{result.scenario}: {error}")
@@ -3,3 +3,11 @@ from frappe.exceptions import ValidationError
 
 class SyncDisabledError(ValidationError):
 	pass
+
+
+class SyncLockedError(ValidationError):
+	pass
+
+
+class CassetteMissError(ValidationError):
+	pass
@@ -156,14 +156,15 @@ doc_events = {
 # ---------------
 
 scheduler_events = {
-	# 	"all": [
-	# 		"woocommerce_conduit.tasks.all"
-	# 	],
+	"all": [
+		"woocommerce_conduit.tasks.sync_triggers.enqueue_pending_sync_triggers",
+	],
 	# 	"daily": [
 	# 		"woocommerce_conduit.tasks.daily"
 	# 	],
 	"daily_long": [
 		"woocommerce_conduit.tasks.sync_item_prices.run_item_price_sync_in_background",
+		"woocommerce_conduit.tasks.sync_payment_entries.run_payment_entry_sync_in_background",
 	],
 	# 	"hourly": [
 	# 		"woocommerce_conduit.tasks.hourly"
@@ -175,6 +176,9 @@ scheduler_events = {
 	# 	"weekly": [
 	# 		"woocommerce_conduit.tasks.weekly"
 	# 	],
+	"weekly_long": [
+		"woocommerce_conduit.woocommerce_conduit.mirror.reconcile_mirrors",
+	],
 	# 	"monthly": [
 	# 		"woocommerce_conduit.tasks.monthly"
 	# 	],
@@ -252,9 +256,10 @@ scheduler_events = {
 # Automatically update python controller files with type annotations for this app.
 export_python_type_annotations = True
 
-# default_log_clearing_doctypes = {
-# 	"Logging DocType Name": 30  # days to retain logs
-# }
+default_log_clearing_doctypes = {
+	"WooCommerce Sync Profile": 30,  # days to retain logs
+	"WooCommerce Sync Run": 90,
+}
 
 # Fixtrues
 # --------------------------------
@@ -274,6 +279,7 @@ fixtures = [
 					"Sales Order-woocommerce_status",
 					"Sales Order-woocommerce_payment_method",
 					"Sales Order-woocommerce_payment_entry",
+					"Sales Order-woocommerce_payment_sync_skipped",
 					"Sales Order-woocommerce_last_sync_hash",
 					"Sales Order-woocommerce_customer_note",
 					"Sales Order-custom_woocommerce_sync",
@@ -0,0 +1,105 @@
+import frappe
+
+from woocommerce_conduit.tasks.utils import clear_item_sync_caches_on_rollback
+
+# Attempts to add values to an Item Attribute that other workers are modifying at the same time
+MAX_ATTRIBUTE_WRITE_ATTEMPTS = 3
+
+
+class ItemAttributeRegistry:
+	"""
+	Item Attributes and their values, as far as they are known to exist in ERPNext.
+
+	Attributes are loaded with all of their values in one query, the first time they are referenced.
+	Values are only ever added, never removed, so that products and variations that share an attribute,
+	e.g. "Size", don't overwrite each other's values. Attributes without new values are not written to.
+	"""
+
+	def __init__(self):
+		self.values: dict[str, set[str]] = {}
+
+	def load(self, attribute_names: list[str]):
+		"""
+		Load the Item Attributes with the given names and their values, if they have not been loaded yet
+		"""
+		if not (attribute_names := [name for name in attribute_names if name not in self.values]):
+			return
+
+		item_attribute = frappe.qb.DocType("Item Attribute")
+		item_attribute_value = frappe.qb.DocType("Item Attribute Value")
+		rows = (
+			frappe.qb.from_(item_attribute)
+			.left_join(item_attribute_value)
+			.on(
+				(item_attribute_value.parent == item_attribute.name)
+				& (item_attribute_value.parenttype == "Item Attribute")
+			)
+			.select(item_attribute.name, item_attribute_value.attribute_value)
+			.where(item_attribute.name.isin(attribute_names))
+		).run(as_dict=True)
+
+		for row in rows:
+			values = self.values.setdefault(row.name, set())
+			if row.attribute_value is not None:
+				values.add(row.attribute_value)
+
+	def add_values(self, options_by_attribute: dict[str, list[str]]):
+		"""
+		Create missing Item Attributes, and add the options that they don't have yet as values
+
+		Args:
+			options_by_attribute: Options per attribute name, e.g. {"Size": ["S", "M"]}
+		"""
+		self.load(list(options_by_attribute))
+
+		for attribute_name, options in options_by_attribute.items():
+			known_values = self.values.get(attribute_name, set())
+			if new_values := [option for option in dict.fromkeys(options) if option not in known_values]:
+				self.write_values(attribute_name, new_values)
+
+	def write_values(self, attribute_name: str, new_values: list[str]):
+		"""
+		Add values to an Item Attribute, or create it with them, in one write
+		"""
+		for attempt in range(1, MAX_ATTRIBUTE_WRITE_ATTEMPTS + 1):
+			try:
+				if attribute_name in self.values:
+					item_attribute = frappe.get_doc("Item Attribute", attribute_name)
+					existing_values = {row.attribute_value for row in item_attribute.item_attribute_values}
+					if not (values := [value for value in new_values if value not in existing_values]):
+						break
+					add_attribute_values(item_attribute, values)
+					item_attribute.flags.ignore_mandatory = True
+					item_attribute.save()
+				else:
+					item_attribute = frappe.get_doc(
+						{"doctype": "Item Attribute", "attribute_name": attribute_name}
+					)
+					add_attribute_values(item_attribute, new_values)
+					item_attribute.flags.ignore_mandatory = True
+					item_attribute.insert()
+				break
+			except (frappe.DuplicateEntryError, frappe.TimestampMismatchError):
+				# Another worker created or modified the attribute in the meantime, so add to its version
+				if attempt == MAX_ATTRIBUTE_WRITE_ATTEMPTS:
+					raise
+				self.values.setdefault(attribute_name, set())
+
+		self.values.setdefault(attribute_name, set()).update(new_values)
+		# Attributes written in a transaction that is rolled back have to be loaded again
+		if self is getattr(frappe.local, "woocommerce_item_attributes", None):
+			clear_item_sync_caches_on_rollback()
+
+
+def add_attribute_values(item_attribute, values: list[str]):
+	for value in values:
+		row = item_attribute.append("item_attribute_values")
+		row.attribute_value = value
+		row.abbr = value.replace(" ", "")
+
+
+def get_item_attribute_registry() -> ItemAttributeRegistry:
+	"""
+	Get the Item Attribute registry of the current order or sweep, or a new one outside of them
+	"""
+	return getattr(frappe.local, "woocommerce_item_attributes", None) or ItemAttributeRegistry()
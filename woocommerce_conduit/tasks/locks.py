@@ -0,0 +1,89 @@
+import time
+from contextlib import contextmanager
+
+import frappe
+from redis.exceptions import LockError
+
+from woocommerce_conduit.exceptions import SyncLockedError
+
+LOCK_METRICS_CACHE_KEY = "woocommerce_lock_metrics"
+
+# Locks expire after this many seconds, in line with the timeout of the sync jobs
+DEFAULT_LOCK_TIMEOUT = 300
+# How long to wait for a lock held by another worker, unless skipping locked records
+DEFAULT_BLOCKING_TIMEOUT = 60
+# Scheduled sweeps hold a lease for at most this many seconds, in line with the timeout of their jobs
+SWEEP_LEASE_TIMEOUT = 3 * 60 * 60
+
+
+@contextmanager
+def sync_lock(
+	resource: str,
+	key: str,
+	timeout: int = DEFAULT_LOCK_TIMEOUT,
+	blocking_timeout: int = DEFAULT_BLOCKING_TIMEOUT,
+	skip_if_locked: bool = False,
+):
+	"""
+	Hold a Redis lock, shared by all workers, while synchronising a record.
+
+	Args:
+		resource: The kind of record being locked, e.g. "product" or "order"
+		key: Identifies the record, e.g. "site1.example.com~11"
+		timeout: Seconds after which the lock expires, in case the holder dies
+		blocking_timeout: Seconds to wait for the lock if another worker holds it
+		skip_if_locked: Don't wait for the lock if another worker holds it
+
+	Raises:
+		SyncLockedError: If the lock could not be acquired
+	"""
+	cache = frappe.cache()
+	lock = cache.lock(
+		cache.make_key(f"woocommerce_lock:{resource}:{key}"),
+		timeout=timeout,
+		blocking_timeout=blocking_timeout,
+	)
+
+	started = time.monotonic()
+	acquired = lock.acquire(blocking=not skip_if_locked)
+	record_lock_metrics(resource, waited=time.monotonic() - started, acquired=acquired)
+
+	if not acquired:
+		raise SyncLockedError(f"WooCommerce {resource} {key} is being synchronised by another worker")
+
+	try:
+		yield
+	finally:
+		try:
+			lock.release()
+		except LockError:
+			# The lock expired (and may have been acquired by another worker) before we finished
+			pass
+
+
+def record_lock_metrics(resource: str, waited: float, acquired: bool):
+	"""
+	Keep running totals of lock acquisitions, wait times and skipped/timed out records per resource
+	"""
+	cache = frappe.cache()
+	key = cache.make_key(LOCK_METRICS_CACHE_KEY)
+	try:
+		pipeline = cache.pipeline()
+		pipeline.hincrby(key, f"{resource}:acquired" if acquired else f"{resource}:not_acquired", 1)
+		pipeline.hincrbyfloat(key, f"{resource}:wait_seconds", waited)
+		pipeline.execute()
+	except Exception:
+		# Metrics should never break a sync
+		pass
+
+
+@frappe.whitelist()
+def get_lock_metrics() -> dict[str, float]:
+	"""
+	Return lock metrics, e.g. {"product:acquired": 10, "product:not_acquired": 1, "product:wait_seconds": 2.5}
+	"""
+	frappe.only_for("System Manager")
+	cache = frappe.cache()
+	# Read through a raw pipeline, as the values are plain numbers rather than pickled objects
+	(metrics,) = cache.pipeline().hgetall(cache.make_key(LOCK_METRICS_CACHE_KEY)).execute()
+	return {frappe.safe_decode(field): float(value) for field, value in metrics.items()}
@@ -12,9 +12,12 @@ class SynchroniseWooCommerce:
 	"""
 
 	servers: list[WooCommerceServer | _dict]
+	# Outcome of the synchronisation for sync run ledgers: "Created", "Updated" or "Skipped"
+	outcome: str
 
 	def __init__(self, servers: list[WooCommerceServer | _dict] | None = None) -> None:
 		self.servers = servers if servers else self.get_wc_servers()
+		self.outcome = "Skipped"
 
 	@staticmethod
 	def get_wc_servers() -> list[WooCommerceServer | _dict]:
@@ -10,6 +10,7 @@ from woocommerce_conduit.woocommerce_conduit.doctype.woocommerce_product.woocomm
 from woocommerce_conduit.woocommerce_conduit.doctype.woocommerce_server.woocommerce_server import (
 	WooCommerceServer,
 )
+from woocommerce_conduit.woocommerce_conduit.profiling import profile_phase, profile_sync
 from woocommerce_conduit.woocommerce_conduit.woocommerce_api import (
 	generate_woocommerce_record_name_from_domain_and_id,
 )
@@ -62,11 +63,13 @@ class SynchroniseItemPrice(SynchroniseWooCommerce):
 		"""
 		Run synchornisation
 		"""
-		for server in self.servers:
-			self.wc_server = server
-			self.get_erpnext_item_prices()
-			# self.sync_items_with_woocommerce_products()
+		with profile_sync("Item Price", lambda: self.item_code):
+			for server in self.servers:
+				self.wc_server = server
+				self.get_erpnext_item_prices()
+				# self.sync_items_with_woocommerce_products()
 
+	@profile_phase("item_prices")
 	def get_erpnext_item_prices(self) -> None:
 		"""
 		Get list of ERPNext Item Prices to synchronise,
@@ -97,6 +100,7 @@ class SynchroniseItemPrice(SynchroniseWooCommerce):
 				.run(as_dict=True)
 			)
 
+	@profile_phase("products")
 	def sync_items_with_woocommerce_products(self) -> None:
 		"""
 		Synchronise Item Prices with WooCommerce Products
@@ -113,6 +117,7 @@ class SynchroniseItemPrice(SynchroniseWooCommerce):
 			)  # type: ignore
 
 			try:
+				wc_product.flags.skip_mirror = True
 				wc_product.load_from_db()
 
 				# If self.item_price_doc is set, set the price_list_rate accordingly, else use the price_list_rate from the price list
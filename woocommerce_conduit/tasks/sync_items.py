@@ -1,16 +1,31 @@
+import functools
+import hashlib
 import json
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime
 
 import frappe
 from erpnext.stock.doctype.item.item import Item
 from frappe import ValidationError, _, _dict
+from frappe.model import numeric_fieldtypes
 from frappe.query_builder import Criterion
 from frappe.utils import get_datetime, now
+from jsonpath_ng import JSONPath
 from jsonpath_ng.ext import parse
 
-from woocommerce_conduit.exceptions import SyncDisabledError
+from woocommerce_conduit.exceptions import SyncDisabledError, SyncLockedError
+from woocommerce_conduit.tasks.item_attributes import ItemAttributeRegistry, get_item_attribute_registry
+from woocommerce_conduit.tasks.locks import SWEEP_LEASE_TIMEOUT, sync_lock
 from woocommerce_conduit.tasks.sync import SynchroniseWooCommerce
+from woocommerce_conduit.tasks.sync_runs import SyncRun
+from woocommerce_conduit.tasks.sync_triggers import queue_sync_trigger
+from woocommerce_conduit.tasks.utils import (
+	SWEEP_PAGE_LENGTH,
+	clear_item_sync_caches_on_rollback,
+	get_sweep_checkpoint,
+	is_polling_due,
+)
 from woocommerce_conduit.woocommerce_conduit.doctype.item_woocommerce_server.item_woocommerce_server import (
 	ItemWooCommerceServer,
 )
@@ -23,6 +38,7 @@ from woocommerce_conduit.woocommerce_conduit.doctype.woocommerce_server.woocomme
 from woocommerce_conduit.woocommerce_conduit.doctype.woocommerce_settings.woocommerce_settings import (
 	WooCommerceSettings,
 )
+from woocommerce_conduit.woocommerce_conduit.profiling import measure_costs, profile_phase, profile_sync
 from woocommerce_conduit.woocommerce_conduit.woocommerce_api import (
 	generate_woocommerce_record_name_from_domain_and_id,
 )
@@ -37,37 +53,152 @@ def run_item_sync_from_hook(doc, method):
 	Intended to be triggered by a Document Controller hook from Item
 	"""
 	if doc.doctype == "Item" and not doc.flags.get("created_by_sync", None) and doc.woocommerce_servers:
+		woocommerce_servers = {
+			row.woocommerce_server
+			for row in doc.woocommerce_servers
+			if row.enable_sync and row.woocommerce_server
+		}
+		if not woocommerce_servers:
+			return
+
 		frappe.msgprint(
 			_("Background sync to WooCommerce triggered for {0} {1}").format(frappe.bold(doc.name), method),
 			indicator="blue",
 			alert=True,
 		)
-		frappe.enqueue(clear_sync_hash_and_run_item_sync, item_code=doc.name)
+		for woocommerce_server in woocommerce_servers:
+			queue_sync_trigger("Item", doc.name, woocommerce_server)
+
+
+def run_item_sync_from_trigger(item_code: str, woocommerce_server: str):
+	"""
+	Synchronise an Item with one WooCommerce Server, intended to be called for a (debounced) sync trigger
+	"""
+	item: SyncedItem = frappe.get_doc("Item", item_code)  # type: ignore
+	for row in item.woocommerce_servers:
+		if row.woocommerce_server != woocommerce_server or not row.enable_sync:
+			continue
+		sync = SynchroniseItem(item=ERPNextItemToSync(item=item, item_woocommerce_server_idx=row.idx))
+		sync.run()
+
+
+@contextmanager
+def parent_item_cache():
+	"""
+	Synchronise every parent product at most once in the enclosed code, e.g. for all variations in an
+	order or a sweep, and reuse its Item for its variations. Item Attributes are loaded at most once, too
+	"""
+	if get_parent_item_cache() is not None:
+		yield
+		return
+
+	frappe.local.woocommerce_parent_items = {}
+	frappe.local.woocommerce_item_attributes = ItemAttributeRegistry()
+	try:
+		yield
+	finally:
+		frappe.local.woocommerce_parent_items = None
+		frappe.local.woocommerce_item_attributes = None
+
+
+def get_parent_item_cache() -> dict[str, SyncedItem | None] | None:
+	return getattr(frappe.local, "woocommerce_parent_items", None)
 
 
 def sync_woocommerce_products_modified_since(date_time_from=None):
 	"""
-	Get list of WooCommerce products modified since date_time_from
+	Enqueue a job per enabled WooCommerce Server to synchronise products modified since date_time_from.
+
+	Each server is synchronised (and checkpointed) independently, so a large shop's backlog does not
+	delay a small one. Deduplicated job IDs prevent a server's sweep from being queued twice.
 	"""
-	settings: WooCommerceSettings = frappe.get_cached_doc("WooCommerce Settings")  # type: ignore
+	for woocommerce_server in frappe.get_all("WooCommerce Server", filters={"enabled": 1}, pluck="name"):
+		frappe.enqueue(
+			sync_woocommerce_products_modified_since_for_server,
+			queue="long",
+			timeout=SWEEP_LEASE_TIMEOUT,
+			job_id=f"woocommerce_products_modified_since::{woocommerce_server}",
+			deduplicate=True,
+			woocommerce_server=woocommerce_server,
+			date_time_from=date_time_from,
+		)
 
-	if not date_time_from:
-		date_time_from = getattr(settings, "wc_last_sync_date_items", None)
 
-	wc_products = get_list_of_wc_products(date_time_from=date_time_from)
+def sync_woocommerce_products_modified_since_for_server(woocommerce_server: str, date_time_from=None):
+	"""
+	Get list of WooCommerce products on a WooCommerce Server modified since date_time_from
+	"""
+	try:
+		# Only one sweep per server may run at a time, even if a previous one overruns its schedule
+		with sync_lock(
+			"products_sweep", woocommerce_server, timeout=SWEEP_LEASE_TIMEOUT, skip_if_locked=True
+		):
+			sweep_started = now()
+			trigger = "Manual" if date_time_from else "Scheduled"
+
+			if not date_time_from:
+				settings: WooCommerceSettings = frappe.get_cached_doc("WooCommerce Settings")  # type: ignore
+				date_time_from = frappe.db.get_value(
+					"WooCommerce Server", woocommerce_server, "last_items_sync_date"
+				) or getattr(settings, "wc_last_sync_date_items", None)
+
+				# When webhooks keep records current, scheduled polling only runs as a low-frequency reconciliation sweep
+				if not is_polling_due(date_time_from):
+					return
+
+			with measure_costs() as costs, parent_item_cache():
+				run = SyncRun("Items", woocommerce_server, date_time_from, trigger=trigger)
+				try:
+					wc_products = get_list_of_wc_products(
+						date_time_from=date_time_from, woocommerce_server=woocommerce_server
+					)
 
-	for wc_product in wc_products:
-		try:
-			run_item_sync(woocommerce_product=wc_product, enqueue=True)
-		# Skip items with errors, as these exceptions will be logged
-		except Exception as e:
-			frappe.log_error("Item sync error", f"There was an exception when syncing an item: {e!s}")
-			break
+					# Every product is synchronised in its own transaction, so one failing product is
+					# recorded in the sync run and retried in the next one, without stopping the sweep.
+					# Records that are being synchronised by a hook or webhook right now are skipped
+					for wc_product in wc_products:
+						run.sync(
+							wc_product.get("name"),
+							lambda wc_product=wc_product: sync_woocommerce_product(wc_product),
+						)
+					for woocommerce_product_name in run.get_retries():
+						run.sync(
+							woocommerce_product_name,
+							lambda name=woocommerce_product_name: sync_woocommerce_product(name=name),
+						)
+				except Exception:
+					run.finish(costs, error=frappe.get_traceback())
+					raise
+				run.finish(costs)
+
+			# Checkpoint from when the sweep started, so that products modified during the sweep are not missed,
+			# unless the sweep was cut short before it reached them
+			frappe.db.set_value(
+				"WooCommerce Server",
+				woocommerce_server,
+				"last_items_sync_date",
+				# Variations are listed after the products they belong to
+				get_sweep_checkpoint(
+					[wc_product for wc_product in wc_products if wc_product.get("type") != "variation"],
+					sweep_started,
+				),
+				update_modified=False,
+			)
+	except SyncLockedError:
+		return
 
-	settings.reload()
-	settings.wc_last_sync_date_items = now()
-	settings.flags.ignore_mandatory = True
-	settings.save()
+
+def sync_woocommerce_product(
+	woocommerce_product: WooCommerceProduct | None = None, name: str | None = None
+) -> str:
+	"""
+	Synchronise a WooCommerce Product during a sweep, and return the outcome for the sync run
+	"""
+	sync = get_woocommerce_product_sync(
+		woocommerce_product_name=name, woocommerce_product=woocommerce_product, skip_if_locked=True
+	)
+	sync.run()
+	return sync.outcome
 
 
 @frappe.whitelist()
@@ -77,6 +208,7 @@ def run_item_sync(
 	woocommerce_product_name: str | None = None,
 	woocommerce_product: WooCommerceProduct | None = None,
 	enqueue: bool = False,
+	skip_if_locked: bool = False,
 ) -> tuple[SyncedItem | None, WooCommerceProduct | None]:
 	"""
 	Synchronize an ERPNext Item with its corresponding WooCommerce Product.
@@ -91,6 +223,7 @@ def run_item_sync(
 	    woocommerce_product_name: Name of WooCommerce Product to synchronize
 	    woocommerce_product: WooCommerce Product document to synchronize
 	    enqueue: Whether to process synchronization in background
+	    skip_if_locked: Skip the synchronization if another worker is synchronizing the same record
 
 	Returns:
 	    tuple: (ERPNext Item, WooCommerce Product) after synchronization
@@ -112,51 +245,12 @@ def run_item_sync(
 
 	# Case 1: Sync initiated from WooCommerce side
 	if woocommerce_product_name or wc_product:
-		# Check if we need to load the product from the database
-		load_full_product = False
-
-		# If only name provided, we need to load the product
-		if not wc_product and woocommerce_product_name:
-			load_full_product = True
-			lookup_name = woocommerce_product_name
-		# If product provided but might be a partial/list view product
-		elif wc_product:
-			lookup_name = wc_product.get("name")
-			# Check for essential fields that would only exist in a full product
-			# List view products typically only have name, id, date_created, date_modified, type, sku, status
-			# Full products have many more fields like description, price, stock_quantity, etc.
-			required_full_fields = ["description", "price", "regular_price", "stock_status"]
-
-			# If any of these fields are missing or None, we need to reload
-			if isinstance(wc_product, dict):
-				load_full_product = any(not wc_product.get(field) for field in required_full_fields)
-			else:
-				load_full_product = any(
-					not getattr(wc_product, field, None) for field in required_full_fields
-				)
-
-		if load_full_product:
-			try:
-				# Load the full product with all fields from the database
-				full_wc_product: WooCommerceProduct = frappe.get_doc(
-					{"doctype": "WooCommerce Product", "name": lookup_name}
-				)  # type: ignore
-				full_wc_product.load_from_db()
-
-				# Validate WooCommerce product has required fields
-				if not full_wc_product.woocommerce_server or not full_wc_product.woocommerce_id:
-					raise ValueError(
-						f"WooCommerce Product {full_wc_product.name} is missing required fields: "
-						f"server={full_wc_product.woocommerce_server}, id={full_wc_product.woocommerce_id}"
-					)
-
-				wc_product = full_wc_product
-
-			except frappe.DoesNotExistError:
-				frappe.throw(_(f"WooCommerce Product {lookup_name} not found"))
-
-		# Initialize synchronization
-		sync = SynchroniseItem(woocommerce_product=wc_product)
+		sync = get_woocommerce_product_sync(
+			woocommerce_product_name=woocommerce_product_name,
+			woocommerce_product=wc_product,
+			skip_if_locked=skip_if_locked,
+		)
+		wc_product = sync.woocommerce_product
 
 		# Execute sync now or in background
 		if enqueue:
@@ -190,7 +284,8 @@ def run_item_sync(
 
 			# Initialize synchronization for this server
 			sync = SynchroniseItem(
-				item=ERPNextItemToSync(item=erpnext_item, item_woocommerce_server_idx=wc_server.idx)
+				item=ERPNextItemToSync(item=erpnext_item, item_woocommerce_server_idx=wc_server.idx),
+				skip_if_locked=skip_if_locked,
 			)
 
 			# Execute sync now or in background
@@ -215,6 +310,63 @@ def run_item_sync(
 		return None, None
 
 
+def get_woocommerce_product_sync(
+	woocommerce_product_name: str | None = None,
+	woocommerce_product: WooCommerceProduct | None = None,
+	skip_if_locked: bool = False,
+) -> "SynchroniseItem":
+	"""
+	Get the synchronisation of a WooCommerce Product with its ERPNext Item, loading the full product if
+	only its name or its fields from a list view are given
+	"""
+	wc_product = woocommerce_product
+
+	# Check if we need to load the product from the database
+	load_full_product = False
+
+	# If only name provided, we need to load the product
+	if not wc_product and woocommerce_product_name:
+		load_full_product = True
+		lookup_name = woocommerce_product_name
+	# If product provided but might be a partial/list view product
+	elif wc_product:
+		lookup_name = wc_product.get("name")
+		# Check for essential fields that would only exist in a full product
+		# List view products typically only have name, id, date_created, date_modified, type, sku, status
+		# Full products have many more fields like description, price, stock_quantity, etc.
+		required_full_fields = ["description", "price", "regular_price", "stock_status"]
+
+		# If any of these fields are missing or None, we need to reload
+		if isinstance(wc_product, dict):
+			load_full_product = any(not wc_product.get(field) for field in required_full_fields)
+		else:
+			load_full_product = any(not getattr(wc_product, field, None) for field in required_full_fields)
+
+	if load_full_product:
+		try:
+			# Load the full product with all fields from the database
+			full_wc_product: WooCommerceProduct = frappe.get_doc(
+				{"doctype": "WooCommerce Product", "name": lookup_name}
+			)  # type: ignore
+			# Synchronisation needs the current record from WooCommerce, not a local copy
+			full_wc_product.flags.skip_mirror = True
+			full_wc_product.load_from_db()
+
+			# Validate WooCommerce product has required fields
+			if not full_wc_product.woocommerce_server or not full_wc_product.woocommerce_id:
+				raise ValueError(
+					f"WooCommerce Product {full_wc_product.name} is missing required fields: "
+					f"server={full_wc_product.woocommerce_server}, id={full_wc_product.woocommerce_id}"
+				)
+
+			wc_product = full_wc_product
+
+		except frappe.DoesNotExistError:
+			frappe.throw(_(f"WooCommerce Product {lookup_name} not found"))
+
+	return SynchroniseItem(woocommerce_product=wc_product, skip_if_locked=skip_if_locked)
+
+
 @dataclass
 class ERPNextItemToSync:
 	"""Class for keeping track of an ERPNext Item and the relevant WooCommerce Server to sync to"""
@@ -237,10 +389,12 @@ class SynchroniseItem(SynchroniseWooCommerce):
 		servers: list[WooCommerceServer | _dict] | None = None,
 		item: ERPNextItemToSync | None = None,
 		woocommerce_product: WooCommerceProduct | None = None,
+		skip_if_locked: bool = False,
 	) -> None:
 		super().__init__(servers)
 		self.item = item
 		self.woocommerce_product = woocommerce_product  # type: ignore
+		self.skip_if_locked = skip_if_locked
 		self.settings: WooCommerceSettings = frappe.get_cached_doc("WooCommerce Settings")  # type: ignore
 
 	def run(self):
@@ -248,8 +402,18 @@ class SynchroniseItem(SynchroniseWooCommerce):
 		Run synchronisation
 		"""
 		try:
-			self.get_corresponding_item_or_product()
-			self.sync_wc_product_with_erpnext_item()
+			with (
+				sync_lock("product", self.get_lock_key(), skip_if_locked=self.skip_if_locked),
+				profile_sync("Item", self.get_lock_key),
+				parent_item_cache(),
+			):
+				self.get_corresponding_item_or_product()
+				self.sync_wc_product_with_erpnext_item()
+		except SyncLockedError:
+			# Another worker is synchronising this record right now
+			if self.skip_if_locked:
+				return
+			raise
 		except Exception as err:
 			try:
 				woocommerce_product_dict = (
@@ -266,9 +430,26 @@ class SynchroniseItem(SynchroniseWooCommerce):
 				woocommerce_product_dict = self.woocommerce_product
 				item_dict = self.item.item if self.item else None
 			error_message = f"{frappe.get_traceback()}\n\nItem Data: \n{str(item_dict) if self.item else ''}\n\nWC Product Data \n{str(woocommerce_product_dict) if self.woocommerce_product else ''})"
-			frappe.log_error("WooCommerce Error", error_message)
+			# Deferred, so that the log is kept when the caller rolls back the failed synchronisation
+			frappe.log_error("WooCommerce Error", error_message, defer_insert=True)
 			raise err
 
+	def get_lock_key(self) -> str:
+		"""
+		Identify the WooCommerce Product (or, if it is not linked yet, the Item) being synchronised
+		"""
+		if self.woocommerce_product:
+			return generate_woocommerce_record_name_from_domain_and_id(
+				self.woocommerce_product.woocommerce_server, self.woocommerce_product.woocommerce_id
+			)
+		if self.item and self.item.item_woocommerce_server.woocommerce_id:
+			return generate_woocommerce_record_name_from_domain_and_id(
+				self.item.item_woocommerce_server.woocommerce_server,
+				self.item.item_woocommerce_server.woocommerce_id,
+			)
+		return f"Item {self.item.item.name if self.item else None}"
+
+	@profile_phase("load")
 	def get_corresponding_item_or_product(self):
 		"""
 		If we have an ERPNext Item, get the corresponding WooCommerce Product
@@ -290,6 +471,7 @@ class SynchroniseItem(SynchroniseWooCommerce):
 			self.woocommerce_product: WooCommerceProduct = frappe.get_doc(
 				{"doctype": "WooCommerce Product", "name": wc_products[0]["name"]}  # type: ignore
 			)
+			self.woocommerce_product.flags.skip_mirror = True
 			self.woocommerce_product.load_from_db()
 
 		if self.woocommerce_product and not self.item:
@@ -341,22 +523,36 @@ class SynchroniseItem(SynchroniseWooCommerce):
 			pass
 		elif self.woocommerce_product and not self.item:
 			# create missing item in ERPNext
+			self.outcome = "Created"
 			self.create_item()
 		elif self.item and self.woocommerce_product and self.item.item_woocommerce_server.enable_sync:
-			# both exist, check sync hash
-			if (
-				self.woocommerce_product.woocommerce_date_modified
-				!= self.item.item_woocommerce_server.woocommerce_last_sync_hash
-			):
-				if get_datetime(self.woocommerce_product.woocommerce_date_modified) > get_datetime(
-					self.item.item.modified
-				):  # type: ignore
+			# both exist, compare the mapped fields on both sides with the ones of the last synchronisation
+			product_hash, item_hash = self.get_content_hashes()
+			last_hash = self.item.item_woocommerce_server.woocommerce_content_hash
+
+			if product_hash == item_hash:
+				# Nothing that is synchronised has changed, e.g. only review counts or total sales did
+				if last_hash != product_hash:
+					self.set_sync_hash(product_hash)
+			elif product_hash == last_hash:
+				# Only the Item changed since the last synchronisation
+				self.outcome = "Updated"
+				self.update_woocommerce_product()
+			elif item_hash == last_hash:
+				# Only the WooCommerce Product changed since the last synchronisation
+				self.outcome = "Updated"
+				self.update_item()
+			else:
+				# Both changed, or they were never synchronised, so the last one to be modified wins
+				product_modified = get_datetime(self.woocommerce_product.woocommerce_date_modified)
+				if product_modified > get_datetime(self.item.item.modified):  # type: ignore
+					self.outcome = "Updated"
 					self.update_item()
-				if get_datetime(self.woocommerce_product.woocommerce_date_modified) < get_datetime(
-					self.item.item.modified
-				):  # type: ignore
+				elif product_modified < get_datetime(self.item.item.modified):  # type: ignore
+					self.outcome = "Updated"
 					self.update_woocommerce_product()
 
+	@profile_phase("item")
 	def update_item(self):
 		"""
 		Update the ERPNext Item with fields from it's corresponding WooCommerce Product
@@ -389,6 +585,7 @@ class SynchroniseItem(SynchroniseWooCommerce):
 
 		self.set_sync_hash()
 
+	@profile_phase("product")
 	def update_woocommerce_product(self):
 		"""
 		Update the WooCommerce Product with fields from it's corresponding ERPNext Item
@@ -412,6 +609,7 @@ class SynchroniseItem(SynchroniseWooCommerce):
 
 		self.set_sync_hash()
 
+	@profile_phase("item")
 	def create_item(self):
 		"""
 		Create a new ERPNext Item from a WooCommerce Product.
@@ -454,6 +652,7 @@ class SynchroniseItem(SynchroniseWooCommerce):
 		# Update sync hash
 		self.set_sync_hash()
 
+	@profile_phase("variants")
 	def _handle_product_variants(self, item: SyncedItem):
 		"""
 		Handle variant-related setup for the item based on product type.
@@ -464,6 +663,11 @@ class SynchroniseItem(SynchroniseWooCommerce):
 		if not self.woocommerce_product:
 			return
 
+		# Synchronise the parent first, so that its Item exists before its variations
+		parent_item = None
+		if self.woocommerce_product.type == "variation":
+			parent_item = self._get_or_create_parent_item()
+
 		# Handle variants based on product type
 		if self.woocommerce_product.type in ["variable", "variation"]:
 			self.create_or_update_item_attributes()
@@ -480,12 +684,10 @@ class SynchroniseItem(SynchroniseWooCommerce):
 		# Set up variant configuration
 		if self.woocommerce_product.type == "variable":
 			item.has_variants = 1
-		elif self.woocommerce_product.type == "variation":
-			# Check if parent exists and set variant_of
-			parent_item = self._get_or_create_parent_item()
-			if parent_item:
-				item.variant_of = parent_item.item_code
+		elif self.woocommerce_product.type == "variation" and parent_item:
+			item.variant_of = parent_item.item_code
 
+	@profile_phase("parent_item")
 	def _get_or_create_parent_item(self):
 		"""
 		Get or create parent item for a variation product.
@@ -499,7 +701,19 @@ class SynchroniseItem(SynchroniseWooCommerce):
 		woocommerce_product_name = generate_woocommerce_record_name_from_domain_and_id(
 			self.woocommerce_product.woocommerce_server, self.woocommerce_product.parent_id
 		)
-		parent_item, parent_wc_product = run_item_sync(woocommerce_product_name=woocommerce_product_name)
+
+		# Parents are synchronised once per order or sweep, rather than once for every variation
+		parent_items = get_parent_item_cache()
+		if parent_items is not None and woocommerce_product_name in parent_items:
+			return parent_items[woocommerce_product_name]
+
+		sync = get_woocommerce_product_sync(woocommerce_product_name=woocommerce_product_name)
+		sync.run()
+		parent_item = sync.item.item if sync.item else None
+		if parent_items is not None:
+			parent_items[woocommerce_product_name] = parent_item
+			# The parent's Item is gone if the transaction that synchronised it is rolled back
+			clear_item_sync_caches_on_rollback()
 		return parent_item
 
 	def _set_core_item_fields(self, item: SyncedItem, wc_server: WooCommerceServer):
@@ -534,39 +748,24 @@ class SynchroniseItem(SynchroniseWooCommerce):
 		if wc_server.enable_image_sync and self.woocommerce_product.image:
 			item.image = self.woocommerce_product.image
 
+	@profile_phase("attributes")
 	def create_or_update_item_attributes(self):
 		"""
-		Create or update Item Attributes with better code organization
+		Create missing Item Attributes and add the product's options that they don't have yet. All of the
+		product's attributes are loaded in one query, and each attribute is written to at most once
 		"""
 		if not self.woocommerce_product or not self.woocommerce_product.attributes:
 			return
 
 		wc_attributes = json.loads(self.woocommerce_product.attributes)
 
+		options_by_attribute: dict[str, list[str]] = {}
 		for wc_attribute in wc_attributes:
-			attribute_name = wc_attribute["name"]
-			item_attribute = self._get_or_create_attribute(attribute_name)
-
-			# Get attribute options based on product type
-			options = self._get_attribute_options(wc_attribute)
-
-			# Update attribute values if needed
-			if self._should_update_attribute_values(item_attribute, options):
-				self._update_attribute_values(item_attribute, options)
+			options_by_attribute.setdefault(wc_attribute["name"], []).extend(
+				self._get_attribute_options(wc_attribute)
+			)
 
-			# Save the attribute
-			item_attribute.flags.ignore_mandatory = True
-			if not item_attribute.name:
-				item_attribute.insert()
-			else:
-				item_attribute.save()
-
-	def _get_or_create_attribute(self, attribute_name):
-		"""Helper method to get or create an attribute"""
-		if frappe.db.exists("Item Attribute", attribute_name):
-			return frappe.get_doc("Item Attribute", attribute_name)
-		else:
-			return frappe.get_doc({"doctype": "Item Attribute", "attribute_name": attribute_name})
+		get_item_attribute_registry().add_values(options_by_attribute)
 
 	def _get_attribute_options(self, wc_attribute):
 		"""Helper method to get attribute options"""
@@ -578,20 +777,6 @@ class SynchroniseItem(SynchroniseWooCommerce):
 			else [wc_attribute["option"]]
 		)
 
-	def _should_update_attribute_values(self, item_attribute, options):
-		"""Helper method to determine if attribute values need updating"""
-		return len(item_attribute.item_attribute_values) == 0 or set(options) != set(
-			[val.attribute_value for val in item_attribute.item_attribute_values]
-		)
-
-	def _update_attribute_values(self, item_attribute, options):
-		"""Helper method to update attribute values"""
-		item_attribute.item_attribute_values = []
-		for option in options:
-			row = item_attribute.append("item_attribute_values")
-			row.attribute_value = option
-			row.abbr = option.replace(" ", "")
-
 	def set_item_fields(self, item: SyncedItem) -> tuple[bool, SyncedItem]:
 		"""
 		Synchronize values from WooCommerce fields to ERPNext item fields
@@ -612,7 +797,7 @@ class SynchroniseItem(SynchroniseWooCommerce):
 		)  # type: ignore
 
 		# Exit early if no field mappings exist
-		if not wc_server.item_field_map:
+		if not (item_field_map := get_item_field_map(wc_server)):
 			return False, item
 
 		# Deserialize product data for JSONPath operations
@@ -623,14 +808,9 @@ class SynchroniseItem(SynchroniseWooCommerce):
 		item_modified = False
 
 		# Process each field mapping
-		for field_map in wc_server.item_field_map:
-			# Parse ERPNext field name
-			erpnext_field_parts = field_map.erpnext_field_name.split(" | ")
-			erpnext_field_name = erpnext_field_parts[0]
-
+		for erpnext_field_name, woocommerce_field_name, jsonpath_expr in item_field_map:
 			# Extract WooCommerce field value using JSONPath
 			try:
-				jsonpath_expr = parse(field_map.woocommerce_field_name)
 				matches = jsonpath_expr.find(wc_product_data)
 
 				if not matches:
@@ -638,13 +818,16 @@ class SynchroniseItem(SynchroniseWooCommerce):
 
 				wc_field_value = matches[0].value
 
-				# Update ERPNext item field
-				setattr(item, erpnext_field_name, wc_field_value)
-				item_modified = True
+				# Update ERPNext item field if values differ
+				numeric = is_numeric_field(erpnext_field_name, woocommerce_field_name)
+				item_value = normalise_content_value(item.get(erpnext_field_name), numeric)
+				if item_value != normalise_content_value(wc_field_value, numeric):
+					setattr(item, erpnext_field_name, wc_field_value)
+					item_modified = True
 
 			except Exception as e:
 				frappe.log_error(
-					f"Error mapping field {field_map.woocommerce_field_name} to {erpnext_field_name}: {e!s}",
+					f"Error mapping field {woocommerce_field_name} to {erpnext_field_name}: {e!s}",
 					"WooCommerce Field Mapping Error",
 				)
 
@@ -667,7 +850,7 @@ class SynchroniseItem(SynchroniseWooCommerce):
 		)  # type: ignore
 
 		# Exit early if no field mappings exist
-		if not wc_server.item_field_map:
+		if not (item_field_map := get_item_field_map(wc_server)):
 			return False
 
 		# Deserialize WooCommerce product attributes for JSONPath operations
@@ -678,17 +861,12 @@ class SynchroniseItem(SynchroniseWooCommerce):
 		wc_product_modified = False
 
 		# Process each field mapping
-		for field_map in wc_server.item_field_map:
-			# Parse ERPNext field name
-			erpnext_field_parts = field_map.erpnext_field_name.split(" | ")
-			erpnext_field_name = erpnext_field_parts[0]
-
+		for erpnext_field_name, woocommerce_field_name, jsonpath_expr in item_field_map:
 			# Get item field value
 			try:
 				erpnext_field_value = getattr(self.item.item, erpnext_field_name)
 
 				# Find target field in WooCommerce product using JSONPath
-				jsonpath_expr = parse(field_map.woocommerce_field_name)
 				matches = jsonpath_expr.find(wc_product_data)
 
 				if not matches:
@@ -696,7 +874,7 @@ class SynchroniseItem(SynchroniseWooCommerce):
 						# Strict check for existing products - field should exist
 						raise ValueError(
 							_("Field <code>{0}</code> not found in WooCommerce Product {1}").format(
-								field_map.woocommerce_field_name, self.woocommerce_product.name
+								woocommerce_field_name, self.woocommerce_product.name
 							)
 						)
 					else:
@@ -717,7 +895,7 @@ class SynchroniseItem(SynchroniseWooCommerce):
 				)
 			except Exception as e:
 				frappe.log_error(
-					f"Error mapping field {erpnext_field_name} to {field_map.woocommerce_field_name}: {e!s}",
+					f"Error mapping field {erpnext_field_name} to {woocommerce_field_name}: {e!s}",
 					"WooCommerce Field Mapping Error",
 				)
 
@@ -729,24 +907,78 @@ class SynchroniseItem(SynchroniseWooCommerce):
 
 		return wc_product_modified
 
-	def set_sync_hash(self):
+	def get_content_hashes(self) -> tuple[str, str]:
 		"""
-		Set the last sync hash value using db.set_value, as it does not call the ORM triggers
-		and it does not update the modified timestamp (by using the update_modified parameter)
+		Get hashes of the synchronised fields of the WooCommerce Product and of the ERPNext Item: the name,
+		the image if image sync is enabled, and the fields in the Item Field Map.
+
+		Fields that the WooCommerce Product does not have are left out of both, as they are not synchronised.
+
+		Returns:
+			tuple: (hash of the WooCommerce Product, hash of the ERPNext Item)
+		"""
+		wc_server: WooCommerceServer = frappe.get_cached_doc(
+			"WooCommerce Server", self.woocommerce_product.woocommerce_server
+		)  # type: ignore
+		item = self.item.item
+
+		product_values = {"item_name": self.woocommerce_product.woocommerce_name}
+		item_values = {"item_name": item.item_name}
+		# Images are only synchronised from products that have one
+		if wc_server.enable_image_sync and self.woocommerce_product.image:
+			product_values["image"] = self.woocommerce_product.image
+			item_values["image"] = item.image
+		numeric_fields = set()
+
+		if item_field_map := get_item_field_map(wc_server):
+			wc_product_data = self.woocommerce_product.deserialize_attributes_of_type_dict_or_list(
+				self.woocommerce_product.to_dict()
+			)
+			for erpnext_field_name, woocommerce_field_name, jsonpath_expr in item_field_map:
+				try:
+					matches = jsonpath_expr.find(wc_product_data)
+				except Exception:
+					# Mapping errors are logged when the fields are set
+					continue
+				if matches:
+					product_values[erpnext_field_name] = matches[0].value
+					item_values[erpnext_field_name] = item.get(erpnext_field_name)
+					if is_numeric_field(erpnext_field_name, woocommerce_field_name):
+						numeric_fields.add(erpnext_field_name)
+
+		return (
+			get_content_hash(product_values, numeric_fields),
+			get_content_hash(item_values, numeric_fields),
+		)
+
+	@profile_phase("sync_hash")
+	def set_sync_hash(self, content_hash: str | None = None):
+		"""
+		Set the last sync hash and content hash values using db.set_value, as it does not call the ORM
+		triggers and it does not update the modified timestamp (by using the update_modified parameter)
 		"""
 		if not self.woocommerce_product or not self.item:
 			return
+
+		if content_hash is None:
+			content_hash, _item_hash = self.get_content_hashes()
+
 		frappe.db.set_value(
 			"Item WooCommerce Server",
 			self.item.item_woocommerce_server.name,
-			"woocommerce_last_sync_hash",
-			self.woocommerce_product.woocommerce_date_modified,
+			{
+				"woocommerce_last_sync_hash": self.woocommerce_product.woocommerce_date_modified,
+				"woocommerce_content_hash": content_hash,
+			},
 			update_modified=False,
 		)
+		self.item.item_woocommerce_server.woocommerce_content_hash = content_hash
 
 
 def get_list_of_wc_products(
-	item: ERPNextItemToSync | None = None, date_time_from: datetime | None = None
+	item: ERPNextItemToSync | None = None,
+	date_time_from: datetime | None = None,
+	woocommerce_server: str | None = None,
 ) -> list[WooCommerceProduct]:
 	"""
 	Fetches a list of WooCommerce Products within a specified date range or linked with an Item.
@@ -757,13 +989,14 @@ def get_list_of_wc_products(
 	Args:
 		item: Optional ERPNext item to sync with WooCommerce
 		date_time_from: Optional datetime to filter products modified after this time
+		woocommerce_server: Optional WooCommerce Server to limit the products to
 
 	Returns:
 		List of WooCommerceProduct documents
 	"""
 	# Build filters
 	filters = []
-	servers = None
+	servers = [woocommerce_server] if woocommerce_server else None
 
 	if date_time_from:
 		filters.append(["WooCommerce Product", "date_modified", ">", date_time_from])
@@ -789,9 +1022,16 @@ def get_list_of_wc_products(
 				"filters": filters,
 				"servers": servers,
 				"as_doc": True,
+				# Synchronisation needs the current records from WooCommerce, not a local copy
+				"skip_cache": True,
+				"skip_mirror": True,
+				# Walk the records by date modified, so that deep pulls cost the same per page
+				"keyset_pagination": True,
+				# Scheduled pulls only need the variations that changed since the previous pull
+				"only_changed_variations": bool(date_time_from),
 				# Let the API handle pagination efficiently
 				# Set a reasonable limit for maximum records
-				"page_length": 1 if item else 1000,
+				"page_length": 1 if item else SWEEP_PAGE_LENGTH,
 			}
 		)
 
@@ -804,34 +1044,89 @@ def get_list_of_wc_products(
 		return []
 
 
-def clear_sync_hash_and_run_item_sync(item_code: str):
+def get_item_field_map(wc_server: WooCommerceServer) -> tuple[tuple[str, str, JSONPath], ...]:
+	"""
+	Get the Item Field Map of a WooCommerce Server as (ERPNext field name, WooCommerce field name,
+	compiled JSONPath expression) tuples
+	"""
+	return compile_item_field_map(
+		tuple(
+			(row.erpnext_field_name.split(" | ")[0], row.woocommerce_field_name)
+			for row in wc_server.item_field_map or []
+		)
+	)
+
+
+@functools.lru_cache(maxsize=32)
+def compile_item_field_map(
+	item_field_map: tuple[tuple[str, str], ...],
+) -> tuple[tuple[str, str, JSONPath], ...]:
+	compiled = []
+	for erpnext_field_name, woocommerce_field_name in item_field_map:
+		try:
+			compiled.append((erpnext_field_name, woocommerce_field_name, parse(woocommerce_field_name)))
+		except Exception as e:
+			frappe.log_error(
+				f"Error mapping field {woocommerce_field_name} to {erpnext_field_name}: {e!s}",
+				"WooCommerce Field Mapping Error",
+			)
+	return tuple(compiled)
+
+
+# Fields of WooCommerce Products that hold numbers, although WooCommerce returns most of them as strings
+WC_NUMERIC_FIELDS = {
+	"price",
+	"regular_price",
+	"sale_price",
+	"stock_quantity",
+	"low_stock_amount",
+	"weight",
+	"length",
+	"width",
+	"height",
+	"menu_order",
+	"total_sales",
+	"average_rating",
+	"rating_count",
+}
+
+
+def get_content_hash(values: dict, numeric_fields: set[str] | None = None) -> str:
 	"""
-	Clear the last sync hash value using db.set_value, as it does not call the ORM triggers
-	and it does not update the modified timestamp (by using the update_modified parameter)
+	Hash synchronised field values, so that values which WooCommerce and ERPNext represent differently
+	(e.g. "1.50" and 1.5 in numeric fields, or None and "") hash the same
 	"""
+	numeric_fields = numeric_fields or set()
+	return hashlib.sha256(
+		frappe.as_json(
+			{field: normalise_content_value(value, field in numeric_fields) for field, value in values.items()}
+		).encode()
+	).hexdigest()
 
-	iws: ItemWooCommerceServer = frappe.qb.DocType("Item WooCommerce Server")  # type: ignore
 
-	iwss = (
-		frappe.qb.from_(iws).where(iws.enable_sync == 1).where(iws.parent == item_code).select(iws.name)
-	).run(as_dict=True)
+def normalise_content_value(value, numeric: bool = False):
+	"""
+	Normalise a synchronised field value for comparison. Only numeric fields are compared as numbers, so
+	that codes like "0012" and "12" stay different
+	"""
+	if isinstance(value, list | dict):
+		return value
+	if isinstance(value, bool):
+		value = int(value)
+	value = "" if value is None else str(value).strip()
+	if numeric:
+		try:
+			return float(value or 0)
+		except ValueError:
+			return value
+	return value
 
-	for iws in iwss:
-		frappe.db.set_value(
-			"Item WooCommerce Server",
-			iws.name,
-			"woocommerce_last_sync_hash",
-			None,
-			update_modified=False,
-		)
 
-	if len(iwss) > 0:
-		frappe.enqueue(
-			run_item_sync,
-			item_code=item_code,
-			enqueue=True,
-			queue="long",  # Use appropriate queue
-			timeout=1500,  # Set appropriate timeout
-			job_name=f"Sync Item {item_code}",  # Provide useful job name
-			now=frappe.flags.in_test,  # Run immediately in tests
-		)
+def is_numeric_field(erpnext_field_name: str, woocommerce_field_name: str) -> bool:
+	"""
+	Whether a mapped field holds a number, going by the type of the Item field or the WooCommerce field
+	"""
+	field = frappe.get_meta("Item").get_field(erpnext_field_name)
+	if field and field.fieldtype in numeric_fieldtypes:
+		return True
+	return woocommerce_field_name.rsplit(".", 1)[-1].strip("$[]'\" ") in WC_NUMERIC_FIELDS
@@ -0,0 +1,261 @@
+import json
+
+import frappe
+from frappe import _dict, qb
+from frappe.query_builder import Criterion
+
+from woocommerce_conduit.tasks.sync import SynchroniseWooCommerce
+from woocommerce_conduit.tasks.sync_sales_orders import create_payment_entry
+from woocommerce_conduit.tasks.utils import clear_item_sync_caches
+from woocommerce_conduit.woocommerce_conduit.doctype.woocommerce_order.woocommerce_order import (
+	WooCommerceOrder,
+)
+from woocommerce_conduit.woocommerce_conduit.doctype.woocommerce_server.woocommerce_server import (
+	WooCommerceServer,
+)
+
+# WooCommerce caps per_page at 100, so orders are fetched (and processed) in batches of this size
+PAYMENT_ENTRY_BATCH_SIZE = 100
+WC_ORDER_PAYMENT_FIELDS = (
+	"id,date_created,date_modified,status,payment_method,payment_method_title,transaction_id,date_paid,total"
+)
+
+
+@frappe.whitelist()
+def run_payment_entry_sync_in_background():
+	frappe.enqueue(run_payment_entry_sync, queue="long", timeout=3600)
+
+
+@frappe.whitelist()
+def run_payment_entry_sync(sales_order_names: list[str] | str | None = None):
+	# Lists arrive as JSON when the method is called over HTTP
+	if isinstance(sales_order_names, str):
+		sales_order_names = frappe.parse_json(sales_order_names)
+	sync = SynchronisePaymentEntries(sales_order_names=sales_order_names)
+	sync.run()
+	return True
+
+
+class SynchronisePaymentEntries(SynchroniseWooCommerce):
+	"""
+	Class for creating Payment Entries, in bulk, for submitted and unpaid Sales Orders whose WooCommerce
+	Orders have been paid
+	"""
+
+	sales_order_names: list[str] | None
+
+	def __init__(
+		self,
+		servers: list[WooCommerceServer | _dict] | None = None,
+		sales_order_names: list[str] | None = None,
+	) -> None:
+		super().__init__(servers)
+		self.sales_order_names = sales_order_names
+		self.wc_server = None
+		self.bank_account_mapping = {}
+		self.gl_account_mapping = {}
+		self.account_companies = {}
+
+	def run(self) -> None:
+		"""
+		Run synchronisation
+		"""
+		for server in self.servers:
+			if not (server.enabled and server.enabled_payments_sync):
+				continue
+			self.wc_server = server
+			self.set_payment_method_mappings()
+
+			sales_orders = self.get_unpaid_sales_orders()
+			for start in range(0, len(sales_orders), PAYMENT_ENTRY_BATCH_SIZE):
+				self.sync_payment_entries(sales_orders[start : start + PAYMENT_ENTRY_BATCH_SIZE])
+				# Keep the Payment Entries of finished batches if a later batch fails or the job times out
+				if not frappe.flags.in_test:
+					frappe.db.commit()  # nosemgrep
+
+	def set_payment_method_mappings(self) -> None:
+		"""
+		Parse this server's payment method mappings once, and resolve the Company of every mapped
+		G/L Account in a single query
+		"""
+		if not self.wc_server:
+			return
+		self.bank_account_mapping = json.loads(self.wc_server.payment_method_bank_account_mapping or "{}")
+		self.gl_account_mapping = json.loads(self.wc_server.payment_method_gl_account_mapping or "{}")
+
+		gl_accounts = [account for account in self.gl_account_mapping.values() if account]
+		self.account_companies = (
+			{
+				account.name: account.company
+				for account in frappe.get_all(
+					"Account", filters={"name": ["in", gl_accounts]}, fields=["name", "company"]
+				)
+			}
+			if gl_accounts
+			else {}
+		)
+
+	def get_unpaid_sales_orders(self) -> list[_dict]:
+		"""
+		Get submitted Sales Orders, linked to this WooCommerce Server and dated on or after its Payments
+		Sync Start Date, that are neither settled nor closed and aren't referenced by a Payment Entry yet
+		"""
+		if not self.wc_server or not self.wc_server.payments_sync_start_date:
+			return []
+		so = qb.DocType("Sales Order")
+		per = qb.DocType("Payment Entry Reference")
+		paid_sales_orders = (
+			qb.from_(per)
+			.select(per.reference_name)
+			.where((per.reference_doctype == "Sales Order") & (per.docstatus < 2))
+		)
+		and_conditions = [
+			so.docstatus == 1,
+			so.woocommerce_server == self.wc_server.name,
+			so.woocommerce_id.isnotnull(),
+			so.woocommerce_id != "",
+			(so.woocommerce_payment_entry.isnull()) | (so.woocommerce_payment_entry == ""),
+			so.woocommerce_payment_sync_skipped == 0,
+			so.transaction_date >= self.wc_server.payments_sync_start_date,
+			so.status.notin(["Completed", "Closed"]),
+			so.advance_paid < so.grand_total,
+			so.name.notin(paid_sales_orders),
+		]
+		if self.sales_order_names:
+			and_conditions.append(so.name.isin(self.sales_order_names))
+
+		return (
+			qb.from_(so)
+			.select(
+				so.name,
+				so.customer,
+				so.grand_total,
+				so.per_billed,
+				so.transaction_date,
+				so.woocommerce_id,
+				so.woocommerce_server,
+			)
+			.where(Criterion.all(and_conditions))
+			.orderby(so.transaction_date)
+			.run(as_dict=True)
+		)
+
+	def sync_payment_entries(self, sales_orders: list[_dict]) -> None:
+		"""
+		Create and link Payment Entries for a batch of Sales Orders
+		"""
+		if not self.wc_server or not sales_orders:
+			return
+
+		wc_orders = self.get_paid_wc_orders([sales_order.woocommerce_id for sales_order in sales_orders])
+		sales_invoices = get_sales_invoices_for_sales_orders(
+			[sales_order.name for sales_order in sales_orders if sales_order.per_billed > 0]
+		)
+
+		for sales_order in sales_orders:
+			wc_order = wc_orders.get(str(sales_order.woocommerce_id))
+			if not wc_order:
+				continue
+
+			frappe.db.savepoint("woocommerce_payment_entry")
+			try:
+				self.create_and_link_payment_entry(
+					wc_order, sales_order, sales_invoices.get(sales_order.name)
+				)
+			except Exception:
+				frappe.db.rollback(save_point="woocommerce_payment_entry")
+				clear_item_sync_caches()
+				error_message = f"{frappe.get_traceback()}\n\nSales Order: {sales_order.name}\n\nWC Order Data: \n{wc_order!s}"
+				frappe.log_error("WooCommerce Error: Payment Entry Sync", error_message)
+			else:
+				frappe.db.release_savepoint("woocommerce_payment_entry")
+
+	def get_paid_wc_orders(self, woocommerce_ids: list[str]) -> dict[str, dict]:
+		"""
+		Fetch a batch of WooCommerce Orders with a single request, keeping only those that have been paid
+		"""
+		if not self.wc_server:
+			return {}
+		wc_orders = WooCommerceOrder.get_list_of_records(
+			{
+				"doctype": "WooCommerce Order",
+				"filters": [
+					["WooCommerce Order", "woocommerce_id", "in", [str(id) for id in woocommerce_ids]]
+				],
+				"servers": [self.wc_server.name],
+				"_fields": WC_ORDER_PAYMENT_FIELDS,
+				"page_length": len(woocommerce_ids),
+			}
+		)
+		return {
+			str(wc_order["woocommerce_id"]): wc_order
+			for wc_order in wc_orders or []
+			if wc_order.get("payment_method") and wc_order.get("date_paid")
+		}
+
+	def create_and_link_payment_entry(self, wc_order: dict, sales_order: _dict, sales_invoice: str | None):
+		"""
+		Create a Payment Entry for a paid WooCommerce Order and link it to its Sales Order
+		"""
+		# If the grand total is 0, skip payment entry creation
+		if sales_order.grand_total is None or float(sales_order.grand_total) == 0:
+			mark_payment_sync_skipped(sales_order.name)
+			return
+
+		payment_method = wc_order["payment_method"]
+		if payment_method not in self.bank_account_mapping:
+			raise KeyError(f"WooCommerce payment method {payment_method} not found in WooCommerce Server")
+
+		company_bank_account = self.bank_account_mapping[payment_method]
+		if not company_bank_account:
+			mark_payment_sync_skipped(sales_order.name)
+			return
+
+		company_gl_account = self.gl_account_mapping[payment_method]
+		payment_entry = create_payment_entry(
+			wc_order,
+			sales_order,
+			company=self.account_companies.get(company_gl_account),  # type: ignore
+			company_bank_account=company_bank_account,
+			company_gl_account=company_gl_account,
+			sales_invoice=sales_invoice,
+		)
+
+		# Link created Payment Entry to Sales Order without running the Sales Order validations
+		frappe.db.set_value(
+			"Sales Order",
+			sales_order.name,
+			"woocommerce_payment_entry",
+			payment_entry.name,
+			update_modified=False,
+		)
+
+
+def mark_payment_sync_skipped(sales_order_name: str) -> None:
+	"""
+	Mark a Sales Order that needs no Payment Entry, so that it isn't fetched from WooCommerce again
+	"""
+	frappe.db.set_value(
+		"Sales Order",
+		sales_order_name,
+		"woocommerce_payment_sync_skipped",
+		1,
+		update_modified=False,
+	)
+
+
+def get_sales_invoices_for_sales_orders(sales_order_names: list[str]) -> dict[str, str]:
+	"""
+	Return the first Sales Invoice referencing each of the given Sales Orders, using a single query
+	"""
+	if not sales_order_names:
+		return {}
+	sales_invoices = {}
+	for si_item in frappe.get_all(
+		"Sales Invoice Item",
+		fields=["parent", "sales_order"],
+		filters={"sales_order": ["in", sales_order_names]},
+		order_by="creation asc",
+	):
+		sales_invoices.setdefault(si_item.sales_order, si_item.parent)
+	return sales_invoices
@@ -0,0 +1,155 @@
+import time
+from collections.abc import Callable
+
+import frappe
+from frappe.utils import now, time_diff_in_seconds
+
+from woocommerce_conduit.woocommerce_conduit.profiling import CostMeter
+
+SYNC_RUN_DOCTYPE = "WooCommerce Sync Run"
+# Failed records are retried in the next runs until they have been attempted this many times
+MAX_SYNC_RETRIES = 3
+OUTCOME_CODES = {"Created": "C", "Updated": "U", "Skipped": "S", "Failed": "F"}
+OUTCOME_FIELDS = {
+	"C": "records_created",
+	"U": "records_updated",
+	"S": "records_skipped",
+	"F": "records_failed",
+}
+# Errors are truncated to this many characters in the outcomes, the full traceback is in the Error Log
+MAX_OUTCOME_ERROR_LENGTH = 140
+
+
+class SyncRun:
+	"""
+	Ledger of one run of a sweep, stored in a WooCommerce Sync Run.
+
+	Every record is synchronised in a transaction of its own, so that one failing record is rolled back
+	and logged without stopping the run. The outcome of every record is stored in compact form, as
+	{name: [outcome code, duration in ms, attempts, error]}, and records that failed in the previous run are
+	retried, up to MAX_SYNC_RETRIES attempts.
+
+	Args:
+		sync_type: "Items" or "Orders"
+		woocommerce_server: The WooCommerce Server that is synchronised
+		date_time_from: Records modified since this date are synchronised
+		trigger: "Scheduled" or "Manual"
+	"""
+
+	def __init__(
+		self, sync_type: str, woocommerce_server: str, date_time_from=None, trigger: str = "Scheduled"
+	):
+		self.outcomes: dict[str, list] = {}
+		self.previous_failures = get_previous_failures(sync_type, woocommerce_server)
+		self.retried: set[str] = set()
+		self.doc = frappe.get_doc(
+			{
+				"doctype": SYNC_RUN_DOCTYPE,
+				"sync_type": sync_type,
+				"woocommerce_server": woocommerce_server,
+				"trigger": trigger,
+				"status": "Running",
+				"date_time_from": date_time_from,
+				"started_at": now(),
+			}
+		).insert(ignore_permissions=True)
+		frappe.db.commit()  # nosemgrep
+
+	def sync(self, name: str, sync_record: Callable[[], str]):
+		"""
+		Synchronise a record and record its outcome
+
+		Args:
+			name: Name of the WooCommerce record
+			sync_record: Function that synchronises the record and returns its outcome, e.g. "Created"
+		"""
+		if name in self.outcomes:
+			return
+
+		attempts = self.previous_failures.get(name, 0) + 1
+		if attempts > 1:
+			self.retried.add(name)
+
+		start = time.perf_counter()
+		try:
+			outcome = sync_record()
+			frappe.db.commit()  # nosemgrep
+			self.outcomes[name] = [OUTCOME_CODES[outcome], elapsed_ms(start), attempts, None]
+		except Exception as e:
+			# The synchronisation has logged the error with the record's data
+			frappe.db.rollback()
+			self.outcomes[name] = [
+				OUTCOME_CODES["Failed"],
+				elapsed_ms(start),
+				attempts,
+				str(e)[:MAX_OUTCOME_ERROR_LENGTH],
+			]
+
+	def get_retries(self) -> list[str]:
+		"""
+		Get the records that failed in the previous run, may be retried, and have not been synchronised in
+		this run yet
+		"""
+		return [
+			name
+			for name, attempts in self.previous_failures.items()
+			if attempts < MAX_SYNC_RETRIES and name not in self.outcomes
+		]
+
+	def finish(self, costs: CostMeter | None = None, error: str | None = None):
+		"""
+		Store the totals, outcomes and costs of the run
+		"""
+		if error:
+			# Discard the partial writes of the record that was being synchronised when the run failed
+			frappe.db.rollback()
+
+		finished_at = now()
+		counts = dict.fromkeys(OUTCOME_FIELDS.values(), 0)
+		for code, *_ in self.outcomes.values():
+			counts[OUTCOME_FIELDS[code]] += 1
+
+		self.doc.update(
+			{
+				"status": "Failed" if error else "Completed",
+				"finished_at": finished_at,
+				"duration": time_diff_in_seconds(finished_at, self.doc.started_at),
+				"records_seen": len(self.outcomes),
+				"records_retried": len(self.retried),
+				**counts,
+				**(costs.as_dict() if costs else {}),
+				"outcomes": frappe.as_json(self.outcomes, indent=None),
+				"error": error,
+			}
+		)
+		self.doc.save(ignore_permissions=True)
+		frappe.db.commit()  # nosemgrep
+
+
+def get_previous_failures(sync_type: str, woocommerce_server: str) -> dict[str, int]:
+	"""
+	Get the records that failed in the last finished run, with the number of times they were attempted
+	"""
+	previous_runs = frappe.get_all(
+		SYNC_RUN_DOCTYPE,
+		filters={
+			"sync_type": sync_type,
+			"woocommerce_server": woocommerce_server,
+			"status": ("!=", "Running"),
+		},
+		fields=["outcomes"],
+		order_by="creation desc",
+		limit=1,
+	)
+	if not previous_runs or not previous_runs[0].outcomes:
+		return {}
+
+	return {
+		name: attempts
+		for name, (code, _, attempts, *_) in frappe.parse_json(previous_runs[0].outcomes).items()
+		if code == OUTCOME_CODES["Failed"]
+	}
+
+
+def elapsed_ms(start: float) -> int:
+	return round((time.perf_counter() - start) * 1000)
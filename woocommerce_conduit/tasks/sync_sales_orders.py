@@ -11,15 +11,24 @@ from erpnext.selling.doctype.customer.customer import Customer
 from erpnext.selling.doctype.sales_order.sales_order import SalesOrder
 from erpnext.selling.doctype.sales_order_item.sales_order_item import SalesOrderItem
 from erpnext.stock.doctype.item.item import Item
-from frappe import ValidationError, _
+from frappe import ValidationError, _, _dict
 from frappe.contacts.doctype.address.address import Address
 from frappe.contacts.doctype.contact.contact import Contact
 from frappe.utils import get_datetime
-from frappe.utils.data import cstr, now
+from frappe.utils.data import cstr, flt, now
 
-from woocommerce_conduit.exceptions import SyncDisabledError
+from woocommerce_conduit.exceptions import SyncDisabledError, SyncLockedError
+from woocommerce_conduit.tasks.locks import SWEEP_LEASE_TIMEOUT, sync_lock
 from woocommerce_conduit.tasks.sync import SynchroniseWooCommerce
-from woocommerce_conduit.tasks.sync_items import run_item_sync
+from woocommerce_conduit.tasks.sync_items import parent_item_cache, run_item_sync
+from woocommerce_conduit.tasks.sync_runs import SyncRun
+from woocommerce_conduit.tasks.sync_triggers import queue_sync_trigger
+from woocommerce_conduit.tasks.utils import (
+	SWEEP_PAGE_LENGTH,
+	clear_item_sync_caches,
+	get_sweep_checkpoint,
+	is_polling_due,
+)
 from woocommerce_conduit.woocommerce_conduit.doctype.woocommerce_order.woocommerce_order import (
 	WC_ORDER_STATUS_MAPPING,
 	WC_ORDER_STATUS_MAPPING_REVERSE,
@@ -31,11 +40,14 @@ from woocommerce_conduit.woocommerce_conduit.doctype.woocommerce_server.woocomme
 from woocommerce_conduit.woocommerce_conduit.doctype.woocommerce_settings.woocommerce_settings import (
 	WooCommerceSettings,
 )
+from woocommerce_conduit.woocommerce_conduit.profiling import measure_costs, profile_phase, profile_sync
 from woocommerce_conduit.woocommerce_conduit.woocommerce_api import (
 	WooCommerceDocument,
 	generate_woocommerce_record_name_from_domain_and_id,
 )
 
+SALES_ORDER_SAVEPOINT = "woocommerce_sales_order"
+
 
 class SyncedOrderItem(SalesOrderItem):
 	woocommerce_id: int
@@ -53,6 +65,7 @@ class SyncedOrder(SalesOrder):
 		woocommerce_status: DF.Data
 		woocommerce_payment_method: DF.Data
 		woocommerce_payment_entry: DF.Data
+		woocommerce_payment_sync_skipped: DF.Check
 		woocommerce_customer_note: DF.Data
 		items: DF.Table[SyncedOrderItem]
 
@@ -71,32 +84,103 @@ def run_sales_order_sync_from_hook(doc, method):
 			indicator="blue",
 			alert=True,
 		)
-		frappe.enqueue(run_sales_order_sync, queue="long", sales_order_name=doc.name)
+		queue_sync_trigger("Sales Order", doc.name, doc.woocommerce_server)
+
+
+def run_sales_order_sync_from_trigger(sales_order_name: str, woocommerce_server: str):
+	"""
+	Synchronise a Sales Order, intended to be called for a (debounced) sync trigger
+	"""
+	run_sales_order_sync(sales_order_name=sales_order_name)
 
 
 def sync_woocommerce_orders_modified_since(date_time_from=None):
 	"""
-	Get list of WooCommerce orders modified since date_time_from
+	Enqueue a job per enabled WooCommerce Server to synchronise orders modified since date_time_from.
+
+	Each server is synchronised (and checkpointed) independently, so a large shop's backlog does not
+	delay a small one. Deduplicated job IDs prevent a server's sweep from being queued twice.
 	"""
-	settings: WooCommerceSettings = frappe.get_cached_doc("WooCommerce Settings")  # type: ignore
+	for woocommerce_server in frappe.get_all("WooCommerce Server", filters={"enabled": 1}, pluck="name"):
+		frappe.enqueue(
+			sync_woocommerce_orders_modified_since_for_server,
+			queue="long",
+			timeout=SWEEP_LEASE_TIMEOUT,
+			job_id=f"woocommerce_orders_modified_since::{woocommerce_server}",
+			deduplicate=True,
+			woocommerce_server=woocommerce_server,
+			date_time_from=date_time_from,
+		)
 
-	if not date_time_from:
-		date_time_from = getattr(settings, "wc_last_sync_date_orders", None)
 
-	wc_orders = get_list_of_wc_orders(
-		date_time_from=date_time_from, status="pending,processing,on-hold,completed,cancelled"
-	)
-	for wc_order in wc_orders:
-		try:
-			run_sales_order_sync(woocommerce_order=wc_order, enqueue=True)
-		# Skip orders with errors, as these exceptions will be logged
-		except Exception as e:
-			frappe.log_error("Order sync error", f"There was an exception when syncing an order: {e!s}")
+def sync_woocommerce_orders_modified_since_for_server(woocommerce_server: str, date_time_from=None):
+	"""
+	Get list of WooCommerce orders on a WooCommerce Server modified since date_time_from
+	"""
+	try:
+		# Only one sweep per server may run at a time, even if a previous one overruns its schedule
+		with sync_lock("orders_sweep", woocommerce_server, timeout=SWEEP_LEASE_TIMEOUT, skip_if_locked=True):
+			sweep_started = now()
+			trigger = "Manual" if date_time_from else "Scheduled"
+
+			if not date_time_from:
+				settings: WooCommerceSettings = frappe.get_cached_doc("WooCommerce Settings")  # type: ignore
+				date_time_from = frappe.db.get_value(
+					"WooCommerce Server", woocommerce_server, "last_orders_sync_date"
+				) or getattr(settings, "wc_last_sync_date_orders", None)
+
+				# When webhooks keep records current, scheduled polling only runs as a low-frequency reconciliation sweep
+				if not is_polling_due(date_time_from):
+					return
+
+			with measure_costs() as costs, parent_item_cache():
+				run = SyncRun("Orders", woocommerce_server, date_time_from, trigger=trigger)
+				try:
+					wc_orders = get_list_of_wc_orders(
+						date_time_from=date_time_from,
+						status="pending,processing,on-hold,completed,cancelled",
+						woocommerce_server=woocommerce_server,
+					)
 
-	settings.reload()
-	settings.wc_last_sync_date_orders = now()
-	settings.flags.ignore_mandatory = True
-	settings.save()
+					# Every order is synchronised in its own transaction, so one failing order is recorded
+					# in the sync run and retried in the next one, without stopping the sweep.
+					# Records that are being synchronised by a hook or webhook right now are skipped
+					for wc_order in wc_orders:
+						run.sync(
+							wc_order.get("name"), lambda wc_order=wc_order: sync_woocommerce_order(wc_order)
+						)
+					for woocommerce_order_name in run.get_retries():
+						run.sync(
+							woocommerce_order_name,
+							lambda name=woocommerce_order_name: sync_woocommerce_order(name=name),
+						)
+				except Exception:
+					run.finish(costs, error=frappe.get_traceback())
+					raise
+				run.finish(costs)
+
+			# Checkpoint from when the sweep started, so that orders modified during the sweep are not missed,
+			# unless the sweep was cut short before it reached them
+			frappe.db.set_value(
+				"WooCommerce Server",
+				woocommerce_server,
+				"last_orders_sync_date",
+				get_sweep_checkpoint(wc_orders, sweep_started),
+				update_modified=False,
+			)
+	except SyncLockedError:
+		return
+
+
+def sync_woocommerce_order(woocommerce_order: WooCommerceOrder | None = None, name: str | None = None) -> str:
+	"""
+	Synchronise a WooCommerce Order during a sweep, and return the outcome for the sync run
+	"""
+	sync = get_woocommerce_order_sync(
+		woocommerce_order_name=name, woocommerce_order=woocommerce_order, skip_if_locked=True
+	)
+	sync.run()
+	return sync.outcome
 
 
 @frappe.whitelist()
@@ -106,6 +190,7 @@ def run_sales_order_sync(
 	woocommerce_order_name: str | None = None,
 	woocommerce_order: WooCommerceOrder | None = None,
 	enqueue=False,
+	skip_if_locked: bool = False,
 ) -> tuple[SyncedOrder | None, WooCommerceOrder | None]:
 	"""
 	Synchronize an ERPNext Sales Order with its corresponding WooCommerce Order.
@@ -120,6 +205,7 @@ def run_sales_order_sync(
 	    woocommerce_order_name: Name of WooCommerce Order to synchronize
 	    woocommerce_order: WooCommerce Order document to synchronize
 	    enqueue: Whether to process synchronization in background
+	    skip_if_locked: Skip the synchronization if another worker is synchronizing the same record
 
 	Returns:
 	    tuple: (ERPNext Sales Order, WooCommerce Order) after synchronization
@@ -141,51 +227,12 @@ def run_sales_order_sync(
 
 	# Case 1: Sync initiated from WooCommerce side
 	if woocommerce_order_name or wc_order:
-		# Check if we need to load the order from the database
-		load_full_order = False
-
-		# If only name provided, we need to load the order
-		if not wc_order and woocommerce_order_name:
-			load_full_order = True
-			lookup_name = woocommerce_order_name
-		# If order provided but might be a partial/list view order
-		elif wc_order:
-			lookup_name = wc_order.get("name")
-			# Check for essential fields that would only exist in a full order
-			# List view orders typically only have name, id, date_created, date_modified, status, number
-			# Full orders have many more fields like created_via, customer_id, billing, etc.
-			required_full_fields = ["created_via", "customer_id", "billing", "shipping", "line_items"]
-
-			# If any of these fields are missing or None, we need to reload
-			if isinstance(wc_order, dict):
-				load_full_order = any(wc_order.get(field) is None for field in required_full_fields)
-			else:
-				load_full_order = any(
-					getattr(wc_order, field, None) is None for field in required_full_fields
-				)
-
-		if load_full_order:
-			try:
-				# Load the full order with all fields from the database
-				full_wc_order: WooCommerceOrder = frappe.get_doc(
-					{"doctype": "WooCommerce Order", "name": lookup_name}
-				)  # type: ignore
-				full_wc_order.load_from_db()
-
-				# Validate WooCommerce Order has required fields
-				if not full_wc_order.woocommerce_server or not full_wc_order.woocommerce_id:
-					raise ValueError(
-						f"WooCommerce Order {full_wc_order.name} is missing required fields: "
-						f"server={full_wc_order.woocommerce_server}, id={full_wc_order.woocommerce_id}\n\nWC ORDER:\n{full_wc_order.as_dict()}"
-					)
-
-				wc_order = full_wc_order
-
-			except frappe.DoesNotExistError:
-				frappe.throw(_(f"WooCommerce Order {lookup_name} not found"))
-
-		# Initialize synchronization
-		sync = SynchroniseSalesOrder(woocommerce_order=wc_order)
+		sync = get_woocommerce_order_sync(
+			woocommerce_order_name=woocommerce_order_name,
+			woocommerce_order=wc_order,
+			skip_if_locked=skip_if_locked,
+		)
+		wc_order = sync.woocommerce_order
 
 		# Execute sync now or in background
 		if enqueue:
@@ -209,7 +256,7 @@ def run_sales_order_sync(
 			)
 
 		# Initialize synchronization for this server
-		sync = SynchroniseSalesOrder(sales_order=erpnext_order)
+		sync = SynchroniseSalesOrder(sales_order=erpnext_order, skip_if_locked=skip_if_locked)
 
 		# Execute sync now or in background
 		if enqueue:
@@ -231,6 +278,63 @@ def run_sales_order_sync(
 	return None, None
 
 
+def get_woocommerce_order_sync(
+	woocommerce_order_name: str | None = None,
+	woocommerce_order: WooCommerceOrder | None = None,
+	skip_if_locked: bool = False,
+) -> "SynchroniseSalesOrder":
+	"""
+	Get the synchronisation of a WooCommerce Order with its ERPNext Sales Order, loading the full order if
+	only its name or its fields from a list view are given
+	"""
+	wc_order = woocommerce_order
+
+	# Check if we need to load the order from the database
+	load_full_order = False
+
+	# If only name provided, we need to load the order
+	if not wc_order and woocommerce_order_name:
+		load_full_order = True
+		lookup_name = woocommerce_order_name
+	# If order provided but might be a partial/list view order
+	elif wc_order:
+		lookup_name = wc_order.get("name")
+		# Check for essential fields that would only exist in a full order
+		# List view orders typically only have name, id, date_created, date_modified, status, number
+		# Full orders have many more fields like created_via, customer_id, billing, etc.
+		required_full_fields = ["created_via", "customer_id", "billing", "shipping", "line_items"]
+
+		# If any of these fields are missing or None, we need to reload
+		if isinstance(wc_order, dict):
+			load_full_order = any(wc_order.get(field) is None for field in required_full_fields)
+		else:
+			load_full_order = any(getattr(wc_order, field, None) is None for field in required_full_fields)
+
+	if load_full_order:
+		try:
+			# Load the full order with all fields from the database
+			full_wc_order: WooCommerceOrder = frappe.get_doc(
+				{"doctype": "WooCommerce Order", "name": lookup_name}
+			)  # type: ignore
+			# Synchronisation needs the current record from WooCommerce, not a local copy
+			full_wc_order.flags.skip_mirror = True
+			full_wc_order.load_from_db()
+
+			# Validate WooCommerce Order has required fields
+			if not full_wc_order.woocommerce_server or not full_wc_order.woocommerce_id:
+				raise ValueError(
+					f"WooCommerce Order {full_wc_order.name} is missing required fields: "
+					f"server={full_wc_order.woocommerce_server}, id={full_wc_order.woocommerce_id}\n\nWC ORDER:\n{full_wc_order.as_dict()}"
+				)
+
+			wc_order = full_wc_order
+
+		except frappe.DoesNotExistError:
+			frappe.throw(_(f"WooCommerce Order {lookup_name} not found"))
+
+	return SynchroniseSalesOrder(woocommerce_order=wc_order, skip_if_locked=skip_if_locked)
+
+
 class SynchroniseSalesOrder(SynchroniseWooCommerce):
 	"""
 	Class for managing synchronisation of a WooCommerce Order with an ERPNext Sales Order
@@ -240,10 +344,12 @@ class SynchroniseSalesOrder(SynchroniseWooCommerce):
 		self,
 		sales_order: SyncedOrder | None = None,
 		woocommerce_order: WooCommerceOrder | None = None,
+		skip_if_locked: bool = False,
 	) -> None:
 		super().__init__()
 		self.sales_order = sales_order  # type: ignore
 		self.woocommerce_order = woocommerce_order  # type: ignore
+		self.skip_if_locked = skip_if_locked
 		self.settings: WooCommerceSettings = frappe.get_cached_doc("WooCommerce Settings")  # type: ignore
 
 	def run(self):
@@ -251,8 +357,18 @@ class SynchroniseSalesOrder(SynchroniseWooCommerce):
 		Run synchronisation
 		"""
 		try:
-			self.get_corresponding_sales_order_or_woocommerce_order()
-			self.sync_wc_order_with_erpnext_order()
+			with (
+				sync_lock("order", self.get_lock_key(), skip_if_locked=self.skip_if_locked),
+				profile_sync("Sales Order", self.get_lock_key),
+				parent_item_cache(),
+			):
+				self.get_corresponding_sales_order_or_woocommerce_order()
+				self.sync_wc_order_with_erpnext_order()
+		except SyncLockedError:
+			# Another worker is synchronising this record right now
+			if self.skip_if_locked:
+				return
+			raise
 		except Exception as err:
 			try:
 				woocommerce_order_dict = (
@@ -269,9 +385,25 @@ class SynchroniseSalesOrder(SynchroniseWooCommerce):
 				woocommerce_order_dict = self.woocommerce_order
 				sales_order_dict = self.sales_order
 			error_message = f"{frappe.get_traceback()}\n\nSales Order Data: \n{str(sales_order_dict) if self.sales_order else ''}\n\nWC Order Data \n{str(woocommerce_order_dict) if self.woocommerce_order else ''})"
-			frappe.log_error("WooCommerce Error", error_message)
+			# Deferred, so that the log is kept when the caller rolls back the failed synchronisation
+			frappe.log_error("WooCommerce Error", error_message, defer_insert=True)
 			raise err
 
+	def get_lock_key(self) -> str:
+		"""
+		Identify the WooCommerce Order (or, if it is not linked yet, the Sales Order) being synchronised
+		"""
+		if self.woocommerce_order:
+			return generate_woocommerce_record_name_from_domain_and_id(
+				self.woocommerce_order.woocommerce_server, self.woocommerce_order.woocommerce_id
+			)
+		if self.sales_order and self.sales_order.woocommerce_id:
+			return generate_woocommerce_record_name_from_domain_and_id(
+				self.sales_order.woocommerce_server, self.sales_order.woocommerce_id
+			)
+		return f"Sales Order {self.sales_order.name if self.sales_order else None}"
+
+	@profile_phase("load")
 	def get_corresponding_sales_order_or_woocommerce_order(self):
 		"""
 		If we have an ERPNext Sales Order, get the corresponding WooCommerce Order
@@ -297,6 +429,7 @@ class SynchroniseSalesOrder(SynchroniseWooCommerce):
 			self.woocommerce_order: WooCommerceOrder = frappe.get_doc(
 				{"doctype": "WooCommerce Order", "name": wc_orders[0]["name"]}  # type: ignore
 			)
+			self.woocommerce_order.flags.skip_mirror = True
 			self.woocommerce_order.load_from_db()
 
 		if self.woocommerce_order and not self.sales_order:
@@ -339,6 +472,7 @@ class SynchroniseSalesOrder(SynchroniseWooCommerce):
 		"""
 		if self.woocommerce_order and not self.sales_order:
 			# create missing order in ERPNext
+			self.outcome = "Created"
 			self.create_sales_order()
 		elif self.sales_order and self.woocommerce_order:
 			# both exist, check sync hash
@@ -346,14 +480,21 @@ class SynchroniseSalesOrder(SynchroniseWooCommerce):
 				self.woocommerce_order.woocommerce_date_modified
 				!= self.sales_order.woocommerce_last_sync_hash
 			):
+				self.outcome = "Updated"
 				self.update_sales_order()
 
 			# If the Sales Order exists and has been submitted in the mean time, sync Payment Entries
-			if self.sales_order.docstatus == 1 and not self.sales_order.woocommerce_payment_entry:
+			if (
+				self.sales_order.docstatus == 1
+				and not self.sales_order.woocommerce_payment_entry
+				and not self.sales_order.woocommerce_payment_sync_skipped
+			):
 				self.sales_order.reload()
 				if self.create_and_link_payment_entry(self.woocommerce_order, self.sales_order):
+					self.outcome = "Updated"
 					self.sales_order.save()
 
+	@profile_phase("sales_order")
 	def update_sales_order(self):
 		"""
 		Update the ERPNext Sales Order with fields from it's corresponding WooCommerce Order
@@ -394,7 +535,9 @@ class SynchroniseSalesOrder(SynchroniseWooCommerce):
 				self.sales_order.woocommerce_payment_method = payment_method
 				so_dirty = True
 
-			if not self.sales_order.woocommerce_payment_entry:
+			if not (
+				self.sales_order.woocommerce_payment_entry or self.sales_order.woocommerce_payment_sync_skipped
+			):
 				if self.create_and_link_payment_entry(self.woocommerce_order, self.sales_order):
 					so_dirty = True
 
@@ -403,6 +546,7 @@ class SynchroniseSalesOrder(SynchroniseWooCommerce):
 				self.sales_order.flags.created_by_sync = True
 				self.sales_order.save()
 
+	@profile_phase("payment_entry")
 	def create_and_link_payment_entry(self, wc_order: WooCommerceOrder, sales_order: SyncedOrder) -> bool:
 		"""
 		Create a Payment Entry for a WooCommerce Order that has been marked as Paid
@@ -419,10 +563,12 @@ class SynchroniseSalesOrder(SynchroniseWooCommerce):
 			and wc_order.payment_method
 			and wc_order.date_paid
 			and not sales_order.woocommerce_payment_entry
+			and not sales_order.woocommerce_payment_sync_skipped
 			and sales_order.docstatus == 1
 		):
 			# If the grand total is 0, skip payment entry creation
 			if sales_order.grand_total is None or float(sales_order.grand_total) == 0:
+				sales_order.woocommerce_payment_sync_skipped = 1
 				return True
 
 			# Get Company Bank Account for this Payment Method
@@ -440,16 +586,10 @@ class SynchroniseSalesOrder(SynchroniseWooCommerce):
 				payment_method_gl_account_mapping = json.loads(wc_server.payment_method_gl_account_mapping)
 				company_gl_account = payment_method_gl_account_mapping[wc_order.payment_method]
 
-				# Create a new Payment Entry
 				company = frappe.get_value("Account", company_gl_account, "company")
 
-				# Attempt to get Payfast Transaction ID
-				payment_reference_no = wc_order.get("transaction_id", None)
-
 				# Determine if the reference should be Sales Order or Sales Invoice
-				reference_doctype = "Sales Order"
-				reference_name = sales_order.name
-				total_amount = sales_order.grand_total
+				sales_invoice = None
 				if sales_order.per_billed > 0:
 					si_item_details = frappe.get_all(
 						"Sales Invoice Item",
@@ -457,38 +597,25 @@ class SynchroniseSalesOrder(SynchroniseWooCommerce):
 						filters={"sales_order": sales_order.name},
 					)
 					if len(si_item_details) > 0:
-						reference_doctype = "Sales Invoice"
-						reference_name = si_item_details[0].parent
-						total_amount = sales_order.grand_total
-
-				# Create Payment Entry
-				payment_entry_dict = {
-					"company": company,
-					"payment_type": "Receive",
-					"reference_no": payment_reference_no or wc_order.payment_method_title,
-					"reference_date": wc_order.date_paid,
-					"party_type": "Customer",
-					"party": sales_order.customer,
-					"posting_date": wc_order.date_paid or sales_order.transaction_date,
-					"paid_amount": float(wc_order.total),
-					"received_amount": float(wc_order.total),
-					"bank_account": company_bank_account,
-					"paid_to": company_gl_account,
-				}
-				payment_entry = frappe.new_doc("Payment Entry")
-				payment_entry.update(payment_entry_dict)
-				row = payment_entry.append("references")
-				row.reference_doctype = reference_doctype
-				row.reference_name = reference_name
-				row.total_amount = total_amount
-				row.allocated_amount = total_amount
-				payment_entry.save()
+						sales_invoice = si_item_details[0].parent
+
+				payment_entry = create_payment_entry(
+					wc_order,
+					sales_order,
+					company=company,  # type: ignore
+					company_bank_account=company_bank_account,
+					company_gl_account=company_gl_account,
+					sales_invoice=sales_invoice,
+				)
 
 				# Link created Payment Entry to Sales Order
 				sales_order.woocommerce_payment_entry = payment_entry.name  # type: ignore
+			else:
+				sales_order.woocommerce_payment_sync_skipped = 1
 			return True
 		return False
 
+	@profile_phase("sales_order")
 	def create_sales_order(self) -> None:
 		"""
 		Create an ERPNext Sales Order from the given WooCommerce Order
@@ -556,24 +683,42 @@ class SynchroniseSalesOrder(SynchroniseWooCommerce):
 		new_sales_order.woocommerce_last_sync_hash = self.woocommerce_order.woocommerce_date_modified
 		new_sales_order.flags.ignore_mandatory = True
 		new_sales_order.flags.created_by_sync = True
-		new_sales_order.insert()
-		if wc_server.submit_sales_orders:
-			new_sales_order.submit()
 
-		new_sales_order.reload()
-		self.create_and_link_payment_entry(self.woocommerce_order, new_sales_order)
+		# Decide up front what the final state of the Sales Order should be, so that it can be persisted
+		# with as few writes (and validation runs) as possible
+		submit = bool(wc_server.submit_sales_orders)
+		cancel = submit and self.woocommerce_order.status == "cancelled"
+		if submit:
+			# Inserting with docstatus 1 validates and submits the document in a single step
+			new_sales_order.docstatus = 1
 
+		frappe.db.savepoint(SALES_ORDER_SAVEPOINT)
 		try:
-			if self.woocommerce_order.status == "cancelled":
+			new_sales_order.insert()
+
+			if cancel:
 				new_sales_order.cancel()
-			else:
-				new_sales_order.save()
+			elif submit and self.create_and_link_payment_entry(self.woocommerce_order, new_sales_order):
+				if new_sales_order.woocommerce_payment_entry:
+					# Link the Payment Entry without running the full Sales Order validation again
+					new_sales_order.db_set(
+						"woocommerce_payment_entry",
+						new_sales_order.woocommerce_payment_entry,
+						update_modified=False,
+					)
+				elif new_sales_order.woocommerce_payment_sync_skipped:
+					new_sales_order.db_set("woocommerce_payment_sync_skipped", 1, update_modified=False)
 		except Exception:
-			error_message = f"{frappe.get_traceback()}\n\nSales Order Data{new_sales_order.as_dict()!s}"
-			frappe.log_error("WooCommerce Error", error_message)
-		finally:
+			frappe.db.rollback(save_point=SALES_ORDER_SAVEPOINT)
+			clear_item_sync_caches()
+			# Logged once by run(), which includes the Sales Order that failed
 			self.sales_order = new_sales_order
+			raise
 
+		frappe.db.release_savepoint(SALES_ORDER_SAVEPOINT)
+		self.sales_order = new_sales_order
+
+	@profile_phase("customer")
 	def create_or_link_customer_and_address(self) -> str | None:
 		"""
 		Create or update Customer and Address records, with special handling for guest orders using order ID.
@@ -678,6 +823,7 @@ class SynchroniseSalesOrder(SynchroniseWooCommerce):
 
 		return customer.name
 
+	@profile_phase("items")
 	def create_missing_items(self):
 		"""
 		Searching for items linked to multiple WooCommerce sites
@@ -692,10 +838,14 @@ class SynchroniseSalesOrder(SynchroniseWooCommerce):
 				)
 				run_item_sync(woocommerce_product_name=woocommerce_product_name)
 
+	@profile_phase("items")
 	def set_items_in_sales_order(self, new_sales_order: SyncedOrder):
 		"""
 		Customised version of set_items_in_sales_order to allow searching for items linked to
 		multiple WooCommerce sites
+
+		All item rows are built first, per-line taxes are aggregated into one row per account and the
+		taxes/missing details calculation is only triggered once for the whole order.
 		"""
 		wc_server: WooCommerceServer = frappe.get_cached_doc(
 			"WooCommerce Server", new_sales_order.woocommerce_server
@@ -703,64 +853,66 @@ class SynchroniseSalesOrder(SynchroniseWooCommerce):
 		if not wc_server.warehouse:
 			frappe.throw(_("Please set Warehouse in WooCommerce Server"))
 
-		for item in json.loads(self.woocommerce_order.line_items):
-			woocomm_item_id = item.get("variation_id") or item.get("product_id")
+		# If we are applying a Sales Taxes and Charges Template (as opposed to Actual Tax), then we need to
+		# determine if the item price should include tax or not
+		rate_includes_tax = False
+		if not wc_server.use_actual_tax_type:
+			tax_template: SalesTaxesandChargesTemplate = frappe.get_cached_doc(
+				"Sales Taxes and Charges Template", wc_server.sales_taxes_and_charges_template
+			)  # type: ignore
+			rate_includes_tax = bool(tax_template.taxes and tax_template.taxes[0].included_in_print_rate)
+
+		line_items = json.loads(self.woocommerce_order.line_items)
+		found_items = get_items_linked_to_woocommerce_ids(
+			[line_item.get("variation_id") or line_item.get("product_id") for line_item in line_items],
+			new_sales_order.woocommerce_server,
+		)
+
+		# Per-line "Actual" taxes, aggregated by account head
+		line_item_taxes: dict[str, float] = {}
+
+		for line_item in line_items:
+			woocomm_item_id = line_item.get("variation_id") or line_item.get("product_id")
 
 			# Deleted items will have a "0" for variation_id/product_id
 			if woocomm_item_id == 0:
-				found_item = create_placeholder_item(new_sales_order)
+				placeholder_item = create_placeholder_item(new_sales_order)
+				found_item = _dict(name=placeholder_item.name, item_name=placeholder_item.item_name)
 			else:
-				iws = frappe.qb.DocType("Item WooCommerce Server")
-				itm = frappe.qb.DocType("Item")
-				item_codes = (
-					frappe.qb.from_(iws)
-					.join(itm)
-					.on(iws.parent == itm.name)
-					.where(
-						(iws.woocommerce_id == cstr(woocomm_item_id))
-						& (iws.woocommerce_server == new_sales_order.woocommerce_server)
-						& (itm.disabled == 0)
-					)
-					.select(iws.parent)
-					.limit(1)
-				).run(as_dict=True)
-
-				found_item: Item | None = frappe.get_doc("Item", item_codes[0].parent) if item_codes else None  # type: ignore
-
-			if found_item:
-				# If we are applying a Sales Taxes and Charges Template (as opposed to Actual Tax), then we need to
-				# determine if the item price should include tax or not
-				if not wc_server.use_actual_tax_type:
-					tax_template: SalesTaxesandChargesTemplate = frappe.get_cached_doc(
-						"Sales Taxes and Charges Template", wc_server.sales_taxes_and_charges_template
-					)  # type: ignore
-
-				item = {
-					"item_code": found_item.name,
-					"item_name": found_item.item_name,
-					"description": found_item.item_name,
-					"qty": item.get("quantity"),
-					"rate": item.get("price")
-					if wc_server.use_actual_tax_type or not tax_template.taxes[0].included_in_print_rate
-					else get_tax_inc_price_for_woocommerce_line_item(item),
-					"warehouse": wc_server.warehouse,
-					"discount_percentage": 100 if item.get("price") == 0 else 0,
-				}
-				if new_sales_order.delivery_date:
-					item["delivery_date"] = new_sales_order.delivery_date
-				wc_server.sales_taxes_and_charges_template
-				new_sales_order.append("items", item)
-
-				if not wc_server.use_actual_tax_type:
-					new_sales_order.taxes_and_charges = wc_server.sales_taxes_and_charges_template
-
-					# Trigger taxes calculation
-					new_sales_order.set_missing_lead_customer_details()
-				else:
-					ordered_items_tax = item.get("total_tax")
-					add_tax_details(
-						new_sales_order, ordered_items_tax, "Ordered Item tax", wc_server.tax_account
-					)
+				found_item = found_items.get(cstr(woocomm_item_id))
+
+			if not found_item:
+				continue
+
+			item_row = {
+				"item_code": found_item.name,
+				"item_name": found_item.item_name,
+				"description": found_item.item_name,
+				"qty": line_item.get("quantity"),
+				"rate": get_tax_inc_price_for_woocommerce_line_item(line_item)
+				if rate_includes_tax
+				else line_item.get("price"),
+				"warehouse": wc_server.warehouse,
+				"discount_percentage": 100 if line_item.get("price") == 0 else 0,
+			}
+			if new_sales_order.delivery_date:
+				item_row["delivery_date"] = new_sales_order.delivery_date
+			new_sales_order.append("items", item_row)
+
+			if wc_server.use_actual_tax_type:
+				line_item_taxes[wc_server.tax_account] = line_item_taxes.get(wc_server.tax_account, 0) + flt(
+					line_item.get("total_tax")
+				)
+
+		if not wc_server.use_actual_tax_type:
+			if new_sales_order.items:
+				new_sales_order.taxes_and_charges = wc_server.sales_taxes_and_charges_template
+
+				# Trigger taxes calculation once, after all the items have been added
+				new_sales_order.set_missing_lead_customer_details()
+		else:
+			for tax_account_head, tax_amount in line_item_taxes.items():
+				add_tax_details(new_sales_order, tax_amount, "Ordered Item tax", tax_account_head)
 
 		# If a Shipping Rule is added, shipping charges will be determined by the Shipping Rule. If not, then
 		# get it from the WooCommerce Order
@@ -786,6 +938,7 @@ class SynchroniseSalesOrder(SynchroniseWooCommerce):
 			new_sales_order.base_rounded_total = float(self.woocommerce_order.total)
 			new_sales_order.rounded_total = float(self.woocommerce_order.total)
 
+	@profile_phase("address")
 	def create_or_update_address(self, billing: dict, shipping: dict) -> Address:
 		"""
 		If the address(es) exist, update it, else create it
@@ -925,6 +1078,7 @@ def get_list_of_wc_orders(
 	sales_order: SyncedOrder | None = None,
 	date_time_from: datetime | None = None,
 	status: str | None = None,
+	woocommerce_server: str | None = None,
 ) -> list[WooCommerceOrder]:
 	"""
 	Fetches a list of WooCommerce Orders within a specified date range or linked with a Sales Order.
@@ -935,13 +1089,15 @@ def get_list_of_wc_orders(
 	Args:
 		sales_order: Optional ERPNext order to sync with WooCommerce
 		date_time_from: Optional datetime to filter orders modified after this time
+		status: Optional comma separated WooCommerce order statuses to filter on
+		woocommerce_server: Optional WooCommerce Server to limit the orders to
 
 	Returns:
 		List of WooCommerceProduct documents
 	"""
 	# Build filters
 	filters = []
-	servers = None
+	servers = [woocommerce_server] if woocommerce_server else None
 
 	settings: WooCommerceSettings = frappe.get_cached_doc("WooCommerce Settings")  # type: ignore
 	minimum_creation_date = settings.minimum_creation_date
@@ -974,9 +1130,14 @@ def get_list_of_wc_orders(
 				"filters": filters,
 				"servers": servers,
 				"as_doc": True,
+				# Synchronisation needs the current records from WooCommerce, not a local copy
+				"skip_cache": True,
+				"skip_mirror": True,
+				# Walk the records by date modified, so that deep pulls cost the same per page
+				"keyset_pagination": True,
 				# Let the API handle pagination efficiently
 				# Set a reasonable limit for maximum records
-				"page_length": 1 if sales_order else 1000,
+				"page_length": 1 if sales_order else SWEEP_PAGE_LENGTH,
 			}
 		)
 
@@ -998,6 +1159,7 @@ def rename_address(address, customer):
 	frappe.rename_doc("Address", old_address_title, new_address_title)
 
 
+@profile_phase("contact")
 def create_contact(data, billing_address, customer):
 	email = data.get("email", None)
 	phone = data.get("phone", None)
@@ -1025,6 +1187,50 @@ def create_contact(data, billing_address, customer):
 	return contact
 
 
+def create_payment_entry(
+	wc_order: WooCommerceOrder | dict,
+	sales_order: SyncedOrder | dict,
+	company: str,
+	company_bank_account: str,
+	company_gl_account: str,
+	sales_invoice: str | None = None,
+):
+	"""
+	Create a Payment Entry for a paid WooCommerce Order, referencing the Sales Invoice if the Sales Order
+	has been billed, else the Sales Order itself
+	"""
+	# Attempt to get Payfast Transaction ID
+	payment_reference_no = wc_order.get("transaction_id", None)
+
+	reference_doctype = "Sales Invoice" if sales_invoice else "Sales Order"
+	reference_name = sales_invoice or sales_order.get("name")
+	total_amount = sales_order.get("grand_total")
+
+	# Create Payment Entry
+	payment_entry_dict = {
+		"company": company,
+		"payment_type": "Receive",
+		"reference_no": payment_reference_no or wc_order.get("payment_method_title"),
+		"reference_date": wc_order.get("date_paid"),
+		"party_type": "Customer",
+		"party": sales_order.get("customer"),
+		"posting_date": wc_order.get("date_paid") or sales_order.get("transaction_date"),
+		"paid_amount": float(wc_order.get("total")),  # type: ignore
+		"received_amount": float(wc_order.get("total")),  # type: ignore
+		"bank_account": company_bank_account,
+		"paid_to": company_gl_account,
+	}
+	payment_entry = frappe.new_doc("Payment Entry")
+	payment_entry.update(payment_entry_dict)
+	row = payment_entry.append("references")
+	row.reference_doctype = reference_doctype
+	row.reference_name = reference_name
+	row.total_amount = total_amount
+	row.allocated_amount = total_amount
+	payment_entry.save()
+	return payment_entry
+
+
 def add_tax_details(sales_order, price, desc, tax_account_head):
 	sales_order.append(
 		"taxes",
@@ -1047,6 +1253,38 @@ def get_tax_inc_price_for_woocommerce_line_item(line_item: dict):
 	)
 
 
+def get_items_linked_to_woocommerce_ids(woocommerce_ids: list, woocommerce_server: str) -> dict[str, _dict]:
+	"""
+	Return enabled Items linked to the given WooCommerce IDs on a WooCommerce Server, in a single query
+
+	Returns:
+		dict: WooCommerce ID (as a string) mapped to an _dict with the Item's name and item_name
+	"""
+	woocommerce_ids = list({cstr(woocommerce_id) for woocommerce_id in woocommerce_ids if woocommerce_id})
+	if not woocommerce_ids:
+		return {}
+
+	iws = frappe.qb.DocType("Item WooCommerce Server")
+	itm = frappe.qb.DocType("Item")
+	rows = (
+		frappe.qb.from_(iws)
+		.join(itm)
+		.on(iws.parent == itm.name)
+		.where(
+			(iws.woocommerce_id.isin(woocommerce_ids))
+			& (iws.woocommerce_server == woocommerce_server)
+			& (itm.disabled == 0)
+		)
+		.select(iws.woocommerce_id, itm.name, itm.item_name)
+	).run(as_dict=True)
+
+	items = {}
+	for row in rows:
+		# Keep the first match, in line with the previous per-line lookup
+		items.setdefault(cstr(row.woocommerce_id), _dict(name=row.name, item_name=row.item_name))
+	return items
+
+
 def create_placeholder_item(sales_order: SyncedOrder):
 	"""
 	Create a placeholder Item for deleted WooCommerce Products
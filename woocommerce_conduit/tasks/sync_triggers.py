@@ -0,0 +1,115 @@
+import time
+
+import frappe
+
+from woocommerce_conduit.tasks.utils import clear_item_sync_caches
+
+SYNC_TRIGGERS_CACHE_KEY = "woocommerce_sync_triggers"
+SYNC_TRIGGERS_JOB_ID = "woocommerce_sync_triggers"
+SYNC_TRIGGER_DELIMITER = "::"
+SYNC_TRIGGER_SAVEPOINT = "woocommerce_sync_trigger"
+
+# Functions that synchronise a single (name, woocommerce_server) pair for each supported DocType
+SYNC_TRIGGER_HANDLERS = {
+	"Item": "woocommerce_conduit.tasks.sync_items.run_item_sync_from_trigger",
+	"Sales Order": "woocommerce_conduit.tasks.sync_sales_orders.run_sales_order_sync_from_trigger",
+}
+
+
+def queue_sync_trigger(doctype: str, name: str, woocommerce_server: str):
+	"""
+	Register that a document should be synchronised with a WooCommerce Server.
+
+	Triggers are keyed by (doctype, name, woocommerce_server), so repeated events for the same document
+	within the debounce window collapse into a single synchronisation.
+	"""
+	key = SYNC_TRIGGER_DELIMITER.join([doctype, name, woocommerce_server])
+	frappe.cache().hset(SYNC_TRIGGERS_CACHE_KEY, key, time.time())
+	enqueue_sync_triggers(enqueue_after_commit=True)
+
+
+def enqueue_pending_sync_triggers():
+	"""
+	Queue the processing of pending triggers, in case their job was lost. Runs from the scheduler
+	"""
+	if get_pending_sync_triggers():
+		enqueue_sync_triggers()
+
+
+def enqueue_sync_triggers(enqueue_after_commit: bool = False):
+	"""
+	Queue process_sync_triggers, unless it is queued or running already
+	"""
+	frappe.enqueue(
+		process_sync_triggers,
+		queue="long",
+		timeout=1500,
+		job_id=SYNC_TRIGGERS_JOB_ID,
+		deduplicate=True,
+		enqueue_after_commit=enqueue_after_commit,
+		now=frappe.flags.in_test,
+	)
+
+
+def process_sync_triggers():
+	"""
+	Synchronise all documents whose last trigger is older than the debounce window.
+
+	Keeps running while triggers are pending, as triggers registered while this job is running are not
+	queued again.
+	"""
+	settings = frappe.get_cached_doc("WooCommerce Settings")
+	debounce_seconds = 0 if frappe.flags.in_test else (settings.get("sync_trigger_debounce") or 0)
+
+	while triggers := get_pending_sync_triggers():
+		now = time.time()
+		due = [key for key, triggered_at in triggers.items() if triggered_at <= now - debounce_seconds]
+
+		if not due:
+			time.sleep(max(0.5, min(triggers.values()) + debounce_seconds - now))
+			continue
+
+		for key in due:
+			# Only the worker that removes the trigger processes it
+			if not claim_sync_trigger(key):
+				continue
+			run_sync_trigger(key)
+
+
+def get_pending_sync_triggers() -> dict[str, float]:
+	return {
+		frappe.safe_decode(key): triggered_at
+		for key, triggered_at in frappe.cache().hgetall(SYNC_TRIGGERS_CACHE_KEY).items()
+	}
+
+
+def claim_sync_trigger(key: str) -> bool:
+	"""
+	Remove a trigger, and return whether it was still pending. RedisWrapper.hdel doesn't return how many
+	fields it removed, so this uses the raw HDEL command
+	"""
+	cache = frappe.cache()
+	return bool(cache.pipeline().hdel(cache.make_key(SYNC_TRIGGERS_CACHE_KEY), key).execute()[0])
+
+
+def run_sync_trigger(key: str):
+	"""
+	Synchronise the document of a trigger in a transaction of its own. Tests run triggers synchronously,
+	inside the transaction that the test rolls back afterwards, so nothing is committed then
+	"""
+	doctype, name, woocommerce_server = key.split(SYNC_TRIGGER_DELIMITER, 2)
+	frappe.db.savepoint(SYNC_TRIGGER_SAVEPOINT)
+	try:
+		frappe.get_attr(SYNC_TRIGGER_HANDLERS[doctype])(name, woocommerce_server)
+	except Exception:
+		frappe.db.rollback(save_point=SYNC_TRIGGER_SAVEPOINT)
+		clear_item_sync_caches()
+		frappe.log_error(
+			"WooCommerce Sync Trigger Error",
+			f"Error synchronising {doctype} {name} with {woocommerce_server}\n\n{frappe.get_traceback()}",
+		)
+	else:
+		frappe.db.release_savepoint(SYNC_TRIGGER_SAVEPOINT)
+
+	if not frappe.flags.in_test:
+		frappe.db.commit()  # nosemgrep
@@ -0,0 +1,57 @@
+# Copyright (c) 2025, Karol Parzonka and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from woocommerce_conduit.tasks.sync_items import ERPNextItemToSync, SynchroniseItem, get_content_hash
+
+
+class TestSynchroniseItem(FrappeTestCase):
+	def test_unchanged_item_is_not_synchronised_again(self):
+		wc_server = frappe._dict(name="woocommerce.example.com", enable_image_sync=1, item_field_map=[])
+		woocommerce_product = frappe._dict(
+			woocommerce_server="woocommerce.example.com",
+			woocommerce_id=101,
+			woocommerce_name="Test T-Shirt",
+			image=None,
+			woocommerce_date_modified="2025-05-02 10:00:00",
+		)
+		item = frappe._dict(
+			item_name="Test T-Shirt",
+			image="/files/t-shirt.jpg",
+			modified="2025-05-01 10:00:00",
+			woocommerce_servers=[frappe._dict(enable_sync=1, woocommerce_content_hash=None)],
+		)
+
+		with patch("frappe.get_cached_doc", return_value=wc_server):
+			sync = SynchroniseItem(
+				servers=[wc_server],
+				item=ERPNextItemToSync(item=item, item_woocommerce_server_idx=1),
+				woocommerce_product=woocommerce_product,
+			)
+			product_hash, item_hash = sync.get_content_hashes()
+			self.assertEqual(product_hash, item_hash)
+
+			# The hash stored by the first synchronisation
+			item.woocommerce_servers[0].woocommerce_content_hash = product_hash
+			with (
+				patch.object(SynchroniseItem, "update_item") as update_item,
+				patch.object(SynchroniseItem, "update_woocommerce_product") as update_woocommerce_product,
+				patch.object(SynchroniseItem, "set_sync_hash") as set_sync_hash,
+			):
+				sync.sync_wc_product_with_erpnext_item()
+
+		update_item.assert_not_called()
+		update_woocommerce_product.assert_not_called()
+		set_sync_hash.assert_not_called()
+		self.assertEqual(sync.outcome, "Skipped")
+
+	def test_only_numeric_fields_are_compared_as_numbers(self):
+		self.assertNotEqual(get_content_hash({"sku": "0012"}), get_content_hash({"sku": "12"}))
+		self.assertEqual(
+			get_content_hash({"price": "1.50"}, {"price"}), get_content_hash({"price": 1.5}, {"price"})
+		)
+		self.assertEqual(get_content_hash({"description": None}), get_content_hash({"description": ""}))
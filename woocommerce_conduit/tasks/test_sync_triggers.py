@@ -0,0 +1,36 @@
+# Copyright (c) 2025, Karol Parzonka and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from woocommerce_conduit.tasks.sync_triggers import (
+	SYNC_TRIGGER_HANDLERS,
+	SYNC_TRIGGERS_CACHE_KEY,
+	get_pending_sync_triggers,
+	queue_sync_trigger,
+)
+
+handled_triggers = []
+
+
+def handle_sync_trigger(name: str, woocommerce_server: str):
+	handled_triggers.append((name, woocommerce_server))
+
+
+class TestSyncTriggers(FrappeTestCase):
+	def setUp(self):
+		handled_triggers.clear()
+		frappe.cache().delete_value(SYNC_TRIGGERS_CACHE_KEY)
+
+	def tearDown(self):
+		frappe.cache().delete_value(SYNC_TRIGGERS_CACHE_KEY)
+
+	def test_queued_trigger_runs_handler(self):
+		with patch.dict(SYNC_TRIGGER_HANDLERS, {"Item": f"{__name__}.handle_sync_trigger"}):
+			queue_sync_trigger("Item", "_Test Item", "_Test WooCommerce Server")
+
+		self.assertEqual(handled_triggers, [("_Test Item", "_Test WooCommerce Server")])
+		self.assertEqual(get_pending_sync_triggers(), {})
@@ -1,5 +1,9 @@
 import frappe
 import requests
+from frappe.utils import add_to_date, get_datetime, now_datetime
+
+# Maximum number of records a sweep pulls from a WooCommerce Server, in order of modification
+SWEEP_PAGE_LENGTH = 1000
 
 
 def log_woocommerce_request(
@@ -28,3 +32,61 @@ def log_woocommerce_request(
 	request_log = frappe.get_doc(data)
 
 	request_log.save(ignore_permissions=True)
+
+
+def is_polling_due(last_sync_date) -> bool:
+	"""
+	Check if a scheduled polling sync should run, based on the Polling Interval in WooCommerce Settings.
+
+	Allows for a few minutes of scheduler drift, so that an hourly interval still runs on every hourly job.
+	"""
+	if not last_sync_date:
+		return True
+
+	settings = frappe.get_cached_doc("WooCommerce Settings")
+	polling_interval = settings.get("polling_interval") or 1
+	next_sync_date = add_to_date(get_datetime(last_sync_date), hours=polling_interval, minutes=-5)
+	return now_datetime() >= next_sync_date
+
+
+def get_sweep_checkpoint(records: list, sweep_started):
+	"""
+	Get the date the next sweep should continue from.
+
+	Sweeps pull at most SWEEP_PAGE_LENGTH records, in order of modification. A sweep that was cut short
+	continues from the last record it pulled, one second early as WooCommerce compares dates to the second,
+	rather than from when it started, so that the records it didn't reach are pulled by the next sweep.
+	"""
+	if len(records) < SWEEP_PAGE_LENGTH or not records[-1].get("woocommerce_date_modified"):
+		return sweep_started
+	return add_to_date(get_datetime(records[-1].get("woocommerce_date_modified")), seconds=-1)
+
+
+def clear_item_sync_caches():
+	"""
+	Forget the parent Items and Item Attributes that the current order or sweep has synchronised (see
+	parent_item_cache), after the writes that created them were rolled back
+	"""
+	frappe.local.woocommerce_rollback_clear_registered = False
+	if (parent_items := getattr(frappe.local, "woocommerce_parent_items", None)) is not None:
+		parent_items.clear()
+	if (item_attributes := getattr(frappe.local, "woocommerce_item_attributes", None)) is not None:
+		item_attributes.values.clear()
+
+
+def clear_item_sync_caches_on_rollback():
+	"""
+	Clear the item sync caches if the current transaction is rolled back.
+
+	Frappe drops rollback callbacks when a transaction is committed, so this registers the callback once
+	per transaction. Rollbacks to a savepoint don't run the callbacks, so they clear the caches themselves.
+	"""
+	if getattr(frappe.local, "woocommerce_rollback_clear_registered", False):
+		return
+	frappe.local.woocommerce_rollback_clear_registered = True
+	frappe.db.after_rollback.add(clear_item_sync_caches)
+	frappe.db.before_commit.add(reset_item_sync_caches_on_rollback)
+
+
+def reset_item_sync_caches_on_rollback():
+	frappe.local.woocommerce_rollback_clear_registered = False
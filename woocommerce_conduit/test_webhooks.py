@@ -0,0 +1,42 @@
+# Copyright (c) 2025, Karol Parzonka and Contributors
+# See license.txt
+
+from copy import deepcopy
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from woocommerce_conduit.webhooks import sync_webhook_payload
+
+# A product.updated delivery for a variation, which lacks the images, rating and attribute slugs of products
+VARIATION_PAYLOAD = {
+	"id": 202,
+	"parent_id": 201,
+	"name": "Test T-Shirt - Red",
+	"sku": "TEST-TSHIRT-RED",
+	"status": "publish",
+	"date_created": "2025-05-01T10:00:00",
+	"date_modified": "2025-05-02T10:00:00",
+	"price": "10.00",
+	"regular_price": "10.00",
+	"image": {"id": 301, "src": "https://woocommerce.example.com/red.jpg"},
+	"dimensions": {"length": "", "width": "", "height": ""},
+	"attributes": [{"id": 1, "name": "Colour", "option": "Red"}],
+}
+
+
+class TestWebhooks(FrappeTestCase):
+	def test_variation_payload_is_synchronised(self):
+		wc_server = frappe._dict(woocommerce_server_url="https://woocommerce.example.com")
+		with (
+			patch("woocommerce_conduit.webhooks.get_parent_woocommerce_name", return_value="Test T-Shirt"),
+			patch("woocommerce_conduit.webhooks.SynchroniseItem") as synchronise_item,
+		):
+			sync_webhook_payload(wc_server, "product", deepcopy(VARIATION_PAYLOAD))
+
+		woocommerce_product = synchronise_item.call_args.kwargs["woocommerce_product"]
+		self.assertEqual(woocommerce_product.type, "variation")
+		self.assertEqual(woocommerce_product.woocommerce_name, "Test T-Shirt - Red")
+		self.assertEqual(woocommerce_product.image, "https://woocommerce.example.com/red.jpg")
+		synchronise_item.return_value.run.assert_called_once()
@@ -0,0 +1,207 @@
+import base64
+import hashlib
+import hmac
+import json
+from urllib.parse import urlparse
+
+import frappe
+from frappe import _
+from frappe.utils import cint
+from frappe.utils.password import get_decrypted_password
+
+from woocommerce_conduit.tasks.sync_items import SynchroniseItem
+from woocommerce_conduit.tasks.sync_sales_orders import SynchroniseSalesOrder
+from woocommerce_conduit.tasks.utils import clear_item_sync_caches
+from woocommerce_conduit.woocommerce_conduit.doctype.woocommerce_order.woocommerce_order import (
+	WooCommerceOrder,
+)
+from woocommerce_conduit.woocommerce_conduit.doctype.woocommerce_product.woocommerce_product import (
+	WooCommerceProduct,
+)
+from woocommerce_conduit.woocommerce_conduit.doctype.woocommerce_server.woocommerce_server import (
+	WooCommerceServer,
+)
+from woocommerce_conduit.woocommerce_conduit.mirror import delete_mirror_records
+from woocommerce_conduit.woocommerce_conduit.record_stats import remove_record_stats
+from woocommerce_conduit.woocommerce_conduit.woocommerce_api import (
+	generate_woocommerce_record_name_from_domain_and_id,
+)
+
+# Supported webhook topics, and the WooCommerce resource they deliver
+WEBHOOK_TOPICS = {
+	"order.created": "order",
+	"order.updated": "order",
+	"product.updated": "product",
+	"order.deleted": "order",
+	"product.deleted": "product",
+}
+WEBHOOK_EVENT_SAVEPOINT = "woocommerce_webhook_event"
+
+
+@frappe.whitelist(allow_guest=True, methods=["POST"])
+def receive():
+	"""
+	Receive a WooCommerce webhook delivery.
+
+	The signature is verified against the WooCommerce Server's Webhook Secret, the payload is stored as a
+	WooCommerce Webhook Event and a (deduplicated) background job is queued to synchronise the record.
+	"""
+	topic = frappe.get_request_header("X-WC-Webhook-Topic")
+	source = frappe.get_request_header("X-WC-Webhook-Source")
+	signature = frappe.get_request_header("X-WC-Webhook-Signature")
+	payload = frappe.request.get_data()
+
+	# WooCommerce sends a ping without a topic when a webhook is created or activated
+	if not topic:
+		return
+
+	wc_server_name = urlparse(source or "").netloc
+	wc_server = frappe.db.get_value(
+		"WooCommerce Server",
+		wc_server_name,
+		["name", "enabled", "enable_webhooks"],
+		as_dict=True,
+	)
+	if not wc_server or not wc_server.enabled or not wc_server.enable_webhooks:
+		frappe.throw(_("Webhooks are not enabled for this WooCommerce Server"), frappe.AuthenticationError)
+
+	webhook_secret = get_decrypted_password(
+		"WooCommerce Server", wc_server.name, "webhook_secret", raise_exception=False
+	)
+	if not verify_webhook_signature(payload, signature, webhook_secret):
+		frappe.throw(_("Invalid WooCommerce webhook signature"), frappe.AuthenticationError)
+
+	if topic not in WEBHOOK_TOPICS:
+		return
+
+	record = json.loads(payload)
+	resource = WEBHOOK_TOPICS[topic]
+	woocommerce_id = str(record.get("id"))
+
+	frappe.get_doc(
+		{
+			"doctype": "WooCommerce Webhook Event",
+			"topic": topic,
+			"delivery_id": frappe.get_request_header("X-WC-Webhook-Delivery-ID"),
+			"woocommerce_server": wc_server.name,
+			"resource": resource,
+			"woocommerce_id": woocommerce_id,
+			"payload": frappe.as_json(record),
+		}
+	).insert(ignore_permissions=True)
+
+	# Repeated deliveries for the same record collapse into one job, which always processes the latest payload
+	frappe.enqueue(
+		process_webhook_events,
+		queue="long",
+		timeout=300,
+		job_id=f"woocommerce_webhook::{wc_server.name}::{resource}::{woocommerce_id}",
+		deduplicate=True,
+		enqueue_after_commit=True,
+		woocommerce_server=wc_server.name,
+		resource=resource,
+		woocommerce_id=woocommerce_id,
+	)
+
+
+def verify_webhook_signature(payload: bytes, signature: str | None, secret: str | None) -> bool:
+	"""
+	Verify the X-WC-Webhook-Signature header, a base64 encoded HMAC-SHA256 of the raw payload
+	"""
+	if not signature or not secret:
+		return False
+	expected_signature = base64.b64encode(
+		hmac.new(secret.encode(), payload, hashlib.sha256).digest()
+	).decode()
+	return hmac.compare_digest(expected_signature, signature)
+
+
+def process_webhook_events(woocommerce_server: str, resource: str, woocommerce_id: str):
+	"""
+	Synchronise the latest queued Webhook Event for a record, marking older queued Events as superseded
+	"""
+	wc_server: WooCommerceServer = frappe.get_cached_doc("WooCommerce Server", woocommerce_server)  # type: ignore
+	if wc_server.creation_user:
+		frappe.set_user(wc_server.creation_user)
+
+	# Deliveries that arrive while a job is running are not queued again, so keep going until none are left
+	while events := frappe.get_all(
+		"WooCommerce Webhook Event",
+		filters={
+			"woocommerce_server": woocommerce_server,
+			"resource": resource,
+			"woocommerce_id": woocommerce_id,
+			"status": "Queued",
+		},
+		fields=["name"],
+		order_by="creation desc",
+	):
+		for superseded_event in events[1:]:
+			frappe.db.set_value("WooCommerce Webhook Event", superseded_event.name, "status", "Superseded")
+
+		event = frappe.get_doc("WooCommerce Webhook Event", events[0].name)
+		frappe.db.savepoint(WEBHOOK_EVENT_SAVEPOINT)
+		try:
+			if event.topic.endswith(".deleted"):
+				remove_deleted_record(wc_server, resource, json.loads(event.payload))
+			else:
+				sync_webhook_payload(wc_server, resource, json.loads(event.payload))
+			event.db_set("status", "Processed")
+		except Exception:
+			# Discard whatever the failed sync wrote, but keep the superseded Events marked as such
+			frappe.db.rollback(save_point=WEBHOOK_EVENT_SAVEPOINT)
+			clear_item_sync_caches()
+			event.db_set({"status": "Failed", "error": frappe.get_traceback()})
+		else:
+			frappe.db.release_savepoint(WEBHOOK_EVENT_SAVEPOINT)
+		frappe.db.commit()  # nosemgrep
+
+
+def sync_webhook_payload(wc_server: WooCommerceServer, resource: str, record: dict):
+	"""
+	Synchronise a complete WooCommerce record, as delivered by a webhook, without fetching it again
+	"""
+	if resource == "order":
+		record = WooCommerceOrder.pre_init_document(
+			record, woocommerce_server_url=wc_server.woocommerce_server_url
+		)
+		WooCommerceOrder.invalidate_list_cache(records=[record])
+		woocommerce_order: WooCommerceOrder = frappe.get_doc(record)  # type: ignore
+		SynchroniseSalesOrder(woocommerce_order=woocommerce_order).run()
+	elif resource == "product":
+		record = WooCommerceProduct.pre_init_document(
+			record, woocommerce_server_url=wc_server.woocommerce_server_url
+		)
+		# Variations are named after their parent product, just like when they are fetched with it
+		record = WooCommerceProduct.during_get_list_of_records(
+			record, {"metadata": {"parent_woocommerce_name": get_parent_woocommerce_name(record)}}
+		)
+		record = WooCommerceProduct.after_load_from_db(record)
+		WooCommerceProduct.invalidate_list_cache(records=[record])
+		woocommerce_product: WooCommerceProduct = frappe.get_doc(record)  # type: ignore
+		SynchroniseItem(woocommerce_product=woocommerce_product).run()
+
+
+def remove_deleted_record(wc_server: WooCommerceServer, resource: str, record: dict):
+	"""
+	Remove a record that was deleted in WooCommerce from the caches, the list stats and the mirror. The
+	ERPNext Items and Sales Orders it was synchronised with are kept
+	"""
+	controller = WooCommerceOrder if resource == "order" else WooCommerceProduct
+	name = generate_woocommerce_record_name_from_domain_and_id(wc_server.name, record["id"])
+	controller.invalidate_list_cache(names=[name])
+	remove_record_stats(controller.doctype, [name])
+	delete_mirror_records(controller.doctype, [name])
+
+
+def get_parent_woocommerce_name(record: dict) -> str | None:
+	"""
+	Get the name of a variation's parent product, or None if the record isn't a variation
+	"""
+	if not cint(record.get("parent_id")):
+		return None
+	parent_product: WooCommerceProduct = frappe.get_doc(
+		"WooCommerce Product",
+		generate_woocommerce_record_name_from_domain_and_id(record["woocommerce_server"], record["parent_id"]),
+	)  # type: ignore
+	return parent_product.woocommerce_name
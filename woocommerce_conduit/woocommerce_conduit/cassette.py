@@ -0,0 +1,126 @@
+import gzip
+import json
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlencode, urlparse
+
+import frappe
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from woocommerce_conduit.exceptions import CassetteMissError
+
+# Site config key, e.g. {"mode": "replay", "path": "cassettes/orders.jsonl.gz", "latency": 0.05}
+CASSETTE_CONFIG_KEY = "woocommerce_cassette"
+# Parameters that differ between identical requests, e.g. credentials added for query string authentication
+VOLATILE_PARAMS = ("consumer_key", "consumer_secret")
+# Headers that describe the recorded transfer rather than the response
+TRANSFER_HEADERS = ("content-encoding", "content-length", "transfer-encoding", "connection")
+
+cassettes: dict[tuple[str, str], "Cassette"] = {}
+cassettes_lock = threading.Lock()
+
+
+class Cassette:
+	"""
+	Recorded WooCommerce API requests and responses, for profiling and testing without a live shop.
+
+	In record mode, every response is appended to a gzip-compressed file of JSON lines, keyed by the
+	server's domain, the method, the endpoint and the normalised parameters. In replay mode, the responses
+	are served from the file instead, in the order they were recorded for each key, and the last one is
+	repeated once they run out.
+
+	Args:
+		path: Path of the cassette, relative to the site's directory
+		mode: "record" or "replay"
+		latency: Seconds to wait before every replayed response, or "recorded" to wait as long as the
+			recorded request took
+		ignore_params: Parameters left out of the keys, e.g. modified_after, which depends on when a
+			synchronisation ran
+	"""
+
+	def __init__(
+		self, path: str, mode: str, latency: float | str = 0.0, ignore_params: list[str] | None = None
+	):
+		if mode not in ("record", "replay"):
+			frappe.throw(f"Unknown WooCommerce cassette mode '{mode}', expected 'record' or 'replay'")
+
+		self.path = frappe.get_site_path(path)
+		self.mode = mode
+		self.latency = latency
+		self.ignore_params = set(VOLATILE_PARAMS) | set(ignore_params or [])
+		self.lock = threading.Lock()
+		self.interactions: dict[str, list[dict]] = defaultdict(list)
+		self.replayed: dict[str, int] = defaultdict(int)
+
+		if mode == "replay":
+			with gzip.open(self.path, "rt", encoding="utf-8") as cassette:
+				for line in cassette:
+					interaction = json.loads(line)
+					self.interactions[interaction["key"]].append(interaction)
+
+	def key(self, url: str, method: str, endpoint: str, params: dict | None) -> str:
+		params = {
+			param: ",".join(map(str, value)) if isinstance(value, list | tuple) else str(value)
+			for param, value in (params or {}).items()
+			if param not in self.ignore_params
+		}
+		return f"{urlparse(url).netloc} {method} {endpoint.strip('/')}?{urlencode(sorted(params.items()))}"
+
+	def record(self, key: str, response: Response):
+		interaction = {
+			"key": key,
+			"url": response.url.split("?")[0],
+			"status_code": response.status_code,
+			"headers": {
+				header: value
+				for header, value in response.headers.items()
+				if header.lower() not in TRANSFER_HEADERS
+			},
+			"body": response.text,
+			"elapsed": response.elapsed.total_seconds(),
+		}
+		line = json.dumps(interaction) + "\n"
+
+		# Every line is appended as a gzip member of its own, which gzip reads back as one stream
+		with self.lock, gzip.open(self.path, "at", encoding="utf-8") as cassette:
+			cassette.write(line)
+
+	def replay(self, key: str) -> Response:
+		with self.lock:
+			if not (interactions := self.interactions.get(key)):
+				raise CassetteMissError(f"No recorded WooCommerce response for {key}")
+			interaction = interactions[min(self.replayed[key], len(interactions) - 1)]
+			self.replayed[key] += 1
+
+		latency = interaction["elapsed"] if self.latency == "recorded" else float(self.latency or 0)
+		if latency:
+			time.sleep(latency)
+
+		response = Response()
+		response.status_code = interaction["status_code"]
+		response.headers = CaseInsensitiveDict(interaction["headers"])
+		response._content = interaction["body"].encode("utf-8")
+		response.encoding = "utf-8"
+		response.url = interaction["url"]
+		return response
+
+
+def get_cassette() -> Cassette | None:
+	"""
+	Get the cassette configured in the site config, if any
+	"""
+	if not (config := frappe.conf.get(CASSETTE_CONFIG_KEY)):
+		return None
+
+	cache_key = (frappe.local.site, json.dumps(config, sort_keys=True))
+	with cassettes_lock:
+		if cache_key not in cassettes:
+			cassettes[cache_key] = Cassette(
+				path=config["path"],
+				mode=config.get("mode", "replay"),
+				latency=config.get("latency", 0.0),
+				ignore_params=config.get("ignore_params"),
+			)
+		return cassettes[cache_key]
@@ -18,6 +18,7 @@ class ItemWooCommerceServer(Document):
 		parent: DF.Data
 		parentfield: DF.Data
 		parenttype: DF.Data
+		woocommerce_content_hash: DF.Data | None
 		woocommerce_id: DF.Data
 		woocommerce_last_sync_hash: DF.Datetime | None
 		woocommerce_server: DF.Link
@@ -1,15 +1,20 @@
 # Copyright (c) 2025, Karol Parzonka and contributors
 # For license information, please see license.txt
 
-import json
 
 import frappe
-import frappe.utils
 from frappe import _dict
 from frappe.model.document import Document
+from frappe.utils import cint
 
+from woocommerce_conduit.woocommerce_conduit.mirror import get_mirror_list, is_mirror_enabled
+from woocommerce_conduit.woocommerce_conduit.record_cache import WooCommerceRecordCache, hash_query
 from woocommerce_conduit.woocommerce_conduit.woocommerce_api import WooCommerceDocument
 
+# Default time in seconds that a cached page of orders is fresh, and time it may be served while stale
+ORDER_LIST_CACHE_TTL = 60
+ORDER_LIST_STALE_TIMEOUT = 60 * 60
+
 WC_ORDER_STATUS_MAPPING = {
 	"Pending Payment": "pending",
 	"On hold": "on-hold",
@@ -105,7 +110,7 @@ class WooCommerceOrder(WooCommerceDocument):
 		return super().load_from_db()
 
 	def db_update(self):
-		pass
+		self.update_changed_fields()
 
 	def delete(self):
 		return super().delete()
@@ -113,86 +118,59 @@ class WooCommerceOrder(WooCommerceDocument):
 	@staticmethod
 	def get_list(args) -> list[_dict | Document] | None:
 		"""
-		Get list of orderss including their variations with intelligent caching.
+		Get list of orders with a short-lived cache.
 
-		This method works with standard Frappe arguments for virtual DocTypes.
-		Results are cached to improve performance for subsequent requests, with
-		cache invalidation based on request parameters.
+		Pages are cached per record, with page indexes per query (see WooCommerceRecordCache). A page
+		that is stale, because it is older than the Order List Cache TTL or orders were modified since,
+		is still returned straight away while a background job refreshes it.
 
 		Args:
 			args: Arguments passed by Frappe (filters, limit, etc.)
 
 		Returns:
-			List: Orders with their variations
+			List: Orders
 		"""
 		# Validate input arguments
 		if not isinstance(args, dict):
 			frappe.log_error("WooCommerce Order Error", "Invalid arguments for get_list")
 			return []
 
-		# Extract settings early for consistency
-		settings = frappe.get_cached_doc("WooCommerce Settings")
-		cache_timeout = getattr(settings, "cache_timeout", 300)  # 5 minutes default
-
 		# Skip cache for specific scenarios
-		skip_cache = args.get("skip_cache", True)
+		skip_cache = args.get("skip_cache", False)
 
 		# For single order lookups, skip cache to ensure fresh data
 		if args.get("filters") and any(f[1] == "id" and f[2] == "=" for f in args["filters"]):
 			skip_cache = True
 
-		# Generate a cache key based on args, excluding non-serializable items
+		as_doc = args.get("as_doc")
+
+		# Serve the list from the mirror, if mirror mode is enabled and the filters can be applied to it
+		if not args.get("skip_mirror") and is_mirror_enabled():
+			if (orders := get_mirror_list("WooCommerce Order", args)) is not None:
+				return [frappe.get_doc(order) for order in orders] if as_doc else orders
+
+		start = cint(args.get("start"))
+		page_length = cint(args.get("page_length")) or 100
+		cache = get_order_list_cache()
+		query = get_cache_query(args)
+
 		if not skip_cache:
 			try:
-				args_for_cache = {
-					k: v
-					for k, v in args.copy().items()
-					if k not in ["metadata", "as_doc", "servers"] and v is not None
-				}
-
-				# Handle filters specially - convert to tuple for hashability
-				if "filters" in args_for_cache and isinstance(args_for_cache["filters"], list):
-					args_for_cache["filters"] = tuple(
-						tuple(f) if isinstance(f, list) else f for f in args_for_cache["filters"]
-					)
-
-				# Add server names if specified
-				if args.get("servers"):
-					args_for_cache["servers"] = tuple(sorted(args["servers"]))
-
-				# Create a deterministic representation for cache key
-				cache_key = f"wc_orders_{frappe.utils.cstr(frappe.generate_hash(str(args_for_cache), 16))}"
-
-				# Try to get cached data
-				cached_data = frappe.cache().get_value(cache_key)
-				if cached_data:
-					cached_orders = json.loads(cached_data)
-
-					# If requesting docs and cache contains dicts, convert to docs
-					if args.get("as_doc") and cached_orders and isinstance(cached_orders[0], dict):
-						return [frappe.get_doc(order) for order in cached_orders]
-
-					return cached_orders
+				orders, stale = cache.get_page_allowing_stale(query, start, page_length)
+				if orders is not None:
+					if stale:
+						enqueue_order_list_refresh(args, query, start, page_length)
+					return [frappe.get_doc(order) for order in orders] if as_doc else orders
 			except Exception as e:
 				frappe.log_error("WooCommerce Cache Error", f"WooCommerce cache fetch error: {e!s}")
 
 		# If cache miss or error, fetch from API
 		try:
-			# Fetch orders with normal implementation
-			orders = WooCommerceOrder.get_list_of_records(args)
-
+			orders = fetch_order_list_page(args, cache, query, start, page_length, cache_page=not skip_cache)
 			if not orders:
 				return []
 
-			# Cache the results before returning (if caching is enabled)
-			if not skip_cache:
-				try:
-					frappe.cache().set_value(cache_key, orders, expires_in_sec=cache_timeout)
-				except Exception as e:
-					frappe.log_error(
-						f"WooCommerce Cache ErrorWooCommerce cache set error: {e!s}",
-					)
-			return orders
+			return [frappe.get_doc(order) for order in orders] if as_doc else orders
 
 		except Exception as e:
 			frappe.log_error(
@@ -207,4 +185,79 @@ class WooCommerceOrder(WooCommerceDocument):
 
 	@staticmethod
 	def get_stats(args):
-		pass
+		return WooCommerceOrder.get_stats_of_records(args)
+
+
+def get_order_list_cache() -> WooCommerceRecordCache:
+	"""
+	Get the cache of WooCommerce Order lists, with the TTL from WooCommerce Settings
+	"""
+	settings = frappe.get_cached_doc("WooCommerce Settings")
+	ttl = cint(getattr(settings, "order_list_cache_ttl", None)) or ORDER_LIST_CACHE_TTL
+	return WooCommerceRecordCache("WooCommerce Order", timeout=ttl, stale_timeout=ORDER_LIST_STALE_TIMEOUT)
+
+
+def get_cache_query(args: dict) -> dict:
+	"""
+	Get the arguments of a get_list call that determine which records it returns
+	"""
+	query = {k: v for k, v in args.items() if k not in ("metadata", "as_doc", "skip_cache", "skip_mirror")}
+	query["doctype"] = "WooCommerce Order"
+	if args.get("servers"):
+		query["servers"] = sorted(args["servers"])
+	return query
+
+
+def fetch_order_list_page(
+	args: dict,
+	cache: WooCommerceRecordCache,
+	query: dict,
+	start: int,
+	page_length: int,
+	cache_page: bool = True,
+) -> list[dict]:
+	"""
+	Fetch a page of orders from WooCommerce as dicts, and cache it
+	"""
+	version = cache.get_version()
+	orders = WooCommerceOrder.get_list_of_records({**args, "as_doc": False})
+
+	if cache_page and orders:
+		try:
+			cache.set_page(query, start, page_length, orders, version=version)
+		except Exception as e:
+			frappe.log_error("WooCommerce Cache Error", f"WooCommerce cache set error: {e!s}")
+
+	return orders
+
+
+def enqueue_order_list_refresh(args: dict, query: dict, start: int, page_length: int):
+	"""
+	Refresh a stale page of orders in the background, at most once at a time per page
+	"""
+	query_hash = hash_query({"query": query, "start": start, "page_length": page_length})
+	frappe.enqueue(
+		refresh_order_list_page,
+		queue="short",
+		job_id=f"woocommerce_order_list_refresh::{query_hash}",
+		deduplicate=True,
+		args={k: v for k, v in args.items() if k != "as_doc"},
+	)
+
+
+def refresh_order_list_page(args: dict):
+	"""
+	Fetch a page of orders again and replace its cached version.
+
+	A page can only extend a page index that is still current, so a stale page after the first one is
+	refreshed by starting a new page index with every order up to the end of the page
+	"""
+	cache = get_order_list_cache()
+	page_end = cint(args.get("start")) + (cint(args.get("page_length")) or 100)
+	fetch_order_list_page(
+		{**args, "start": 0, "page_length": page_end, "max_results": max(page_end, 1000)},
+		cache,
+		get_cache_query(args),
+		0,
+		page_end,
+	)
@@ -0,0 +1,8 @@
+// Copyright (c) 2025, Karol Parzonka and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("WooCommerce Order Mirror", {
+// 	refresh(frm) {
+
+// 	},
+// });
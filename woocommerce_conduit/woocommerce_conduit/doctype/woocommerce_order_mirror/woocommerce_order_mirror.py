@@ -0,0 +1,29 @@
+# Copyright (c) 2025, Karol Parzonka and contributors
+# For license information, please see license.txt
+
+# import frappe
+from frappe.model.document import Document
+
+
+class WooCommerceOrderMirror(Document):
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		complete: DF.Check
+		currency: DF.Data | None
+		customer_id: DF.Int
+		data: DF.JSON | None
+		payment_method: DF.Data | None
+		status: DF.Data | None
+		total: DF.Currency
+		woocommerce_date_created: DF.Datetime | None
+		woocommerce_date_modified: DF.Datetime | None
+		woocommerce_id: DF.Int
+		woocommerce_server: DF.Data | None
+	# end: auto-generated types
+	pass
@@ -2,12 +2,25 @@
 # For license information, please see license.txt
 
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import copy_context
+from urllib.parse import urlparse
 
 import frappe
-import frappe.utils
+from frappe import _
 from frappe.model.document import Document
+from frappe.utils import cint, cstr
 
-from woocommerce_conduit.woocommerce_conduit.woocommerce_api import WooCommerceDocument
+from woocommerce_conduit.exceptions import SyncDisabledError
+from woocommerce_conduit.woocommerce_conduit.mirror import get_mirror_list, is_mirror_enabled
+from woocommerce_conduit.woocommerce_conduit.record_cache import WooCommerceRecordCache
+from woocommerce_conduit.woocommerce_conduit.woocommerce_api import WooCommerceAPI, WooCommerceDocument
+
+# Fields that are needed to list variations and name them after their parent
+VARIATION_LIST_FIELDS = "id,parent_id,name,sku,status,date_created,date_modified,attributes"
+# Redis hash per WooCommerce server domain, mapping product IDs to the modification dates of the product
+# and its variations when they were last fetched
+VARIATION_MANIFEST_CACHE_KEY = "woocommerce_variation_manifest"
 
 
 class WooCommerceProduct(WooCommerceDocument):
@@ -87,23 +100,45 @@ class WooCommerceProduct(WooCommerceDocument):
 	def load_from_db(self):
 		return super().load_from_db()
 
-	def after_load_from_db(self, product: dict):
-		images = json.loads(product["images"])
+	@classmethod
+	def after_load_from_db(cls, product: dict):
+		# Variations have a single image, and neither a list of images nor a rating
+		images = json.loads(product.get("images") or "[]")
 		if len(images) > 0:
 			product["image"] = images[0]["src"]
-		product["length"] = product["dimensions"]["length"]
-		product["width"] = product["dimensions"]["width"]
-		product["height"] = product["dimensions"]["height"]
-		product["average_rating"] = round(float(product["average_rating"]) * 0.2, 1)
-		attributes = json.loads(product["attributes"])
+		elif isinstance(product.get("image"), dict):
+			product["image"] = product["image"].get("src")
+		if dimensions := product.get("dimensions"):
+			product["length"] = dimensions["length"]
+			product["width"] = dimensions["width"]
+			product["height"] = dimensions["height"]
+		if product.get("average_rating") is not None:
+			product["average_rating"] = round(float(product["average_rating"]) * 0.2, 1)
+		attributes = json.loads(product.get("attributes") or "[]")
 		for attribute in attributes:
-			if attribute["slug"] == "pa_producent":
+			if attribute.get("slug") == "pa_producent":
 				product["brand"] = attribute["options"][0]
 				break
 		return product
 
 	def db_update(self):
-		pass
+		self.update_changed_fields()
+
+	def get_record_endpoint(self, record_id: int) -> str:
+		if cint(self.parent_id):
+			return f"products/{self.parent_id}/variations/{record_id}"
+		return super().get_record_endpoint(record_id)
+
+	def map_changed_fields(self, changes: dict) -> dict:
+		# Dimensions are flattened into length, width and height when loaded
+		dimensions = {
+			dimension: cstr(changes.pop(dimension))
+			for dimension in ("length", "width", "height")
+			if dimension in changes
+		}
+		if dimensions:
+			changes["dimensions"] = dimensions
+		return changes
 
 	def delete(self):
 		return super().delete()
@@ -114,8 +149,8 @@ class WooCommerceProduct(WooCommerceDocument):
 		Get list of products including their variations with intelligent caching.
 
 		This method works with standard Frappe arguments for virtual DocTypes.
-		Results are cached to improve performance for subsequent requests, with
-		cache invalidation based on request parameters.
+		Products and variations are cached per record, with page indexes per query (see
+		WooCommerceRecordCache), so that overlapping pages and different queries share record data.
 
 		Args:
 			args: Arguments passed by Frappe (filters, limit, etc.)
@@ -131,8 +166,7 @@ class WooCommerceProduct(WooCommerceDocument):
 		# Extract settings early for consistency
 		settings = frappe.get_cached_doc("WooCommerce Settings")
 		fetch_variations = getattr(settings, "fetch_variations", True)
-		variation_batch_size = getattr(settings, "variation_batch_size", 20)
-		max_variations = getattr(settings, "max_variations", 100)
+		max_variations = getattr(settings, "max_variations", None) or 100
 		cache_timeout = getattr(settings, "cache_timeout", 300)  # 5 minutes default
 
 		# Skip cache for specific scenarios
@@ -142,115 +176,88 @@ class WooCommerceProduct(WooCommerceDocument):
 		if args.get("filters") and any(f[1] == "id" and f[2] == "=" for f in args["filters"]):
 			skip_cache = True
 
-		# Generate a cache key based on args, excluding non-serializable items
-		if not skip_cache:
-			try:
-				args_for_cache = {
-					k: v
-					for k, v in args.copy().items()
-					if k not in ["metadata", "as_doc", "servers"] and v is not None
-				}
-
-				# Handle filters specially - convert to tuple for hashability
-				if "filters" in args_for_cache and isinstance(args_for_cache["filters"], list):
-					args_for_cache["filters"] = tuple(
-						tuple(f) if isinstance(f, list) else f for f in args_for_cache["filters"]
-					)
-
-				# Add server names if specified
-				if args.get("servers"):
-					args_for_cache["servers"] = tuple(sorted(args["servers"]))
+		# Which variations changed since the previous pull can only be determined by fetching them
+		if args.get("only_changed_variations"):
+			skip_cache = True
 
-				# Create a deterministic representation for cache key
-				cache_key = f"wc_products_{frappe.utils.cstr(frappe.generate_hash(str(args_for_cache), 16))}"
+		as_doc = args.get("as_doc")
 
-				# Try to get cached data
-				cached_data = frappe.cache().get_value(cache_key)
-				if cached_data:
-					cached_products = json.loads(cached_data)
+		# Serve the list from the mirror, if mirror mode is enabled and the filters can be applied to it
+		if not args.get("skip_mirror") and is_mirror_enabled():
+			if (products := get_mirror_list("WooCommerce Product", args)) is not None:
+				return [frappe.get_doc(product) for product in products] if as_doc else products
 
-					# If requesting docs and cache contains dicts, convert to docs
-					if args.get("as_doc") and cached_products and isinstance(cached_products[0], dict):
-						return [frappe.get_doc(product) for product in cached_products]
+		start = cint(args.get("start"))
+		page_length = cint(args.get("page_length")) or 100
+		cache = WooCommerceRecordCache("WooCommerce Product", timeout=cache_timeout)
+		query = get_cache_query(args)
 
-					return cached_products
+		if not skip_cache:
+			try:
+				products = cache.get_page(query, start, page_length)
+				if products is not None:
+					variations = (
+						get_cached_variations(cache, products, max_variations) if fetch_variations else []
+					)
+					if variations is not None:
+						records = products + variations
+						return [frappe.get_doc(record) for record in records] if as_doc else records
 			except Exception as e:
 				frappe.log_error("WooCommerce Cache Error", f"WooCommerce cache fetch error: {e!s}")
 
+		# Initialise the API clients once, so that products and variations are fetched with the same ones
+		try:
+			wc_api_list = WooCommerceProduct._init_api()
+		except SyncDisabledError:
+			frappe.msgprint(
+				_("WooCommerce synchronization is disabled. Please enable at least one WooCommerce server.")
+			)
+			return []
+
 		# If cache miss or error, fetch from API
 		try:
-			# Fetch products with normal implementation
-			products = WooCommerceProduct.get_list_of_records(args)
+			# Records are cached as dicts, and only converted to documents when returned
+			products = WooCommerceProduct.get_list_of_records(
+				{**args, "wc_api_list": wc_api_list, "as_doc": False}
+			)
 
 			if not products:
 				return []
 
-			# If variations not needed, cache and return early
-			if not fetch_variations:
-				# Cache the results before returning (if caching is enabled)
-				if not skip_cache:
-					try:
-						frappe.cache().set_value(
-							cache_key,
-							products,
-							expires_in_sec=cache_timeout,
-						)
-					except Exception as e:
-						frappe.log_error(
-							f"WooCommerce Cache ErrorWooCommerce cache set error: {e!s}",
-						)
-				return products
-
-			# Filter for variable products that need variations fetched
-			variable_products = [
-				{
-					"id": product.get("id"),
-					"woocommerce_name": product.get("woocommerce_name"),
-				}
-				for product in products
-				if product.get("type") == "variable"
-			]
-
 			all_variations = []
-
-			# Fetch variations in parallel for each variable product (if supported)
-			for product in variable_products:
-				product_id = product["id"]
-				wc_name = product["woocommerce_name"]
-
-				variation_args = args.copy()
-				variation_args["endpoint"] = f"products/{product_id}/variations"
-				variation_args["metadata"] = {"parent_woocommerce_name": wc_name}
-				variation_args["skip_cache"] = True  # Don't cache intermediate results
-
-				# Use more efficient pagination with a single request if possible
-				variation_args["page_length"] = min(variation_batch_size, max_variations)
-				variation_args["max_results"] = max_variations
-				variation_args["start"] = 0
-
-				try:
-					variations = WooCommerceProduct.get_list_of_records(variation_args)
-					if variations:
-						all_variations.extend(variations)
-				except Exception as e:
-					frappe.log_error(
-						"WooCommerce Variation Error"
-						f"Error fetching variations for product {product_id}: {e!s}",
-					)
-
-			# Add all variations to the products list
-			products.extend(all_variations)
+			if fetch_variations:
+				# Filter for variable products that need variations fetched
+				variable_products = [
+					{
+						"id": product.get("id"),
+						"name": product.get("name"),
+						"woocommerce_name": product.get("woocommerce_name"),
+						"woocommerce_server": product.get("woocommerce_server"),
+						"woocommerce_date_modified": product.get("woocommerce_date_modified"),
+					}
+					for product in products
+					if product.get("type") == "variable"
+				]
+
+				all_variations = WooCommerceProduct.get_variations_of_products(
+					variable_products,
+					wc_api_list,
+					settings,
+					only_changed=args.get("only_changed_variations"),
+				)
 
 			# Cache the results before returning (if caching is enabled)
 			if not skip_cache:
 				try:
-					frappe.cache().set_value(cache_key, json.dumps(products), expires_in_sec=cache_timeout)
+					cache.set_page(query, start, page_length, products)
+					if fetch_variations:
+						set_cached_variations(cache, variable_products, all_variations, max_variations)
 				except Exception as e:
-					frappe.log_error(
-						f"WooCommerce Cache ErrorWooCommerce cache set error: {e!s}",
-					)
+					frappe.log_error("WooCommerce Cache Error", f"WooCommerce cache set error: {e!s}")
 
-			return products
+			# Add all variations to the products list
+			records = products + all_variations
+			return [frappe.get_doc(record) for record in records] if as_doc else records
 
 		except Exception as e:
 			frappe.log_error(
@@ -259,6 +266,120 @@ class WooCommerceProduct(WooCommerceDocument):
 			)
 			return []
 
+	@classmethod
+	def get_variations_of_products(
+		cls,
+		variable_products: list[dict],
+		wc_api_list: list[WooCommerceAPI],
+		settings,
+		only_changed: bool = False,
+	) -> list[dict]:
+		"""
+		Fetch the variations of variable products, several products at a time.
+
+		Only the HTTP requests run in worker threads; the responses are turned into records in the
+		calling thread, as that needs the database. The WooCommerce API clients are shared between
+		the workers.
+
+		If only_changed is set, the variation manifest is used to skip products that have not been modified
+		since their variations were last fetched, and to only return variations that were added or modified.
+
+		Args:
+			variable_products: Dicts with the id, woocommerce_name, woocommerce_server and
+				woocommerce_date_modified of each product
+			wc_api_list: Initialised WooCommerce API clients
+			settings: WooCommerce Settings
+			only_changed: Only return variations that changed since they were last fetched
+
+		Returns:
+			List: Variations, processed for Frappe
+		"""
+		variation_batch_size = getattr(settings, "variation_batch_size", None) or 20
+		max_variations = getattr(settings, "max_variations", None) or 100
+		workers = min(max(cint(getattr(settings, "variation_fetch_workers", None)) or 1, 1), 16)
+
+		params = {"_fields": VARIATION_LIST_FIELDS, "per_page": min(variation_batch_size, 100)}
+		apis_by_domain = {urlparse(api.woocommerce_server_url).netloc: api for api in wc_api_list}
+
+		manifests = (
+			{domain: get_variation_manifest(domain) for domain in apis_by_domain} if only_changed else {}
+		)
+
+		# Group the products by the server they were fetched from
+		products_by_api: dict[WooCommerceAPI, list[dict]] = {}
+		for product in variable_products:
+			if not (wc_api := apis_by_domain.get(product["woocommerce_server"])):
+				continue
+
+			# A product's modification date changes when any of its variations changes
+			manifest_entry = manifests.get(product["woocommerce_server"], {}).get(str(product["id"]))
+			if manifest_entry and manifest_entry["date_modified"] == str(
+				product["woocommerce_date_modified"]
+			):
+				continue
+
+			products_by_api.setdefault(wc_api, []).append(product)
+
+		raw_variations: list[tuple[WooCommerceAPI, dict]] = []
+		failed_products: set[tuple[str, int]] = set()
+
+		# Fetch the variations concurrently, one product per request. The products endpoint can't list
+		# variations, as its type filter doesn't accept "variation"
+		with ThreadPoolExecutor(max_workers=workers) as executor:
+			futures = {
+				executor.submit(
+					copy_context().run,
+					get_all_pages,
+					wc_api,
+					f"products/{product['id']}/variations",
+					params,
+					max_variations,
+				): (wc_api, product)
+				for wc_api, products in products_by_api.items()
+				for product in products
+			}
+			for future in as_completed(futures):
+				wc_api, product = futures[future]
+				try:
+					raw_variations.extend((wc_api, variation) for variation in future.result())
+				except Exception as e:
+					failed_products.add((product["woocommerce_server"], cint(product["id"])))
+					frappe.log_error(
+						"WooCommerce Variation Error",
+						f"Error fetching variations for product {product['id']}: {e!s}",
+					)
+
+		if only_changed:
+			raw_variations = update_variation_manifests(
+				manifests, products_by_api, raw_variations, failed_products
+			)
+
+		parent_names = {
+			(product["woocommerce_server"], cint(product["id"])): product["woocommerce_name"]
+			for product in variable_products
+		}
+		all_variations = []
+		for wc_api, variation in raw_variations:
+			try:
+				variation = cls.pre_init_document(
+					variation, woocommerce_server_url=wc_api.woocommerce_server_url
+				)
+				parent_name = parent_names.get(
+					(variation["woocommerce_server"], cint(variation["parent_id"]))
+				)
+				variation = cls.during_get_list_of_records(
+					variation, {"metadata": {"parent_woocommerce_name": parent_name}}
+				)
+				all_variations.append(variation)
+			except Exception as e:
+				frappe.log_error(
+					"WooCommerce Record Error",
+					f"Error processing variation {variation.get('id', 'unknown')}: {e!s}",
+				)
+
+		cls.after_records_fetched(all_variations)
+		return all_variations
+
 	@classmethod
 	def during_get_list_of_records(cls, product: dict, args):
 		# In the case of variations
@@ -287,9 +408,156 @@ class WooCommerceProduct(WooCommerceDocument):
 		return None
 
 	@staticmethod
-	def get_count(*args) -> int:
+	def get_count(args) -> int:
 		return WooCommerceProduct.get_count_of_records(args)
 
 	@staticmethod
-	def get_stats(*args):
-		pass
+	def get_stats(args):
+		return WooCommerceProduct.get_stats_of_records(args)
+
+
+def get_all_pages(wc_api: WooCommerceAPI, endpoint: str, params: dict, max_results: int) -> list[dict]:
+	"""
+	Get the raw records of all pages of a WooCommerce listing, up to max_results
+	"""
+	records = []
+	page = 1
+	while len(records) < max_results:
+		response = wc_api.get(endpoint, params={**params, "page": page})
+		if response.status_code != 200:
+			raise ValueError(f"API returned {response.status_code} for {endpoint}: {response.text}")
+
+		results = response.json()
+		records.extend(results)
+		if len(results) < params["per_page"]:
+			break
+		page += 1
+
+	return records[:max_results]
+
+
+def get_variation_manifest(woocommerce_server: str) -> dict[str, dict]:
+	"""
+	Get the variation manifest entries of all products on a WooCommerce server (domain)
+	"""
+	return {
+		frappe.safe_decode(product_id): json.loads(entry)
+		for product_id, entry in frappe.cache()
+		.hgetall(f"{VARIATION_MANIFEST_CACHE_KEY}::{woocommerce_server}")
+		.items()
+	}
+
+
+def update_variation_manifests(
+	manifests: dict[str, dict[str, dict]],
+	products_by_api: dict[WooCommerceAPI, list[dict]],
+	raw_variations: list[tuple[WooCommerceAPI, dict]],
+	failed_products: set[tuple[str, int]],
+) -> list[tuple[WooCommerceAPI, dict]]:
+	"""
+	Record the fetched variations of each product in the variation manifest, and return only the
+	variations that are new or have a different modification date than when they were last fetched.
+
+	The manifest entries of products whose variations failed to fetch are left untouched, so that they
+	are fetched again next time.
+	"""
+	variations_by_product: dict[tuple[str, int], list[tuple[WooCommerceAPI, dict]]] = {}
+	for wc_api, variation in raw_variations:
+		domain = urlparse(wc_api.woocommerce_server_url).netloc
+		variations_by_product.setdefault((domain, cint(variation.get("parent_id"))), []).append(
+			(wc_api, variation)
+		)
+
+	changed_variations = []
+	for products in products_by_api.values():
+		for product in products:
+			domain, product_id = product["woocommerce_server"], cint(product["id"])
+			if (domain, product_id) in failed_products:
+				continue
+
+			previous = manifests[domain].get(str(product_id), {}).get("variations", {})
+			variations = variations_by_product.get((domain, product_id), [])
+			changed_variations.extend(
+				(wc_api, variation)
+				for wc_api, variation in variations
+				if previous.get(str(variation["id"])) != variation.get("date_modified")
+			)
+
+			frappe.cache().hset(
+				f"{VARIATION_MANIFEST_CACHE_KEY}::{domain}",
+				str(product_id),
+				json.dumps(
+					{
+						"date_modified": str(product["woocommerce_date_modified"]),
+						"variations": {
+							str(variation["id"]): variation.get("date_modified")
+							for _, variation in variations
+						},
+					}
+				),
+			)
+
+	return changed_variations
+
+
+def get_cache_query(args: dict) -> dict:
+	"""
+	Get the arguments of a get_list call that determine which records it returns
+	"""
+	query = {
+		k: v
+		for k, v in args.items()
+		if k
+		not in ("metadata", "as_doc", "skip_cache", "skip_mirror", "wc_api_list", "only_changed_variations")
+	}
+	query["doctype"] = "WooCommerce Product"
+	if args.get("servers"):
+		query["servers"] = sorted(args["servers"])
+	return query
+
+
+def get_variations_cache_query(product: dict) -> dict:
+	"""
+	Get the page index query of a product's variations, which is only valid for the product's date_modified
+	"""
+	return {"variations_of": product["name"], "date_modified": product["woocommerce_date_modified"]}
+
+
+def get_cached_variations(
+	cache: WooCommerceRecordCache, products: list[dict], max_variations: int
+) -> list[dict] | None:
+	"""
+	Get the cached variations of the variable products among products, or None if any are not cached
+	"""
+	variations = []
+	for product in products:
+		if product.get("type") != "variable":
+			continue
+		product_variations = cache.get_page(get_variations_cache_query(product), 0, max_variations)
+		if product_variations is None:
+			return None
+		variations.extend(product_variations)
+	return variations
+
+
+def set_cached_variations(
+	cache: WooCommerceRecordCache,
+	variable_products: list[dict],
+	variations: list[dict],
+	max_variations: int,
+):
+	"""
+	Cache the variations of variable products, with a page index per product
+	"""
+	variations_by_product: dict[tuple[str, int], list[dict]] = {}
+	for variation in variations:
+		variations_by_product.setdefault(
+			(variation["woocommerce_server"], cint(variation["parent_id"])), []
+		).append(variation)
+
+	for product in variable_products:
+		# Products without variations may have failed to fetch, so they are left uncached
+		if product_variations := variations_by_product.get(
+			(product["woocommerce_server"], cint(product["id"]))
+		):
+			cache.set_page(get_variations_cache_query(product), 0, max_variations, product_variations)
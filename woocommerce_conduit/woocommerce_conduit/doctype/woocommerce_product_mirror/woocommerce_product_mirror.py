@@ -0,0 +1,31 @@
+# Copyright (c) 2025, Karol Parzonka and contributors
+# For license information, please see license.txt
+
+# import frappe
+from frappe.model.document import Document
+
+
+class WooCommerceProductMirror(Document):
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		complete: DF.Check
+		data: DF.JSON | None
+		parent_id: DF.Int
+		price: DF.Currency
+		sku: DF.Data | None
+		status: DF.Data | None
+		stock_status: DF.Data | None
+		type: DF.Data | None
+		woocommerce_date_created: DF.Datetime | None
+		woocommerce_date_modified: DF.Datetime | None
+		woocommerce_id: DF.Int
+		woocommerce_name: DF.Data | None
+		woocommerce_server: DF.Data | None
+	# end: auto-generated types
+	pass
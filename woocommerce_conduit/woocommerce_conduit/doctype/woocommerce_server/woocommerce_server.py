@@ -40,6 +40,7 @@ class WooCommerceServer(Document):
 		creation_user: DF.Link
 		delivery_after_days: DF.Int
 		enable_image_sync: DF.Check
+		enable_webhooks: DF.Check
 		enabled: DF.Check
 		enabled_order_status: DF.Check
 		enabled_payments_sync: DF.Check
@@ -49,10 +50,14 @@ class WooCommerceServer(Document):
 		freight_and_forwarding_account: DF.Link
 		item_field_map: DF.Table[WooCommerceServerItemField]
 		item_group: DF.Link
+		last_items_sync_date: DF.Datetime | None
+		last_orders_sync_date: DF.Datetime | None
 		last_sync_time: DF.Datetime | None
+		mirror_ready: DF.Check
 		name_by: DF.Literal["WooCommerce ID", "Product SKU"]
 		payment_method_bank_account_mapping: DF.JSON
 		payment_method_gl_account_mapping: DF.JSON
+		payments_sync_start_date: DF.Date | None
 		price_list: DF.Link
 		sales_order_status_map: DF.Table[WooCommerceServerOrderStatus]
 		sales_taxes_and_charges_template: DF.Link | None
@@ -63,6 +68,7 @@ class WooCommerceServer(Document):
 		uom: DF.Link
 		use_actual_tax_type: DF.Check
 		warehouse: DF.Link
+		webhook_secret: DF.Password | None
 		woocommerce_server_url: DF.Data
 
 	# end: auto-generated types
@@ -83,6 +89,7 @@ class WooCommerceServer(Document):
 		self.test_api_credentials()
 		self.validate_so_status_map()
 		self.validate_item_map()
+		self.set_payments_sync_start_date()
 
 	def test_api_credentials(self):
 		wcapi = WooCommerceAPI(
@@ -121,6 +128,14 @@ class WooCommerceServer(Document):
 		if len(wc_so_statuses) != len(set(wc_so_statuses)):
 			frappe.throw(_("Duplicate WooCommerce Sales Order Statuses found in Sales Order Status Map"))
 
+	def set_payments_sync_start_date(self):
+		"""
+		Default the Payments Sync Start Date to today, so that enabling Payments Sync doesn't create
+		Payment Entries for historical Sales Orders that were settled by other means
+		"""
+		if self.enabled_payments_sync and not self.payments_sync_start_date:
+			self.payments_sync_start_date = frappe.utils.today()
+
 	def validate_item_map(self):
 		"""
 		Validate Item Map to have valid JSONPath expressions
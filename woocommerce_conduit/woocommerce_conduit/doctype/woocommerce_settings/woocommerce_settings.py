@@ -1,9 +1,11 @@
 # Copyright (c) 2025, Karol Parzonka and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
+from woocommerce_conduit.woocommerce_conduit.mirror import enqueue_rebuild_mirrors
+
 
 class WooCommerceSettings(Document):
 	# begin: auto-generated types
@@ -14,11 +16,23 @@ class WooCommerceSettings(Document):
 	if TYPE_CHECKING:
 		from frappe.types import DF
 
+		enable_mirror: DF.Check
+		enable_sync_profiling: DF.Check
 		fetch_variations: DF.Check
 		max_variations: DF.Int
 		minimum_creation_date: DF.Datetime
+		order_list_cache_ttl: DF.Int
+		polling_interval: DF.Int
+		sync_trigger_debounce: DF.Int
 		variation_batch_size: DF.Int
+		variation_fetch_workers: DF.Int
 		wc_last_sync_date_items: DF.Datetime | None
 		wc_last_sync_date_orders: DF.Datetime | None
 	# end: auto-generated types
-	pass
+
+	def on_update(self):
+		# Fill the mirrors in the background when mirror mode is turned on. Until a server's records have
+		# been mirrored, its lists and counts are fetched from WooCommerce
+		if self.enable_mirror and self.has_value_changed("enable_mirror"):
+			frappe.db.set_value("WooCommerce Server", {"mirror_ready": 1}, "mirror_ready", 0)
+			enqueue_rebuild_mirrors(enqueue_after_commit=True)
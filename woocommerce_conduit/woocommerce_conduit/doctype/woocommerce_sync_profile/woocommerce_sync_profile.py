@@ -0,0 +1,33 @@
+# Copyright (c) 2025, Karol Parzonka and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.query_builder import Interval
+from frappe.query_builder.functions import Now
+
+
+class WooCommerceSyncProfile(Document):
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		cpu_time: DF.Float
+		phases: DF.JSON | None
+		query_count: DF.Int
+		query_time: DF.Float
+		reference: DF.Data | None
+		request_count: DF.Int
+		request_time: DF.Float
+		sync_type: DF.Literal["Sales Order", "Item", "Item Price"]
+		wall_time: DF.Float
+	# end: auto-generated types
+
+	@staticmethod
+	def clear_old_logs(days=30):
+		table = frappe.qb.DocType("WooCommerce Sync Profile")
+		frappe.db.delete(table, filters=(table.creation < (Now() - Interval(days=days))))
@@ -0,0 +1,44 @@
+# Copyright (c) 2025, Karol Parzonka and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.query_builder import Interval
+from frappe.query_builder.functions import Now
+
+
+class WooCommerceSyncRun(Document):
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		date_time_from: DF.Datetime | None
+		duration: DF.Float
+		error: DF.Code | None
+		finished_at: DF.Datetime | None
+		outcomes: DF.JSON | None
+		query_count: DF.Int
+		query_time: DF.Float
+		records_created: DF.Int
+		records_failed: DF.Int
+		records_retried: DF.Int
+		records_seen: DF.Int
+		records_skipped: DF.Int
+		records_updated: DF.Int
+		request_count: DF.Int
+		request_time: DF.Float
+		started_at: DF.Datetime | None
+		status: DF.Literal["Running", "Completed", "Failed"]
+		sync_type: DF.Literal["Items", "Orders"]
+		trigger: DF.Literal["Scheduled", "Manual"]
+		woocommerce_server: DF.Link | None
+	# end: auto-generated types
+
+	@staticmethod
+	def clear_old_logs(days=90):
+		table = frappe.qb.DocType("WooCommerce Sync Run")
+		frappe.db.delete(table, filters=(table.creation < (Now() - Interval(days=days))))
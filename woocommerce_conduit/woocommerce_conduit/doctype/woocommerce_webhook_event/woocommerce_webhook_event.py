@@ -0,0 +1,26 @@
+# Copyright (c) 2025, Karol Parzonka and contributors
+# For license information, please see license.txt
+
+# import frappe
+from frappe.model.document import Document
+
+
+class WooCommerceWebhookEvent(Document):
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		delivery_id: DF.Data | None
+		error: DF.Code | None
+		payload: DF.JSON | None
+		resource: DF.Data | None
+		status: DF.Literal["Queued", "Processed", "Superseded", "Failed"]
+		topic: DF.Data | None
+		woocommerce_id: DF.Data | None
+		woocommerce_server: DF.Link | None
+	# end: auto-generated types
+	pass
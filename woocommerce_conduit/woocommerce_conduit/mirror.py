@@ -0,0 +1,364 @@
+import json
+import re
+
+import frappe
+from frappe.utils import cint, flt, get_datetime, now
+
+from woocommerce_conduit.woocommerce_conduit.record_stats import remove_record_stats, update_record_stats
+
+# Local tables that WooCommerce records are mirrored into, when mirror mode is enabled
+MIRROR_DOCTYPES = {
+	"WooCommerce Product": "WooCommerce Product Mirror",
+	"WooCommerce Order": "WooCommerce Order Mirror",
+}
+
+# Indexed columns of each mirror, besides name, creation (date created) and modified (date modified)
+MIRROR_COLUMNS = {
+	"WooCommerce Product": {
+		"woocommerce_server": "Data",
+		"woocommerce_id": "Int",
+		"woocommerce_name": "Data",
+		"sku": "Data",
+		"parent_id": "Int",
+		"type": "Data",
+		"status": "Data",
+		"stock_status": "Data",
+		"price": "Currency",
+		"woocommerce_date_created": "Datetime",
+		"woocommerce_date_modified": "Datetime",
+	},
+	"WooCommerce Order": {
+		"woocommerce_server": "Data",
+		"woocommerce_id": "Int",
+		"status": "Data",
+		"customer_id": "Int",
+		"payment_method": "Data",
+		"currency": "Data",
+		"total": "Currency",
+		"woocommerce_date_created": "Datetime",
+		"woocommerce_date_modified": "Datetime",
+	},
+}
+
+# Fields as they are named in WooCommerce API filters, mapped to mirror columns
+FIELD_ALIASES = {
+	"id": "woocommerce_id",
+	"date_created": "woocommerce_date_created",
+	"date_modified": "woocommerce_date_modified",
+}
+
+# Fields requested when filling the mirrors, so that all indexed columns are populated
+MIRROR_LIST_FIELDS = {
+	"WooCommerce Product": "name,id,parent_id,date_created,date_modified,type,sku,status,stock_status,price",
+	"WooCommerce Order": "id,number,status,customer_id,payment_method,currency,total,date_created,date_modified",
+}
+
+MIRROR_PAGE_LENGTH = 100
+
+
+def is_mirror_enabled() -> bool:
+	"""
+	Whether WooCommerce Products and Orders are read from their local mirrors
+	"""
+	return bool(getattr(frappe.get_cached_doc("WooCommerce Settings"), "enable_mirror", False))
+
+
+def is_mirror_ready(servers: list[str] | None = None) -> bool:
+	"""
+	Whether the mirrors have been filled for the given WooCommerce Servers, or all enabled ones, so that
+	lists and counts of them can be served from the mirrors
+	"""
+	filters = {"enabled": 1}
+	if servers:
+		filters["name"] = ("in", servers)
+	return not frappe.get_all("WooCommerce Server", filters={**filters, "mirror_ready": 0}, limit=1)
+
+
+def upsert_mirror_records(doctype: str, records: list[dict], complete: bool = False):
+	"""
+	Insert or update the mirrored copies of WooCommerce records.
+
+	Records are merged into their mirrored copy, as records fetched for lists only contain some fields.
+	A copy is complete if it was last written from a complete record (e.g. a webhook payload or a form
+	load) and has not been modified since. Records older than their mirrored copy are ignored.
+
+	Args:
+		doctype: The virtual DocType of the records
+		records: Records as processed by WooCommerceDocument.pre_init_document
+		complete: Whether the records are complete, rather than fetched for a list
+	"""
+	if not (mirror := MIRROR_DOCTYPES.get(doctype)) or not records:
+		return
+
+	existing = {
+		row.name: row
+		for row in frappe.get_all(
+			mirror,
+			filters={"name": ("in", [record["name"] for record in records])},
+			fields=["name", "complete", "data"],
+		)
+	}
+
+	columns = MIRROR_COLUMNS[doctype]
+	rows = {}
+	for record in records:
+		data, is_complete = record, complete
+		if previous := existing.get(record["name"]):
+			previous_data = json.loads(previous.data or "{}")
+			previous_modified = str(previous_data.get("woocommerce_date_modified") or "")
+			record_modified = str(record.get("woocommerce_date_modified") or "")
+			if previous_modified > record_modified:
+				continue
+			data = {**previous_data, **record}
+			is_complete = complete or (previous.complete and previous_modified == record_modified)
+
+		date_created = get_datetime(data.get("woocommerce_date_created") or now())
+		date_modified = get_datetime(data.get("woocommerce_date_modified") or now())
+		rows[record["name"]] = [
+			record["name"],
+			date_created,
+			date_modified,
+			"Administrator",
+			"Administrator",
+			cint(is_complete),
+			frappe.as_json(data, indent=None),
+			*(get_column_value(data.get(column), fieldtype) for column, fieldtype in columns.items()),
+		]
+
+	if not rows:
+		return
+
+	frappe.db.delete(mirror, {"name": ("in", list(rows))})
+	frappe.db.bulk_insert(
+		mirror,
+		fields=["name", "creation", "modified", "owner", "modified_by", "complete", "data", *columns],
+		values=list(rows.values()),
+		ignore_duplicates=True,
+	)
+
+
+def enqueue_mirror_records(doctype: str, records: list[dict], complete: bool = False):
+	"""
+	Queue fetched records to be written to the mirror in the background, as they are mostly fetched by
+	read-only list, count and form endpoints, which must not write to the database
+	"""
+	if doctype not in MIRROR_DOCTYPES or not records:
+		return
+	frappe.enqueue(
+		upsert_mirror_records,
+		queue="short",
+		doctype=doctype,
+		records=records,
+		complete=complete,
+	)
+
+
+def get_column_value(value, fieldtype: str):
+	if fieldtype == "Int":
+		return cint(value)
+	if fieldtype == "Currency":
+		return flt(value)
+	if fieldtype == "Datetime":
+		return get_datetime(value) if value else None
+	return value
+
+
+def get_mirror_list(doctype: str, args: dict) -> list[dict] | None:
+	"""
+	Get records from the mirror, with Frappe's get_list arguments.
+
+	Returns None if the filters use fields that the mirror does not index, so that the records are
+	fetched from WooCommerce instead, and while the mirror is being filled.
+	"""
+	if not is_mirror_ready(args.get("servers")):
+		return None
+	if (filters := get_mirror_filters(doctype, args.get("filters"))) is None:
+		return None
+
+	rows = frappe.get_all(
+		MIRROR_DOCTYPES[doctype],
+		filters=filters,
+		fields=["data"],
+		order_by=get_mirror_order_by(doctype, args.get("order_by")),
+		start=cint(args.get("start")),
+		page_length=cint(args.get("page_length")) or 20,
+	)
+	return [json.loads(row.data) for row in rows]
+
+
+def get_mirror_count(doctype: str, args: dict) -> int | None:
+	"""
+	Count records in the mirror, or return None if the filters cannot be applied to it or the mirror is
+	being filled
+	"""
+	if not is_mirror_ready(args.get("servers")):
+		return None
+	if (filters := get_mirror_filters(doctype, args.get("filters"))) is None:
+		return None
+	return frappe.db.count(MIRROR_DOCTYPES[doctype], filters=filters)
+
+
+def get_mirror_record(doctype: str, name: str) -> dict | None:
+	"""
+	Get a complete mirrored record, or None if it is not mirrored completely
+	"""
+	row = frappe.db.get_value(MIRROR_DOCTYPES[doctype], name, ["complete", "data"], as_dict=True)
+	if row and row.complete:
+		return json.loads(row.data)
+	return None
+
+
+def get_mirror_column(doctype: str, field: str) -> str | None:
+	field = FIELD_ALIASES.get(field, field)
+	if field in ("name", "creation", "modified") or field in MIRROR_COLUMNS[doctype]:
+		return field
+	return None
+
+
+def get_mirror_filters(doctype: str, filters) -> list | None:
+	"""
+	Translate get_list filters of a virtual DocType to filters of its mirror
+	"""
+	from woocommerce_conduit.woocommerce_conduit.woocommerce_api import normalise_frappe_filters
+
+	mirror_filters = []
+	for field, operator, value in normalise_frappe_filters(filters):
+		if not (column := get_mirror_column(doctype, field)):
+			return None
+		mirror_filters.append([MIRROR_DOCTYPES[doctype], column, operator, value])
+	return mirror_filters
+
+
+def get_mirror_order_by(doctype: str, order_by: str | None) -> str:
+	"""
+	Translate a get_list order_by of a virtual DocType to one of its mirror, ignoring unindexed fields
+	"""
+	parts = []
+	for part in (order_by or "").split(","):
+		match = re.match(r"^\s*(?:`tab[^`]+`\.)?`?(\w+)`?\s*(asc|desc)?\s*$", part, re.IGNORECASE)
+		if match and (column := get_mirror_column(doctype, match.group(1))):
+			parts.append(f"`{column}` {(match.group(2) or 'desc').lower()}")
+	return ", ".join(parts) or "`modified` desc"
+
+
+def rebuild_mirrors():
+	"""
+	Fill the mirrors with all WooCommerce Products (including variations) and Orders of all enabled servers,
+	and remove the mirrored records that no longer exist in WooCommerce.
+
+	Lists and counts are served from the mirror once every server they cover has been mirrored completely,
+	which is marked by Mirror Ready on the WooCommerce Server
+	"""
+	from woocommerce_conduit.woocommerce_conduit.doctype.woocommerce_order.woocommerce_order import (
+		WooCommerceOrder,
+	)
+	from woocommerce_conduit.woocommerce_conduit.doctype.woocommerce_product.woocommerce_product import (
+		WooCommerceProduct,
+	)
+
+	settings = frappe.get_cached_doc("WooCommerce Settings")
+	wc_api_list = WooCommerceProduct._init_api()
+
+	for wc_api in wc_api_list:
+		for controller in (WooCommerceProduct, WooCommerceOrder):
+			doctype = controller.doctype
+			rebuild_started = now()
+			expected = controller.get_count_of_records(
+				{"servers": [wc_api.woocommerce_server], "skip_mirror": True, "skip_cache": True}
+			)
+			names = set()
+			listed = 0
+			start = 0
+			while True:
+				records = controller.get_list_of_records(
+					{
+						"doctype": doctype,
+						"servers": [wc_api.woocommerce_server],
+						"wc_api_list": wc_api_list,
+						"_fields": MIRROR_LIST_FIELDS[doctype],
+						"start": start,
+						"page_length": MIRROR_PAGE_LENGTH,
+						"max_results": MIRROR_PAGE_LENGTH,
+						"skip_record_updates": True,
+					}
+				)
+				listed += len(records)
+				variations = (
+					controller.get_variations_of_products(
+						[record for record in records if record.get("type") == "variable"],
+						wc_api_list,
+						settings,
+					)
+					if doctype == "WooCommerce Product"
+					else []
+				)
+
+				# This job writes the mirror itself, rather than queueing the writes like list views do
+				update_record_stats(doctype, records)
+				upsert_mirror_records(doctype, records + variations)
+				names.update(record["name"] for record in records + variations)
+				frappe.db.commit()  # nosemgrep
+
+				if len(records) < MIRROR_PAGE_LENGTH:
+					break
+				start += MIRROR_PAGE_LENGTH
+
+			# Listing errors are logged rather than raised, so only records of a complete listing are
+			# compared, to not remove records that were merely not listed
+			if expected and listed >= expected:
+				delete_missing_mirror_records(doctype, wc_api.woocommerce_server, names, rebuild_started)
+				frappe.db.commit()  # nosemgrep
+
+		frappe.db.set_value("WooCommerce Server", wc_api.woocommerce_server, "mirror_ready", 1)
+		frappe.db.commit()  # nosemgrep
+
+
+def reconcile_mirrors():
+	"""
+	Rebuild the mirrors, if mirror mode is enabled, so that records deleted in WooCommerce without a webhook
+	are removed from them. Runs from the scheduler, and queues the rebuild as it can take hours
+	"""
+	if is_mirror_enabled():
+		enqueue_rebuild_mirrors()
+
+
+def enqueue_rebuild_mirrors(enqueue_after_commit: bool = False):
+	"""
+	Queue rebuild_mirrors, unless it is queued or running already
+	"""
+	frappe.enqueue(
+		rebuild_mirrors,
+		queue="long",
+		timeout=6 * 60 * 60,
+		job_id="woocommerce_rebuild_mirrors",
+		deduplicate=True,
+		enqueue_after_commit=enqueue_after_commit,
+	)
+
+
+def delete_missing_mirror_records(doctype: str, woocommerce_server: str, names: set[str], before):
+	"""
+	Delete the mirrored records of a server that were not listed by a rebuild that started at before, and
+	remove them from the list stats. Records modified since then are kept, as the rebuild may have listed
+	them before they existed
+	"""
+	mirror = MIRROR_DOCTYPES[doctype]
+	missing = [
+		name
+		for name in frappe.get_all(
+			mirror,
+			filters={"woocommerce_server": woocommerce_server, "modified": ("<", before)},
+			pluck="name",
+		)
+		if name not in names
+	]
+	remove_record_stats(doctype, missing)
+	delete_mirror_records(doctype, missing)
+
+
+def delete_mirror_records(doctype: str, names: list[str]):
+	"""
+	Delete the mirrored copies of records that were deleted in WooCommerce
+	"""
+	if (mirror := MIRROR_DOCTYPES.get(doctype)) and names:
+		frappe.db.delete(mirror, {"name": ("in", names)})
@@ -0,0 +1,240 @@
+import functools
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import frappe
+
+PROFILE_DOCTYPE = "WooCommerce Sync Profile"
+# Phase that everything outside of a named phase is attributed to
+ROOT_PHASE = "other"
+PHASE_METRICS = ("query_count", "query_time", "request_count", "request_time", "cpu_time", "wall_time")
+
+
+class SyncProfiler:
+	"""
+	Profile of one synchronisation, e.g. of a single Sales Order.
+
+	Database queries, WooCommerce requests, CPU time of the synchronising thread and wall time are
+	attributed to the innermost phase that is active when they happen, so the phases of a profile add up
+	to its total. Requests made from worker threads count towards the phase that started them.
+	"""
+
+	def __init__(self, sync_type: str):
+		self.sync_type = sync_type
+		self.reference = None
+		self.phases: dict[str, dict[str, float]] = defaultdict(lambda: dict.fromkeys(PHASE_METRICS, 0))
+		self.stack = [ROOT_PHASE]
+		self.lock = threading.Lock()
+		self.last_cpu_time = time.thread_time()
+		self.last_wall_time = time.perf_counter()
+
+	def switch(self):
+		"""
+		Attribute the time since the last switch to the current phase
+		"""
+		cpu_time, wall_time = time.thread_time(), time.perf_counter()
+		with self.lock:
+			phase = self.phases[self.stack[-1]]
+			phase["cpu_time"] += cpu_time - self.last_cpu_time
+			phase["wall_time"] += wall_time - self.last_wall_time
+		self.last_cpu_time, self.last_wall_time = cpu_time, wall_time
+
+	@contextmanager
+	def phase(self, name: str):
+		self.switch()
+		self.stack.append(name)
+		try:
+			yield
+		finally:
+			self.switch()
+			self.stack.pop()
+
+	def record_query(self, duration: float):
+		with self.lock:
+			phase = self.phases[self.stack[-1]]
+			phase["query_count"] += 1
+			phase["query_time"] += duration
+
+	def record_request(self, duration: float):
+		with self.lock:
+			phase = self.phases[self.stack[-1]]
+			phase["request_count"] += 1
+			phase["request_time"] += duration
+
+	def totals(self) -> dict[str, float]:
+		return {metric: sum(phase[metric] for phase in self.phases.values()) for metric in PHASE_METRICS}
+
+	def save(self):
+		"""
+		Store the profile in a WooCommerce Sync Profile.
+
+		The insert is deferred, so that the profile is kept when the synchronisation fails and its
+		transaction is rolled back
+		"""
+		frappe.get_doc(
+			{
+				"doctype": PROFILE_DOCTYPE,
+				"sync_type": self.sync_type,
+				"reference": self.reference,
+				**self.totals(),
+				"phases": frappe.as_json(
+					{name: {**phase} for name, phase in self.phases.items()}, indent=None
+				),
+			}
+		).deferred_insert()
+
+
+def get_active_profiler() -> SyncProfiler | None:
+	return getattr(frappe.local, "woocommerce_sync_profiler", None)
+
+
+def is_profiling_enabled() -> bool:
+	return bool(getattr(frappe.get_cached_doc("WooCommerce Settings"), "enable_sync_profiling", False))
+
+
+@contextmanager
+def profile_sync(sync_type: str, get_reference=None):
+	"""
+	Profile a synchronisation if sync profiling is enabled in WooCommerce Settings, and store its profile
+	afterwards, also when it fails.
+
+	A synchronisation that runs inside another one, e.g. of an Item while synchronising a Sales Order,
+	is profiled as a phase of the outer one.
+
+	Args:
+		sync_type: The Sync Type of the profile, e.g. "Sales Order"
+		get_reference: Function that returns the name of the synchronised record, once it is known
+	"""
+	if profiler := get_active_profiler():
+		with profiler.phase(f"{sync_type.lower().replace(' ', '_')}_sync"):
+			yield
+		return
+
+	if not is_profiling_enabled():
+		yield
+		return
+
+	profiler = SyncProfiler(sync_type)
+	sql = frappe.db.sql
+
+	def profiled_sql(*args, **kwargs):
+		start = time.perf_counter()
+		try:
+			return sql(*args, **kwargs)
+		finally:
+			profiler.record_query(time.perf_counter() - start)
+
+	frappe.local.woocommerce_sync_profiler = profiler
+	frappe.db.sql = profiled_sql
+	try:
+		yield
+	finally:
+		profiler.switch()
+		frappe.db.sql = sql
+		frappe.local.woocommerce_sync_profiler = None
+		try:
+			profiler.reference = get_reference() if get_reference else None
+			profiler.save()
+		except Exception:
+			frappe.log_error("WooCommerce Sync Profile Error", frappe.get_traceback())
+
+
+def profile_phase(name: str):
+	"""
+	Decorator that attributes everything a method does to a phase of the active sync profile, if any
+	"""
+
+	def decorator(fn):
+		@functools.wraps(fn)
+		def wrapper(*args, **kwargs):
+			if not (profiler := get_active_profiler()):
+				return fn(*args, **kwargs)
+			with profiler.phase(name):
+				return fn(*args, **kwargs)
+
+		return wrapper
+
+	return decorator
+
+
+@contextmanager
+def profile_request():
+	"""
+	Record the duration of the enclosed WooCommerce request in the active sync profile and cost meter, if any
+	"""
+	profiler, meter = get_active_profiler(), get_active_cost_meter()
+	if not profiler and not meter:
+		yield
+		return
+
+	start = time.perf_counter()
+	try:
+		yield
+	finally:
+		duration = time.perf_counter() - start
+		if profiler:
+			profiler.record_request(duration)
+		if meter:
+			meter.record_request(duration)
+
+
+class CostMeter:
+	"""
+	Total database queries and WooCommerce requests of a longer task, e.g. a sync run over many records
+	"""
+
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.query_count = 0
+		self.query_time = 0.0
+		self.request_count = 0
+		self.request_time = 0.0
+
+	def record_query(self, duration: float):
+		with self.lock:
+			self.query_count += 1
+			self.query_time += duration
+
+	def record_request(self, duration: float):
+		with self.lock:
+			self.request_count += 1
+			self.request_time += duration
+
+	def as_dict(self) -> dict:
+		return {
+			"query_count": self.query_count,
+			"query_time": self.query_time,
+			"request_count": self.request_count,
+			"request_time": self.request_time,
+		}
+
+
+def get_active_cost_meter() -> CostMeter | None:
+	return getattr(frappe.local, "woocommerce_cost_meter", None)
+
+
+@contextmanager
+def measure_costs():
+	"""
+	Measure the database queries and WooCommerce requests of the enclosed code, in the CostMeter it yields
+	"""
+	meter = CostMeter()
+	sql = frappe.db.sql
+
+	def metered_sql(*args, **kwargs):
+		start = time.perf_counter()
+		try:
+			return sql(*args, **kwargs)
+		finally:
+			meter.record_query(time.perf_counter() - start)
+
+	previous_meter = get_active_cost_meter()
+	frappe.local.woocommerce_cost_meter = meter
+	frappe.db.sql = metered_sql
+	try:
+		yield meter
+	finally:
+		frappe.db.sql = sql
+		frappe.local.woocommerce_cost_meter = previous_meter
@@ -0,0 +1,306 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import frappe
+from frappe.utils import cint
+
+# Records are cached per WooCommerce record name, e.g. woocommerce_record::WooCommerce Product::example.com~12
+RECORD_CACHE_KEY = "woocommerce_record"
+# Page indexes list the record names matching a query, in the order WooCommerce returned them
+INDEX_CACHE_KEY = "woocommerce_record_index"
+# Counts of records matching a query
+COUNT_CACHE_KEY = "woocommerce_record_count"
+# Counter per DocType that is incremented to mark all of its page indexes as stale
+VERSION_CACHE_KEY = "woocommerce_record_version"
+# Complete records loaded one by one, per server, resource and ID, e.g. woocommerce_response::example.com::products::12
+RESPONSE_CACHE_KEY = "woocommerce_response"
+# Cached complete records are kept for this many seconds; they are revalidated before every use
+RESPONSE_CACHE_TTL = 24 * 60 * 60
+# In-process entries are only trusted for this many seconds, as other workers may update Redis meanwhile
+LOCAL_CACHE_TTL = 30
+LOCAL_CACHE_MAX_ENTRIES = 4096
+
+
+class LocalLRUCache:
+	"""
+	Thread-safe, size-bounded in-process cache of serialised values with a per-entry expiry
+	"""
+
+	def __init__(self, max_entries: int = LOCAL_CACHE_MAX_ENTRIES):
+		self.max_entries = max_entries
+		self.entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+		self.lock = threading.Lock()
+
+	def get(self, key: str) -> str | None:
+		with self.lock:
+			if not (entry := self.entries.get(key)):
+				return None
+			expires_at, value = entry
+			if expires_at < time.monotonic():
+				del self.entries[key]
+				return None
+			self.entries.move_to_end(key)
+			return value
+
+	def set(self, key: str, value: str, ttl: int):
+		with self.lock:
+			self.entries[key] = (time.monotonic() + ttl, value)
+			self.entries.move_to_end(key)
+			while len(self.entries) > self.max_entries:
+				self.entries.popitem(last=False)
+
+	def delete(self, key: str):
+		with self.lock:
+			self.entries.pop(key, None)
+
+
+local_cache = LocalLRUCache()
+
+
+class WooCommerceRecordCache:
+	"""
+	Two-tier cache of WooCommerce records that are listed through a virtual DocType.
+
+	The first tier holds one entry per record, keyed by its name (server domain and ID). An entry is only
+	replaced by a record with a newer date_modified; records with the same date_modified are merged, so
+	that list views and synchronisation, which request different fields, share the same entries.
+
+	The second tier holds page indexes, which only list record names. They are keyed by the query without
+	its start and page_length, so overlapping pages of the same query share one index.
+
+	Page indexes are fresh for timeout seconds, and until the DocType's version is incremented by
+	invalidate(). Stale page indexes are kept until stale_timeout, so that they can be served while
+	they are refreshed.
+
+	Both tiers are stored as JSON in Redis, with a short-lived in-process LRU cache of the same JSON in
+	front of it. Every read deserialises its own copy, so callers can modify the records they get.
+	"""
+
+	def __init__(self, doctype: str, timeout: int = 300, stale_timeout: int | None = None):
+		self.doctype = doctype
+		self.timeout = timeout
+		self.stale_timeout = max(stale_timeout or timeout, timeout)
+		self.local_ttl = min(timeout, LOCAL_CACHE_TTL)
+
+	def get_page(self, query: dict, start: int, page_length: int) -> list[dict] | None:
+		"""
+		Get a fresh page of records of a query, or None if the page or any of its records is not cached
+		"""
+		records, stale = self.get_page_allowing_stale(query, start, page_length)
+		return None if stale else records
+
+	def get_page_allowing_stale(
+		self, query: dict, start: int, page_length: int
+	) -> tuple[list[dict] | None, bool]:
+		"""
+		Get a page of records of a query, and whether the page is stale
+		"""
+		index = self._get([self._index_key(query)])[0]
+		if not index:
+			return None, False
+
+		names = index["names"]
+		if len(names) < start + page_length and not index["complete"]:
+			return None, False
+
+		page_names = names[start : start + page_length]
+		records = self.get_records(page_names)
+		if len(records) != len(page_names):
+			return None, False
+
+		stale = index["version"] != self.get_version() or time.time() - index["fetched_at"] > self.timeout
+		return [records[name] for name in page_names], stale
+
+	def set_page(
+		self, query: dict, start: int, page_length: int, records: list[dict], version: int | None = None
+	):
+		"""
+		Cache a page of records of a query, extending its page index.
+
+		Pass the version from before the records were fetched, so that an invalidation while fetching
+		leaves the page stale.
+		"""
+		self.set_records(records)
+
+		if version is None:
+			version = self.get_version()
+
+		key = self._index_key(query)
+		index = self._get([key])[0]
+
+		# Pages can only extend a fresh index without leaving a gap in it, otherwise a new index is started
+		if not index or index["version"] != version or start > len(index["names"]):
+			if start:
+				return
+			index = {"names": []}
+
+		index["names"] = index["names"][:start] + [record["name"] for record in records]
+		index["complete"] = len(records) < page_length
+		index["version"] = version
+		index["fetched_at"] = time.time()
+		self._set({key: index})
+
+	def get_count(self, query: dict) -> int | None:
+		"""
+		Get the fresh cached count of records matching a query
+		"""
+		entry = self._get([self._count_key(query)])[0]
+		if (
+			not entry
+			or entry["version"] != self.get_version()
+			or time.time() - entry["counted_at"] > self.timeout
+		):
+			return None
+		return entry["count"]
+
+	def set_count(self, query: dict, count: int, version: int | None = None):
+		"""
+		Cache the count of records matching a query, as counted at the given version
+		"""
+		if version is None:
+			version = self.get_version()
+		self._set({self._count_key(query): {"count": count, "version": version, "counted_at": time.time()}})
+
+	def get_version(self) -> int:
+		"""
+		Get the DocType's version, which invalidate() increments
+		"""
+		cache = frappe.cache()
+		return cint(cache.get(cache.make_key(self._version_key())))
+
+	def invalidate(self, records: list[dict] | None = None):
+		"""
+		Mark all page indexes of the DocType as stale, e.g. after a record was created or modified.
+
+		Any records passed, e.g. from a webhook, are cached, so that refreshed pages can reuse them.
+		"""
+		if records:
+			self.set_records(records)
+
+		cache = frappe.cache()
+		cache.incr(cache.make_key(self._version_key()))
+
+	def get_records(self, names: list[str]) -> dict[str, dict]:
+		"""
+		Get the cached records with the given names
+		"""
+		entries = self._get([self._record_key(name) for name in names])
+		return {name: entry["record"] for name, entry in zip(names, entries, strict=True) if entry}
+
+	def set_records(self, records: list[dict]):
+		"""
+		Cache records, unless a more recently modified version of them is already cached
+		"""
+		keys = [self._record_key(record["name"]) for record in records]
+		entries = {}
+		for key, existing, record in zip(keys, self._get(keys), records, strict=True):
+			date_modified = str(record.get("date_modified") or record.get("woocommerce_date_modified") or "")
+			if existing and existing["date_modified"] > date_modified:
+				continue
+			if existing and existing["date_modified"] == date_modified:
+				record = {**existing["record"], **record}
+			entries[key] = {"date_modified": date_modified, "record": record}
+
+		self._set(entries)
+
+	def delete_records(self, names: list[str]):
+		"""
+		Remove records from the cache, e.g. after they have been modified
+		"""
+		if not names:
+			return
+
+		keys = [self._record_key(name) for name in names]
+		for key in keys:
+			local_cache.delete(key)
+		cache = frappe.cache()
+		cache.delete(*[cache.make_key(key) for key in keys])
+
+	def _version_key(self) -> str:
+		return f"{VERSION_CACHE_KEY}::{self.doctype}"
+
+	def _record_key(self, name: str) -> str:
+		return f"{RECORD_CACHE_KEY}::{self.doctype}::{name}"
+
+	def _index_key(self, query: dict) -> str:
+		query = {k: v for k, v in query.items() if k not in ("start", "page_length") and v is not None}
+		return f"{INDEX_CACHE_KEY}::{self.doctype}::{hash_query(query)}"
+
+	def _count_key(self, query: dict) -> str:
+		return f"{COUNT_CACHE_KEY}::{self.doctype}::{hash_query(query)}"
+
+	def _get(self, keys: list[str]) -> list[dict | None]:
+		values = [local_cache.get(key) for key in keys]
+		missing = [i for i, value in enumerate(values) if value is None]
+		if missing:
+			cache = frappe.cache()
+			for i, raw in zip(missing, cache.mget([cache.make_key(keys[i]) for i in missing]), strict=True):
+				if raw:
+					values[i] = frappe.safe_decode(raw)
+					local_cache.set(keys[i], values[i], self.local_ttl)
+		return [json.loads(value) if value else None for value in values]
+
+	def _set(self, entries: dict[str, dict]):
+		if not entries:
+			return
+
+		cache = frappe.cache()
+		pipeline = cache.pipeline()
+		for key, value in entries.items():
+			value = serialise(value)
+			local_cache.set(key, value, self.local_ttl)
+			pipeline.set(cache.make_key(key), value, ex=self.stale_timeout)
+		pipeline.execute()
+
+
+class WooCommerceResponseCache:
+	"""
+	Cache of complete WooCommerce records, as loaded for a form or a synchronisation.
+
+	Unlike WooCommerceRecordCache, entries are only served after checking that the record was not modified
+	in WooCommerce since (see WooCommerceDocument.get_unmodified_cached_record), and only to loads that
+	request the same fields.
+	"""
+
+	def __init__(self, domain: str, resource: str):
+		self.domain = domain
+		self.resource = resource
+
+	def get(self, record_id: int, fields: str | None) -> dict | None:
+		cache = frappe.cache()
+		if not (raw := cache.get(cache.make_key(self._key(record_id)))):
+			return None
+		entry = json.loads(frappe.safe_decode(raw))
+		return entry["record"] if entry["fields"] == fields else None
+
+	def set(self, record_id: int, fields: str | None, record: dict):
+		cache = frappe.cache()
+		cache.set(
+			cache.make_key(self._key(record_id)),
+			serialise({"fields": fields, "record": record}),
+			ex=RESPONSE_CACHE_TTL,
+		)
+
+	def delete(self, record_id: int):
+		cache = frappe.cache()
+		cache.delete(cache.make_key(self._key(record_id)))
+
+	def _key(self, record_id: int) -> str:
+		return f"{RESPONSE_CACHE_KEY}::{self.domain}::{self.resource}::{record_id}"
+
+
+def serialise(value) -> str:
+	"""
+	Serialise a value to JSON deterministically, so that equal values always give equal strings
+	"""
+	return json.dumps(value, sort_keys=True, default=str)
+
+
+def hash_query(query: dict) -> str:
+	"""
+	Get a short, stable hash of a query, to use in cache keys
+	"""
+	return hashlib.sha1(serialise(query).encode(), usedforsecurity=False).hexdigest()
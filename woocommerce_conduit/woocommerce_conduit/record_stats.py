@@ -0,0 +1,142 @@
+from collections import Counter
+
+import frappe
+
+# Prefix of the Redis hashes that record stats are kept in, per DocType and field: one maps record names to
+# their recorded value, the other counts the records per value
+STATS_CACHE_KEY = "woocommerce_record_stats"
+
+# Records are counted per server, so recorded values are prefixed with the record's server
+SERVER_SEPARATOR = "\x00"
+
+# Sets (or, without a value, removes) the recorded value of a record and moves its count to the new value, in
+# one step, so that concurrent updates of a record cannot count it twice.
+# KEYS: values hash, counts hash. ARGV: record name, new value
+SET_RECORDED_VALUE = """
+local old = redis.call('HGET', KEYS[1], ARGV[1])
+if old == ARGV[2] or (not old and ARGV[2] == '') then
+	return 0
+end
+if old and redis.call('HINCRBY', KEYS[2], old, -1) <= 0 then
+	redis.call('HDEL', KEYS[2], old)
+end
+if ARGV[2] == '' then
+	redis.call('HDEL', KEYS[1], ARGV[1])
+else
+	redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+	redis.call('HINCRBY', KEYS[2], ARGV[2], 1)
+end
+return 1
+"""
+
+# Fields that list view sidebar counts are kept for, per DocType
+STATS_FIELDS = {
+	"WooCommerce Order": ("status",),
+	"WooCommerce Product": ("status", "type", "stock_status"),
+}
+
+# Fields whose counts WooCommerce reports directly, per DocType, with the report's endpoint
+REPORT_TOTALS = {
+	"WooCommerce Order": {"status": "reports/orders/totals"},
+	"WooCommerce Product": {"type": "reports/products/totals"},
+}
+
+
+def update_record_stats(doctype: str, records: list[dict]):
+	"""
+	Record the values of the stats fields of records, and update the counts of the values that changed.
+	Fields that a record does not contain keep their recorded value, as records fetched for list views only
+	contain some of the fields
+	"""
+	fields = STATS_FIELDS.get(doctype)
+	if not fields or not records:
+		return
+
+	cache = frappe.cache()
+	set_recorded_value = cache.register_script(SET_RECORDED_VALUE)
+	pipeline = cache.pipeline()
+	for field in fields:
+		keys = get_stats_keys(doctype, field)
+		for record in records:
+			if record.get(field) is not None and record.get("woocommerce_server"):
+				value = f"{record['woocommerce_server']}{SERVER_SEPARATOR}{record[field]}"
+				set_recorded_value(keys=keys, args=[record["name"], value], client=pipeline)
+	pipeline.execute()
+
+
+def remove_record_stats(doctype: str, names: list[str]):
+	"""
+	Remove records that were deleted in WooCommerce from the counts
+	"""
+	fields = STATS_FIELDS.get(doctype)
+	if not fields or not names:
+		return
+
+	cache = frappe.cache()
+	set_recorded_value = cache.register_script(SET_RECORDED_VALUE)
+	pipeline = cache.pipeline()
+	for field in fields:
+		keys = get_stats_keys(doctype, field)
+		for name in names:
+			set_recorded_value(keys=keys, args=[name, ""], client=pipeline)
+	pipeline.execute()
+
+
+def get_local_stats(doctype: str, columns: list[str], filters: list | None = None) -> dict[str, list]:
+	"""
+	Get the recorded counts per value of columns, of the records of all servers or of the servers that the
+	filters select.
+
+	Counts are kept per server only, so if the filters use any other field, no counts are returned, as they
+	would be wrong.
+	"""
+	fields = STATS_FIELDS.get(doctype, ())
+	columns = [column for column in columns if column in fields]
+	if not columns:
+		return {}
+
+	from woocommerce_conduit.woocommerce_conduit.woocommerce_api import normalise_frappe_filters
+
+	conditions = []
+	for field, operator, value in normalise_frappe_filters(filters):
+		if field != "woocommerce_server" or operator not in ("=", "!=", "in", "not in"):
+			return {}
+		if operator in ("in", "not in") and isinstance(value, str):
+			value = [v.strip() for v in value.split(",")]
+		conditions.append((operator, value))
+
+	cache = frappe.cache()
+	pipeline = cache.pipeline()
+	for column in columns:
+		pipeline.hgetall(get_stats_keys(doctype, column)[1])
+
+	stats = {}
+	for column, counts in zip(columns, pipeline.execute(), strict=True):
+		counter = Counter()
+		for recorded, count in counts.items():
+			server, _, value = frappe.safe_decode(recorded).partition(SERVER_SEPARATOR)
+			if all(matches(server, operator, selected) for operator, selected in conditions):
+				counter[value] += int(count)
+		stats[column] = [list(item) for item in counter.most_common() if item[1] > 0]
+	return stats
+
+
+def get_stats_keys(doctype: str, field: str) -> list[str]:
+	"""
+	Get the keys of the hashes of recorded values and of counts per value of a field
+	"""
+	cache = frappe.cache()
+	return [
+		cache.make_key(f"{STATS_CACHE_KEY}::{doctype}::{field}"),
+		cache.make_key(f"{STATS_CACHE_KEY}::{doctype}::{field}::counts"),
+	]
+
+
+def matches(recorded, operator: str, value) -> bool:
+	if operator == "=":
+		return recorded == value
+	if operator == "!=":
+		return recorded != value
+	if operator == "in":
+		return recorded in value
+	return recorded not in value
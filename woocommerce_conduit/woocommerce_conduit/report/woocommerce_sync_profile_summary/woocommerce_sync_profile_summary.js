@@ -0,0 +1,25 @@
+// Copyright (c) 2025, Karol Parzonka and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["WooCommerce Sync Profile Summary"] = {
+	filters: [
+		{
+			fieldname: "sync_type",
+			label: __("Sync Type"),
+			fieldtype: "Select",
+			options: "\nSales Order\nItem\nItem Price",
+		},
+		{
+			fieldname: "from_date",
+			label: __("From Date"),
+			fieldtype: "Date",
+			default: frappe.datetime.add_days(frappe.datetime.get_today(), -7),
+		},
+		{
+			fieldname: "to_date",
+			label: __("To Date"),
+			fieldtype: "Date",
+			default: frappe.datetime.get_today(),
+		},
+	],
+};
@@ -0,0 +1,78 @@
+# Copyright (c) 2025, Karol Parzonka and contributors
+# For license information, please see license.txt
+
+import json
+from collections import defaultdict
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, getdate
+
+from woocommerce_conduit.woocommerce_conduit.profiling import PHASE_METRICS
+
+
+def execute(filters: dict | None = None):
+	"""
+	Summarise WooCommerce Sync Profiles per sync type and phase, with the average cost of a phase per
+	synchronisation and its share of the total wall time
+	"""
+	filters = frappe._dict(filters or {})
+	conditions = {}
+	if filters.sync_type:
+		conditions["sync_type"] = filters.sync_type
+	if filters.from_date and filters.to_date:
+		conditions["creation"] = [
+			"between",
+			[getdate(filters.from_date), add_days(getdate(filters.to_date), 1)],
+		]
+
+	profiles = frappe.get_all("WooCommerce Sync Profile", filters=conditions, fields=["sync_type", "phases"])
+
+	syncs = defaultdict(int)
+	totals = defaultdict(lambda: dict.fromkeys(PHASE_METRICS, 0))
+	for profile in profiles:
+		syncs[profile.sync_type] += 1
+		for phase, metrics in json.loads(profile.phases or "{}").items():
+			for metric in PHASE_METRICS:
+				totals[(profile.sync_type, phase)][metric] += metrics.get(metric, 0)
+
+	wall_times = defaultdict(float)
+	for (sync_type, _phase), metrics in totals.items():
+		wall_times[sync_type] += metrics["wall_time"]
+
+	data = []
+	for (sync_type, phase), metrics in sorted(totals.items(), key=lambda item: -item[1]["wall_time"]):
+		count = syncs[sync_type]
+		data.append(
+			{
+				"sync_type": sync_type,
+				"phase": phase,
+				"syncs": count,
+				"query_count": metrics["query_count"] / count,
+				"query_time": metrics["query_time"] * 1000 / count,
+				"request_count": metrics["request_count"] / count,
+				"request_time": metrics["request_time"] * 1000 / count,
+				"cpu_time": metrics["cpu_time"] * 1000 / count,
+				"wall_time": metrics["wall_time"] * 1000 / count,
+				"wall_time_share": metrics["wall_time"] * 100 / wall_times[sync_type]
+				if wall_times[sync_type]
+				else 0,
+			}
+		)
+
+	return get_columns(), data
+
+
+def get_columns() -> list[dict]:
+	return [
+		{"fieldname": "sync_type", "label": _("Sync Type"), "fieldtype": "Data", "width": 110},
+		{"fieldname": "phase", "label": _("Phase"), "fieldtype": "Data", "width": 130},
+		{"fieldname": "syncs", "label": _("Syncs"), "fieldtype": "Int", "width": 80},
+		{"fieldname": "query_count", "label": _("Queries / Sync"), "fieldtype": "Float", "width": 120},
+		{"fieldname": "query_time", "label": _("Query ms / Sync"), "fieldtype": "Float", "width": 130},
+		{"fieldname": "request_count", "label": _("Requests / Sync"), "fieldtype": "Float", "width": 130},
+		{"fieldname": "request_time", "label": _("Request ms / Sync"), "fieldtype": "Float", "width": 140},
+		{"fieldname": "cpu_time", "label": _("CPU ms / Sync"), "fieldtype": "Float", "width": 120},
+		{"fieldname": "wall_time", "label": _("Wall ms / Sync"), "fieldtype": "Float", "width": 120},
+		{"fieldname": "wall_time_share", "label": _("Wall Time %"), "fieldtype": "Percent", "width": 110},
+	]
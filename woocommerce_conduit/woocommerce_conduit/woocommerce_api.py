@@ -1,16 +1,103 @@
 import json
+import re
 import traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import copy_context
+from copy import deepcopy
+from datetime import timedelta
+from operator import eq, ge, gt, le, lt, ne
 from urllib.parse import urlparse
 
 import frappe
 import frappe.utils
 from frappe import _
+from frappe.model import no_value_fields
 from frappe.model.document import Document
+from frappe.utils import cint, cstr, flt, get_datetime
 from woocommerce import API
 
 from woocommerce_conduit.exceptions import SyncDisabledError
+from woocommerce_conduit.woocommerce_conduit.cassette import get_cassette
+from woocommerce_conduit.woocommerce_conduit.mirror import (
+	enqueue_mirror_records,
+	get_mirror_count,
+	get_mirror_record,
+	is_mirror_enabled,
+)
+from woocommerce_conduit.woocommerce_conduit.profiling import profile_request
+from woocommerce_conduit.woocommerce_conduit.record_cache import (
+	WooCommerceRecordCache,
+	WooCommerceResponseCache,
+)
+from woocommerce_conduit.woocommerce_conduit.record_stats import (
+	REPORT_TOTALS,
+	get_local_stats,
+	update_record_stats,
+)
 
 WC_RESOURCE_DELIMITER = "~"
+# Maximum number of records scanned per list, when filters must be applied client-side
+CLIENT_FILTER_SCAN_LIMIT = 1000
+
+# Frappe field names of WooCommerce fields that can be filtered or sorted on
+FRAPPE_FIELD_ALIASES = {
+	"woocommerce_id": "id",
+	"woocommerce_date_created": "date_created",
+	"creation": "date_created",
+	"woocommerce_date_modified": "date_modified",
+	"modified": "date_modified",
+}
+
+# WooCommerce field names of Frappe fields, to request them in _fields
+WC_FIELD_NAMES = {
+	"woocommerce_id": "id",
+	"woocommerce_name": "name",
+	"woocommerce_date_created": "date_created",
+	"woocommerce_date_modified": "date_modified",
+}
+
+# WooCommerce parameters for the start and end of a date range, per field
+DATE_RANGE_PARAMS = {
+	"date_created": ("after", "before"),
+	"date_modified": ("modified_after", "modified_before"),
+}
+
+# WooCommerce orderby values, per field
+WC_ORDERBY = {
+	"date_created": "date",
+	"date_modified": "modified",
+	"id": "id",
+	"name": "id",
+	"woocommerce_name": "title",
+	"slug": "slug",
+	"price": "price",
+	"total_sales": "popularity",
+	"average_rating": "rating",
+	"menu_order": "menu_order",
+}
+WC_PRODUCT_ONLY_ORDERBY = ("price", "popularity", "rating", "menu_order")
+# Product types that the products endpoint can filter on; variations are only listed per parent
+WC_PRODUCT_LIST_TYPES = ("simple", "grouped", "external", "variable")
+
+FILTER_OPERATORS = {
+	"=": eq,
+	"!=": ne,
+	">": gt,
+	">=": ge,
+	"<": lt,
+	"<=": le,
+}
+# Time in seconds that counts of records are cached
+COUNT_CACHE_TTL = 60
+
+
+def is_request_logging_enabled() -> bool:
+	"""
+	Whether requests are logged in WooCommerce Request Logs. Tests and benchmarks set a flag to skip the
+	logs, as they are written by background jobs that a rollback doesn't undo
+	"""
+	return not (frappe.flags.in_test or frappe.flags.skip_woocommerce_request_log)
 
 
 class WooCommerceAPI(API):
@@ -18,10 +105,20 @@ class WooCommerceAPI(API):
 
 	def _API__request(self, method, endpoint, data, params=None, **kwargs):
 		"""Override _request method to also create a 'WooCommerce Request Log'"""
+		# Record or replay responses, if a cassette is configured in the site config
+		if cassette := get_cassette():
+			cassette_key = cassette.key(self.url, method, endpoint, params)
+			if cassette.mode == "replay":
+				with profile_request():
+					return cassette.replay(cassette_key)
+
 		result = None
 		try:
-			result = super()._API__request(method, endpoint, data, params, **kwargs)  # type: ignore
-			if not frappe.flags.in_test:
+			with profile_request():
+				result = super()._API__request(method, endpoint, data, params, **kwargs)  # type: ignore
+			if cassette:
+				cassette.record(cassette_key, result)
+			if is_request_logging_enabled():
 				frappe.enqueue(
 					"woocommerce_conduit.tasks.utils.log_woocommerce_request",
 					url=self.url,
@@ -34,7 +131,7 @@ class WooCommerceAPI(API):
 				)
 			return result
 		except Exception as e:
-			if not frappe.flags.in_test:
+			if is_request_logging_enabled():
 				frappe.enqueue(
 					"woocommerce_conduit.tasks.utils.log_woocommerce_request",
 					url=self.url,
@@ -59,6 +156,7 @@ class WooCommerceDocument(Document):
 	def __init__(self, *args, **kwargs):
 		self.init_api()
 		super().__init__(*args, **kwargs)
+		self.set_loaded_values()
 
 	@staticmethod
 	def _init_api() -> list[WooCommerceAPI]:
@@ -146,6 +244,17 @@ class WooCommerceDocument(Document):
 			ConnectionError: If there's a network issue
 			ValueError: If the response cannot be parsed as JSON
 		"""
+		# Serve complete records from the mirror, if mirror mode is enabled, unless the caller set
+		# flags.skip_mirror, e.g. to synchronise the record
+		if (
+			not self.flags.skip_mirror
+			and is_mirror_enabled()
+			and (record := get_mirror_record(self.doctype, self.name))
+		):
+			super(Document, self).__init__(record)
+			self.set_loaded_values()
+			return
+
 		# Parse the server domain and record_id from the Document name
 		wc_server_domain, record_id = get_domain_and_id_from_woocommerce_record_name(self.name)
 
@@ -163,19 +272,19 @@ class WooCommerceDocument(Document):
 			)
 
 		# Select the relevant WooCommerce server
-		try:
-			self.current_wc_api = next(
-				api for api in self.wc_api_list if wc_server_domain in api.woocommerce_server_url
-			)
-		except StopIteration:
-			log_and_raise_error(error_text=f"No WooCommerce server found for domain {wc_server_domain}")
+		self.current_wc_api = self.get_wc_api(wc_server_domain)
 
-		# Get WooCommerce Record
+		# Get WooCommerce Record, or the cached copy of it if it has not been modified since
+		response_cache = WooCommerceResponseCache(wc_server_domain, self.resource)
 		try:
-			response = self.current_wc_api.get(f"{self.resource}/{record_id}", params=params)
-			if response.status_code != 200:
-				log_and_raise_error(error_text=f"API returned {response.status_code}", response=response)
-			record = response.json()
+			record = self.get_unmodified_cached_record(response_cache, record_id, params.get("_fields"))
+			if record is None:
+				response = self.current_wc_api.get(f"{self.resource}/{record_id}", params=params)
+				if response.status_code != 200:
+					log_and_raise_error(error_text=f"API returned {response.status_code}", response=response)
+				record = response.json()
+				if "id" in record:
+					response_cache.set(record_id, params.get("_fields"), record)
 		except ConnectionError as err:
 			log_and_raise_error(
 				exception=err,
@@ -199,10 +308,131 @@ class WooCommerceDocument(Document):
 			record, woocommerce_server_url=self.current_wc_api.woocommerce_server_url
 		)
 		record = self.after_load_from_db(record)
+		self.after_records_fetched([record], complete=True)
 
 		super(Document, self).__init__(record)
+		self.set_loaded_values()
+
+	def get_unmodified_cached_record(
+		self, response_cache: WooCommerceResponseCache, record_id: int, fields: str | None
+	) -> dict | None:
+		"""
+		Get the cached copy of a record, if WooCommerce reports the same date_modified for it.
+
+		Checking only the record's ID and date_modified costs a request, but a much smaller one than loading
+		the record, with its descriptions, images, attributes or line items.
+
+		This probe stands in for a conditional request (If-None-Match or If-Modified-Since answered with 304
+		Not Modified): the WooCommerce REST API sends neither an ETag nor a Last-Modified header for
+		products and orders, and the woocommerce client sets the request headers itself, so it can't send
+		conditional ones.
+		"""
+		if not (cached_record := response_cache.get(record_id, fields)):
+			return None
+
+		response = self.current_wc_api.get(
+			f"{self.resource}/{record_id}", params={"_fields": "id,date_modified"}
+		)
+		if response.status_code != 200 or response.json().get("date_modified") != cached_record.get(
+			"date_modified"
+		):
+			return None
+		return cached_record
+
+	def get_wc_api(self, wc_server_domain: str) -> WooCommerceAPI:
+		"""
+		Get the WooCommerce API connection for a server domain
+		"""
+		try:
+			return next(api for api in self.wc_api_list if wc_server_domain in api.woocommerce_server_url)
+		except StopIteration:
+			log_and_raise_error(error_text=f"No WooCommerce server found for domain {wc_server_domain}")
+
+	def get_record_endpoint(self, record_id: int) -> str:
+		"""
+		Get the endpoint of this record, relative to the WooCommerce API
+		"""
+		return f"{self.resource}/{record_id}"
+
+	def get_writable_fields(self) -> list:
+		return [df for df in self.meta.fields if df.fieldtype not in no_value_fields and not df.read_only]
+
+	def set_loaded_values(self):
+		"""
+		Remember the values of the writable fields as they were loaded, so that updates only send the fields
+		that changed since
+		"""
+		self._loaded_values = {
+			df.fieldname: deepcopy(self.get(df.fieldname)) for df in self.get_writable_fields()
+		}
+
+	def get_changed_fields(self) -> dict:
+		"""
+		Get the writable fields that changed since the record was loaded, keyed by their WooCommerce names
+		"""
+		changes = {}
+		for df in self.get_writable_fields():
+			loaded_value, value = self._loaded_values.get(df.fieldname), self.get(df.fieldname)
+
+			if df.fieldtype == "JSON":
+				value = parse_json_field(value)
+				if parse_json_field(loaded_value) == value:
+					continue
+			else:
+				if self.cast(loaded_value, df) == self.cast(value, df):
+					continue
+				# WooCommerce sends some numbers as strings, e.g. prices, and expects them back as strings
+				if isinstance(loaded_value, str) and isinstance(value, int | float):
+					value = cstr(value)
+
+			changes[WC_FIELD_NAMES.get(df.fieldname, df.fieldname)] = value
+
+		return self.map_changed_fields(changes)
+
+	def map_changed_fields(self, changes: dict) -> dict:
+		"""
+		Map changed fields to the body of a WooCommerce update, for fields that are stored differently
+		"""
+		return changes
+
+	def update_changed_fields(self):
+		"""
+		Send the fields that changed since the record was loaded to WooCommerce, if sync is enabled for its
+		WooCommerce Server.
+
+		Only the changed fields are sent, so that WooCommerce does not reprocess unchanged images and
+		attributes, and edits made in WooCommerce in the meantime are not overwritten.
+		"""
+		if not (changes := self.get_changed_fields()):
+			return
+
+		wc_server_domain, record_id = get_domain_and_id_from_woocommerce_record_name(self.name)
+		if not frappe.get_cached_doc("WooCommerce Server", wc_server_domain).enabled_sync:
+			return
+
+		wc_api = self.get_wc_api(wc_server_domain)
+		try:
+			response = wc_api.put(self.get_record_endpoint(record_id), data=changes)
+			if response.status_code != 200:
+				log_and_raise_error(error_text=f"API returned {response.status_code}", response=response)
+			record = response.json()
+		except ConnectionError as err:
+			log_and_raise_error(
+				exception=err,
+				error_text=f"Network error when updating WooCommerce {self.resource} #{record_id}",
+			)
+
+		WooCommerceResponseCache(wc_server_domain, self.resource).delete(record_id)
+
+		# Take over the values set by WooCommerce, e.g. date_modified
+		record = self.pre_init_document(record, woocommerce_server_url=wc_api.woocommerce_server_url)
+		record = self.after_load_from_db(record)
+		self.invalidate_list_cache(records=[record], names=[self.name])
+		self.update(record)
+		self.set_loaded_values()
 
-	def after_load_from_db(self, record: dict):
+	@classmethod
+	def after_load_from_db(cls, record: dict):
 		return record
 
 	@classmethod
@@ -214,7 +444,9 @@ class WooCommerceDocument(Document):
 		Implements efficient pagination and error handling without redundant caching.
 
 		Args:
-			args: Dictionary containing request parameters (filters, pagination, etc.)
+			args: Dictionary containing request parameters (filters, pagination, etc.). Set
+				skip_record_updates to fetch records without updating the record stats and the mirror with
+				them, e.g. when they are only fetched to count them
 
 		Returns:
 			List: WooCommerce records processed for Frappe
@@ -224,9 +456,9 @@ class WooCommerceDocument(Document):
 			frappe.log_error("WooCommerce API Error", "Invalid arguments for get_list_of_records")
 			return []
 
-		# Initialise the WC API
+		# Initialise the WC API, unless the caller already did so
 		try:
-			wc_api_list = cls._init_api()
+			wc_api_list = args.get("wc_api_list") or cls._init_api()
 		except SyncDisabledError:
 			frappe.msgprint(
 				_("WooCommerce synchronization is disabled. Please enable at least one WooCommerce server.")
@@ -249,30 +481,64 @@ class WooCommerceDocument(Document):
 		# Map Frappe query parameters to WooCommerce query parameters
 		params = {}
 
-		# Optimize fields selection for specific doctypes
-		if cls.doctype == "WooCommerce Product":
+		# Optimize fields selection for specific doctypes, unless the caller asked for specific fields
+		if args.get("_fields"):
+			params["_fields"] = args["_fields"]
+		elif cls.doctype == "WooCommerce Product":
 			params["_fields"] = "name,id,date_created,date_modified,type,sku,status"
 		elif cls.doctype == "WooCommerce Order":
 			params["_fields"] = "id,number,date_created,date_modified,status"
 
 		# Handle pagination
-		requested = int(args.get("page_length", wc_records_per_page_limit))
-		per_page = min(requested, wc_records_per_page_limit)
+		max_results = args.get("max_results", 1000)  # Limit maximum records to prevent runaway queries
+		requested = min(int(args.get("page_length", wc_records_per_page_limit)), max_results)
 		offset = int(args.get("start", 0))
-		params["per_page"] = per_page
 
-		# Map Frappe filters to WooCommerce parameters
+		# Map Frappe filters to WooCommerce parameters; the rest are applied to the fetched records
+		client_filters = []
 		if args.get("filters"):
 			try:
-				updated_params = map_frappe_filters_to_wc_params(args["filters"])
+				updated_params, client_filters = split_frappe_filters(args["filters"], cls.doctype)
 				params.update(updated_params)
 			except Exception as e:
 				frappe.log_error(f"Error mapping filters: {e!s}", "WooCommerce Filter Error")
 
+		# Keyset pagination walks records in the order they were modified, instead of skipping an offset
+		keyset = bool(args.get("keyset_pagination"))
+		if keyset:
+			params.update({"orderby": "modified", "order": "asc"})
+			if params.get("_fields"):
+				params["_fields"] = ",".join(
+					dict.fromkeys([*params["_fields"].split(","), "id", "date_modified"])
+				)
+		else:
+			# Map Frappe sorting to WooCommerce parameters
+			params.update(map_frappe_order_by_to_wc_params(args.get("order_by"), cls.doctype))
+
+		if client_filters:
+			# Fetch full pages, and the fields that are filtered on
+			params["per_page"] = wc_records_per_page_limit
+			if params.get("_fields"):
+				params["_fields"] = ",".join(
+					dict.fromkeys(
+						params["_fields"].split(",")
+						+ [WC_FIELD_NAMES.get(field, field) for field, _operator, _value in client_filters]
+					)
+				)
+		else:
+			params["per_page"] = min(requested, wc_records_per_page_limit)
+
+		meta = frappe.get_meta(cls.doctype)
+
 		# Initialize required variables
 		all_results = []
-		total_processed = 0
-		max_results = args.get("max_results", 1000)  # Limit maximum records to prevent runaway queries
+		# Matching records still to be skipped, to honour the start of the page
+		remaining_offset = 0 if keyset else offset
+		# Position of each record in all_results, as keyset pagination lists records again if they are
+		# modified while they are being listed
+		positions = {}
+		# Records scanned for client-side filters, over all servers
+		scanned = 0
 
 		# Filter servers if specified
 		selected_servers = []
@@ -286,48 +552,53 @@ class WooCommerceDocument(Document):
 		if not selected_servers:
 			return []
 
+		endpoint = args.get("endpoint", cls.resource)
+
 		for wc_server in selected_servers:
-			endpoint = args.get("endpoint", cls.resource)
-			server_offset = max(0, offset - total_processed)
+			if len(all_results) >= requested:
+				break
+
+			# Without client-side filters, WooCommerce skips the records before the page itself
+			server_offset = 0 if client_filters or keyset else remaining_offset
+			cursor = KeysetCursor(params)
+
+			while len(all_results) < requested and scanned < CLIENT_FILTER_SCAN_LIMIT:
+				batch_params = params.copy()
+				if keyset:
+					batch_params.update(cursor.params())
+				elif server_offset > 0:
+					batch_params["offset"] = server_offset
 
-			if server_offset > 0:
-				params["offset"] = server_offset
-			else:
-				params.pop("offset", None)  # Remove offset if not needed
+				try:
+					# Fetch records from this server
+					response = wc_server.get(endpoint, params=batch_params)
 
-			try:
-				# Fetch records from this server
-				response = wc_server.get(endpoint, params=params)
+					if response.status_code != 200:
+						frappe.log_error(
+							f"WooCommerce API error: {response.status_code} - {response.text}",
+							"WooCommerce API Error",
+						)
+						break
 
-				if response.status_code != 200:
+					# Parse the response
+					results = response.json()
+				except Exception as err:
 					frappe.log_error(
-						f"WooCommerce API error: {response.status_code} - {response.text}",
+						f"Error fetching WooCommerce records: {err!s}\nEndpoint: {endpoint}\nParams: {batch_params}",
 						"WooCommerce API Error",
 					)
-					continue
-
-				# Parse the response
-				results = response.json()
-				if not results:
-					continue
-			except Exception as err:
-				frappe.log_error(
-					f"Error fetching WooCommerce records: {err!s}\nEndpoint: {endpoint}\nParams: {params}",
-					"WooCommerce API Error",
-				)
-				continue
-
-			# Get total count from headers if available
-			total_records_in_server = 0
-			if "x-wp-total" in response.headers:
-				total_records_in_server = int(response.headers["x-wp-total"])
-			else:
-				total_records_in_server = len(results)  # Fallback estimate
+					break
 
-			# Process the results
-			records_needed = min(requested - len(all_results), max_results - total_processed)
+				if keyset:
+					cursor.advance(results)
+				elif not client_filters:
+					if not results:
+						# The page starts after this server's records, so skip all of them on the next server
+						total_records_in_server = int(response.headers.get("x-wp-total", 0))
+						remaining_offset = max(0, remaining_offset - total_records_in_server)
+						break
+					remaining_offset = 0
 
-			while results:
 				# Process this batch of records
 				processed_batch = []
 				for record in results:
@@ -343,39 +614,65 @@ class WooCommerceDocument(Document):
 							"WooCommerce Record Error",
 						)
 
-				records_needed -= len(results)
+				if not args.get("skip_record_updates"):
+					cls.after_records_fetched(processed_batch)
+
+				for record in processed_batch:
+					if client_filters:
+						if not matches_filters(record, client_filters, meta):
+							continue
+						if remaining_offset:
+							remaining_offset -= 1
+							continue
+					if keyset and record["name"] in positions:
+						all_results[positions[record["name"]]] = record
+					elif len(all_results) < requested:
+						positions[record["name"]] = len(all_results)
+						all_results.append(record)
+
 				server_offset += len(results)
-				all_results.extend(processed_batch)
-				total_processed += min(total_records_in_server, len(processed_batch))
+				if client_filters:
+					scanned += len(results)
 
-				if records_needed <= 0 or len(results) < params["per_page"]:
+				if len(results) < batch_params["per_page"]:
 					break
 
-				try:
-					batch_params = params.copy()
-					batch_params["per_page"] = min(records_needed, params["per_page"])
-					batch_params["offset"] = server_offset
-					response = wc_server.get(endpoint, params=batch_params)
+		# Return the records as requested
+		if args.get("as_doc"):
+			try:
+				return [frappe.get_doc(record) for record in all_results]
+			except Exception as e:
+				frappe.log_error("WooCommerce Format Error", f"Error converting to Frappe docs: {e!s}")
+				return []
 
-					if response.status_code != 200:
-						break
+		return all_results
 
-					# Parse the response
-					results = response.json()
-				except Exception:
-					break
+	@classmethod
+	def invalidate_list_cache(cls, records: list[dict] | None = None, names: list[str] | None = None):
+		"""
+		Mark the cached lists of this DocType as stale, e.g. after a webhook or a write to WooCommerce
 
-			# Return the records as requested
-			if args.get("as_doc"):
-				try:
-					return [frappe.get_doc(record) for record in all_results]
-				except Exception as e:
-					frappe.log_error("WooCommerce Format Error", f"Error converting to Frappe docs: {e!s}")
-					return []
-			else:
-				return all_results
+		Args:
+			records: Complete, up-to-date records to cache, e.g. from a webhook payload
+			names: Names of records that were modified, and whose cached versions are outdated
+		"""
+		cache = WooCommerceRecordCache(cls.doctype)
+		cache.delete_records(names or [])
+		cache.invalidate(records)
+		cls.after_records_fetched(records or [], complete=True)
 
-		return []
+	@classmethod
+	def after_records_fetched(cls, records: list[dict], complete: bool = False):
+		"""
+		Keep the local aggregates and, in mirror mode, the mirror up to date with fetched records
+
+		Args:
+			records: Records as processed by pre_init_document
+			complete: Whether the records are complete, rather than fetched for a list
+		"""
+		update_record_stats(cls.doctype, records)
+		if is_mirror_enabled():
+			enqueue_mirror_records(cls.doctype, records, complete=complete)
 
 	@classmethod
 	def during_get_list_of_records(cls, record: dict, args):
@@ -474,7 +771,7 @@ class WooCommerceDocument(Document):
 		"""
 		json_fields = cls.get_json_fields()
 		for field in json_fields:
-			if obj.get(field.fieldname):
+			if obj.get(field.fieldname) and isinstance(obj[field.fieldname], str):
 				obj[field.fieldname] = json.loads(obj[field.fieldname])
 		return obj
 
@@ -494,17 +791,34 @@ class WooCommerceDocument(Document):
 	@classmethod
 	def get_count_of_records(cls, args) -> int:
 		"""
-		Returns count of WooCommerce Records across all enabled servers
+		Returns count of WooCommerce Records matching the filters across all enabled servers
+
+		Servers are queried concurrently, and counts are cached per set of filters for a short time, or
+		until the DocType's cached lists are invalidated.
 
 		Args:
-			args: Dictionary containing request parameters (filters, etc.)
+			args: Dictionary containing request parameters (filters, servers, etc.)
 
 		Returns:
 			int: Total count of records
-
-		Raises:
-			SyncDisabledError: If synchronization is disabled
 		"""
+		args = args or {}
+
+		# Count from the mirror, if mirror mode is enabled and the filters can be applied to it
+		if not args.get("skip_mirror") and is_mirror_enabled():
+			if (count := get_mirror_count(cls.doctype, args)) is not None:
+				return count
+
+		cache = WooCommerceRecordCache(cls.doctype, timeout=COUNT_CACHE_TTL)
+		query = {"filters": args.get("filters"), "servers": sorted(args.get("servers") or [])}
+
+		if not args.get("skip_cache"):
+			try:
+				if (count := cache.get_count(query)) is not None:
+					return count
+			except Exception as e:
+				frappe.log_error("WooCommerce Cache Error", f"WooCommerce count cache fetch error: {e!s}")
+
 		# Initialize the WC API
 		try:
 			wc_api_list = cls._init_api()
@@ -514,30 +828,163 @@ class WooCommerceDocument(Document):
 			)
 			return 0
 
-		total_count = 0
+		if args.get("servers"):
+			wc_api_list = [api for api in wc_api_list if api.woocommerce_server in args["servers"]]
+
+		version = cache.get_version()
+		params = {"per_page": 1, "_fields": "id"}
 
-		# Get counts from each server
-		for wc_server in wc_api_list:
+		# Map Frappe filters to WooCommerce parameters, as get_list_of_records does
+		if args.get("filters"):
 			try:
-				response = wc_server.get(cls.resource, params={"per_page": 1, "_fields": "id"})
+				updated_params, client_filters = split_frappe_filters(args["filters"], cls.doctype)
+				params.update(updated_params)
+			except Exception as e:
+				frappe.log_error(f"Error mapping filters: {e!s}", "WooCommerce Filter Error")
+				client_filters = []
+
+			# Records can only be counted by fetching them if some filters must be applied client-side,
+			# so these counts stop at CLIENT_FILTER_SCAN_LIMIT
+			if client_filters:
+				total_count = len(
+					cls.get_list_of_records(
+						{
+							"doctype": cls.doctype,
+							"filters": args["filters"],
+							"servers": args.get("servers"),
+							"wc_api_list": wc_api_list,
+							"_fields": "id",
+							"page_length": CLIENT_FILTER_SCAN_LIMIT,
+							"max_results": CLIENT_FILTER_SCAN_LIMIT,
+							# The records only have the fields that are filtered on
+							"skip_record_updates": True,
+						}
+					)
+				)
+				try:
+					cache.set_count(query, total_count, version=version)
+				except Exception as e:
+					frappe.log_error("WooCommerce Cache Error", f"WooCommerce count cache set error: {e!s}")
+				return total_count
 
-				if response.status_code != 200:
+		total_count = 0
+		count_complete = True
+
+		# Get counts from each server concurrently; only the requests run in the worker threads
+		with ThreadPoolExecutor(max_workers=max(len(wc_api_list), 1)) as executor:
+			futures = {
+				executor.submit(copy_context().run, wc_server.get, cls.resource, params=params): wc_server
+				for wc_server in wc_api_list
+			}
+			for future in as_completed(futures):
+				wc_server = futures[future]
+				try:
+					response = future.result()
+
+					if response.status_code != 200:
+						frappe.log_error(
+							f"WooCommerce API error: {response.status_code} - {response.text}",
+							"WooCommerce API Error",
+						)
+						count_complete = False
+						continue
+
+					if "x-wp-total" in response.headers:
+						total_count += int(response.headers["x-wp-total"])
+
+				except Exception as err:
+					count_complete = False
 					frappe.log_error(
-						f"WooCommerce API error: {response.status_code} - {response.text}",
-						"WooCommerce API Error",
+						f"Error getting count from {wc_server.woocommerce_server_url}: {err!s}",
+						"WooCommerce Count Error",
 					)
-					continue
 
-				if "x-wp-total" in response.headers:
-					total_count += int(response.headers["x-wp-total"])
+		# Counts that are missing a server are not cached, so that the next request tries again
+		if count_complete:
+			try:
+				cache.set_count(query, total_count, version=version)
+			except Exception as e:
+				frappe.log_error("WooCommerce Cache Error", f"WooCommerce count cache set error: {e!s}")
 
-			except Exception as err:
-				frappe.log_error(
-					f"Error getting count from {wc_server.woocommerce_server_url}: {err!s}",
-					"WooCommerce Count Error",
-				)
 		return total_count
 
+	@classmethod
+	def get_stats_of_records(cls, args) -> dict[str, list]:
+		"""
+		Returns counts per value of the requested columns, for the list view sidebar
+
+		Without filters, counts of columns that WooCommerce reports on are taken from its report totals,
+		summed across servers. Other counts are kept per server whenever records are fetched, synchronised
+		or deleted (see record_stats), so they are only given without filters or with filters on the server.
+
+		Args:
+			args: Dictionary containing the columns (stats) and filters
+
+		Returns:
+			Dict: List of [value, count] per column
+		"""
+		args = args or {}
+		columns = frappe.parse_json(args.get("stats") or "[]")
+		filters = frappe.parse_json(args.get("filters") or "[]")
+		if isinstance(filters, dict):
+			filters = [
+				[cls.doctype, field, *(value if isinstance(value, list | tuple) else ["=", value])]
+				for field, value in filters.items()
+			]
+
+		stats = {}
+		if not filters:
+			for column, endpoint in REPORT_TOTALS.get(cls.doctype, {}).items():
+				if column in columns and (totals := cls.get_report_totals(endpoint)) is not None:
+					stats[column] = totals
+
+		try:
+			stats.update(get_local_stats(cls.doctype, [c for c in columns if c not in stats], filters))
+		except Exception as e:
+			frappe.log_error("WooCommerce Stats Error", f"Error counting recorded values: {e!s}")
+
+		return stats
+
+	@classmethod
+	def get_report_totals(cls, endpoint: str) -> list[list] | None:
+		"""
+		Returns the totals per slug of a WooCommerce report, summed across all enabled servers, or None if
+		any server does not provide the report
+		"""
+		cache_key = f"woocommerce_report_totals::{endpoint}"
+		if (totals := frappe.cache().get_value(cache_key)) is not None:
+			return totals
+
+		try:
+			wc_api_list = cls._init_api()
+		except SyncDisabledError:
+			return None
+
+		totals_by_slug = Counter()
+		with ThreadPoolExecutor(max_workers=len(wc_api_list)) as executor:
+			futures = {
+				executor.submit(copy_context().run, wc_server.get, endpoint): wc_server
+				for wc_server in wc_api_list
+			}
+			for future in as_completed(futures):
+				wc_server = futures[future]
+				try:
+					response = future.result()
+					if response.status_code != 200:
+						return None
+					for total in response.json():
+						totals_by_slug[total["slug"]] += cint(total["total"])
+				except Exception as err:
+					frappe.log_error(
+						f"Error getting {endpoint} from {wc_server.woocommerce_server_url}: {err!s}",
+						"WooCommerce Stats Error",
+					)
+					return None
+
+		totals = [[slug, count] for slug, count in totals_by_slug.most_common() if count]
+		frappe.cache().set_value(cache_key, totals, expires_in_sec=COUNT_CACHE_TTL)
+		return totals
+
 	@classmethod
 	def get_api_response(cls, server: str, endpoint: str, **kwargs):
 		# Initialise the WC API
@@ -615,6 +1062,13 @@ def log_and_raise_error(exception=None, error_text=None, response=None):
 		raise exception
 
 
+def parse_json_field(value):
+	"""
+	Parse the value of a JSON field, which is a JSON string when loaded and may have been deserialised since
+	"""
+	return json.loads(value) if isinstance(value, str) and value else value
+
+
 def get_domain_and_id_from_woocommerce_record_name(
 	name: str, delimiter: str = WC_RESOURCE_DELIMITER
 ) -> tuple[str, int]:
@@ -633,37 +1087,235 @@ def get_domain_and_id_from_woocommerce_record_name(
 	return domain, int(record_id_str)
 
 
-def map_frappe_filters_to_wc_params(filters):
+class KeysetCursor:
+	"""
+	Position in a list of WooCommerce records ordered by date modified, for keyset pagination.
+
+	WooCommerce only compares modification dates to the second, and modified_after is exclusive, so each
+	page starts one second before the last date modified that was listed, excluding the IDs that were
+	already listed with that date. Unlike offsets, this costs the same for every page and never skips
+	records that are modified while the list is walked; those are listed again instead.
+	"""
+
+	def __init__(self, params: dict):
+		self.exclude = [str(id) for id in str(params.get("exclude") or "").split(",") if id]
+		self.last_modified = None
+		self.last_ids = []
+
+	def params(self) -> dict:
+		if not self.last_modified:
+			return {}
+		return {
+			"modified_after": (get_datetime(self.last_modified) - timedelta(seconds=1)).isoformat(),
+			"exclude": ",".join(dict.fromkeys(self.exclude + self.last_ids)),
+		}
+
+	def advance(self, results: list[dict]):
+		for record in results:
+			if not record.get("date_modified"):
+				continue
+			if record["date_modified"] != self.last_modified:
+				self.last_modified = record["date_modified"]
+				self.last_ids = []
+			self.last_ids.append(str(record["id"]))
+
+
+def map_frappe_filters_to_wc_params(filters, doctype: str | None = None):
 	"""
 	Maps Frappe filters to WooCommerce API parameters
 
-	This handles the standard filters that Frappe will pass to get_list
+	This handles the standard filters that Frappe will pass to get_list, and throws on filters that
+	can not be passed to WooCommerce
 	"""
-	params = {}
-	standard_mappings = {
-		"date_modified": {">": "modified_after", "<": "modified_before"},
-		"date_created": {">": "after", "<": "before"},
-		# Add more mappings as needed
-	}
+	params, client_filters = split_frappe_filters(filters, doctype)
+	for field, operator, _value in client_filters:
+		# Searches are also applied client-side, but WooCommerce applies them approximately anyway
+		if field != "woocommerce_name" or operator != "like":
+			frappe.throw(f"Unsupported operator '{operator}' for field '{field}'")
+	return params
+
 
+def normalise_frappe_filters(filters) -> list[tuple[str, str, object]]:
+	"""
+	Convert Frappe filters in any of their formats to a list of (field, operator, value)
+	"""
+	filters = frappe.parse_json(filters) or []
+	if isinstance(filters, dict):
+		return [
+			(field, *(value if isinstance(value, list | tuple) else ("=", value)))
+			for field, value in filters.items()
+		]
+
+	normalised = []
 	for filter in filters:
-		doctype, field, operator, value = filter
+		if len(filter) == 3:
+			field, operator, value = filter
+		else:
+			_doctype, field, operator, value, *_ = filter
+		normalised.append((field, operator.lower(), value))
+	return normalised
 
-		# Handle standard mappings
-		if field in standard_mappings and operator in standard_mappings[field]:
-			params[standard_mappings[field][operator]] = value
+
+def split_frappe_filters(filters, doctype: str | None = None) -> tuple[dict, list]:
+	"""
+	Split Frappe filters into WooCommerce API parameters, and filters that must be applied client-side
+
+	Filters that WooCommerce only applies approximately, like a search for a product name, are applied on
+	both sides.
+
+	Returns:
+		Tuple: WooCommerce parameters, and a list of (field, operator, value) for client-side filtering
+	"""
+	params = {}
+	client_filters = []
+
+	for field, operator, value in normalise_frappe_filters(filters):
+		mapped = map_frappe_filter_to_wc_params(field, operator, value, doctype)
+		if mapped is None:
+			client_filters.append((field, operator, value))
 			continue
+		params.update(mapped)
+
+		# WooCommerce searches more fields than the name, so the results are narrowed down client-side
+		if "search" in mapped and field == "woocommerce_name":
+			client_filters.append((field, operator, value))
+
+	return params, client_filters
+
+
+def map_frappe_filter_to_wc_params(
+	field: str, operator: str, value, doctype: str | None = None
+) -> dict | None:
+	"""
+	Map a single Frappe filter to WooCommerce API parameters, or return None if it can not be mapped
+	"""
+	field = FRAPPE_FIELD_ALIASES.get(field, field)
+	values = value if isinstance(value, list | tuple) else [v.strip() for v in str(value).split(",")]
+
+	# Date ranges
+	if field in DATE_RANGE_PARAMS:
+		after, before = DATE_RANGE_PARAMS[field]
+		if operator in (">", ">="):
+			return {after: get_datetime(value).isoformat()}
+		if operator in ("<", "<="):
+			return {before: get_datetime(value).isoformat()}
+		if operator == "between" and len(values) == 2:
+			return {after: get_datetime(values[0]).isoformat(), before: get_datetime(values[1]).isoformat()}
+		return None
+
+	if field == "id":
+		if operator == "=":
+			return {"include": [value]}
+		if operator == "in":
+			return {"include": ",".join(map(str, values))}
+		if operator in ("!=", "not in"):
+			return {"exclude": ",".join(map(str, values))}
+		return None
+
+	if field == "parent_id":
+		if operator in ("=", "in"):
+			return {"parent": ",".join(map(str, values))}
+		if operator in ("!=", "not in"):
+			return {"parent_exclude": ",".join(map(str, values))}
+		return None
+
+	if field in ("name", "woocommerce_name") and operator == "like":
+		return {"search": str(value).strip("%")}
+
+	if field == "status":
+		if operator == "=":
+			return {"status": [value]}
+		# Orders can be filtered on several statuses at once
+		if operator == "in" and doctype == "WooCommerce Order":
+			return {"status": ",".join(values)}
+		return None
+
+	if doctype == "WooCommerce Product":
+		if field == "sku" and operator in ("=", "in"):
+			return {"sku": ",".join(values)}
+		# The products endpoint rejects other types, e.g. "variation"
+		if field == "type" and operator == "=" and value in WC_PRODUCT_LIST_TYPES:
+			return {field: value}
+		if field in ("stock_status", "slug", "category", "tag") and operator == "=":
+			return {field: value}
+		if field in ("featured", "on_sale") and operator == "=":
+			return {field: "true" if cint(value) else "false"}
+		if field == "price" and operator in (">", ">="):
+			return {"min_price": value}
+		if field == "price" and operator in ("<", "<="):
+			return {"max_price": value}
+
+	if doctype == "WooCommerce Order":
+		if field in ("customer", "customer_id") and operator == "=":
+			return {"customer": value}
+		if field in ("product", "product_id") and operator == "=":
+			return {"product": value}
+
+	return None
+
+
+def map_frappe_order_by_to_wc_params(order_by: str | None, doctype: str | None = None) -> dict:
+	"""
+	Map the first field of a Frappe order_by to WooCommerce's orderby and order parameters, if WooCommerce
+	can sort on it
+	"""
+	if not order_by:
+		return {}
+
+	match = re.match(r"^\s*(?:`tab[^`]+`\.)?`?(\w+)`?\s*(asc|desc)?", order_by.split(",")[0], re.IGNORECASE)
+	if not match:
+		return {}
+
+	field = FRAPPE_FIELD_ALIASES.get(match.group(1), match.group(1))
+	orderby = WC_ORDERBY.get(field)
+	if not orderby or (orderby in WC_PRODUCT_ONLY_ORDERBY and doctype != "WooCommerce Product"):
+		return {}
 
-		# Handle specific cases
-		if field in ["name", "woocommerce_name"] and operator == "like":
-			params["search"] = value.strip("%")
-		elif field == "woocommerce_id" and operator == "=":
-			params["include"] = [value]
-		elif field == "woocommerce_id" and operator == "in":
-			params["include"] = ",".join(value)
-		elif field == "status" and operator == "=":
-			params["status"] = [value]
+	return {"orderby": orderby, "order": (match.group(2) or "desc").lower()}
+
+
+def matches_filters(record: dict, filters: list[tuple[str, str, object]], meta) -> bool:
+	"""
+	Whether a record matches all filters, for filters that can not be applied by WooCommerce
+	"""
+	for field, operator, value in filters:
+		fieldtype = (df.fieldtype if (df := meta.get_field(field)) else None) or "Data"
+		recorded = cast_filter_value(record.get(field), fieldtype)
+
+		if operator in ("in", "not in"):
+			values = value if isinstance(value, list | tuple) else str(value).split(",")
+			found = recorded in [cast_filter_value(v, fieldtype) for v in values]
+			matched = found if operator == "in" else not found
+		elif operator in ("like", "not like"):
+			pattern = "^" + re.escape(cstr(value)).replace("%", ".*").replace("_", ".") + "$"
+			found = bool(re.match(pattern, cstr(record.get(field)), re.IGNORECASE))
+			matched = found if operator == "like" else not found
+		elif operator == "is":
+			matched = bool(record.get(field)) == (value == "set")
+		elif operator == "between":
+			low, high = (cast_filter_value(v, fieldtype) for v in value)
+			matched = recorded is not None and low <= recorded <= high
+		elif operator in FILTER_OPERATORS:
+			try:
+				matched = FILTER_OPERATORS[operator](recorded, cast_filter_value(value, fieldtype))
+			except TypeError:
+				matched = False
 		else:
-			frappe.throw(f"Unsupported operator '{operator}' for field '{field}'")
+			matched = False
 
-	return params
+		if not matched:
+			return False
+
+	return True
+
+
+def cast_filter_value(value, fieldtype: str):
+	if value is None or value == "":
+		return None
+	if fieldtype in ("Date", "Datetime"):
+		return get_datetime(value)
+	if fieldtype in ("Int", "Check"):
+		return cint(value)
+	if fieldtype in ("Float", "Currency", "Percent"):
+		return flt(value)
+	return cstr(value)